@@ -0,0 +1,5 @@
+"""
+Benchmarks for pymvlapi. Each module can be run with `python -m`, e.g.
+
+    python -m benchmarks.records_memory
+"""
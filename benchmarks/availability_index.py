@@ -0,0 +1,81 @@
+"""
+Measures `AvailabilityIndex` on a synthetic catalogue against scanning every
+villa's unavailable periods.
+
+    python -m benchmarks.availability_index [--villas N] [--periods N] [--queries N]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from pymvlapi.availability import AvailabilityIndex
+from pymvlapi.records import (UnavailablePeriod, VillaUnavailableDates)
+
+
+def build_catalogue(villas: int, periods: int) -> list:
+    random.seed(1)
+    first = datetime.datetime(2017, 1, 1)
+    catalogue = []
+    for villa in range(villas):
+        unavailable = []
+        for _ in range(periods):
+            start = first + datetime.timedelta(days=random.randrange(365))
+            unavailable.append(UnavailablePeriod(start, start + datetime.timedelta(days=random.randint(0, 10))))
+        catalogue.append(VillaUnavailableDates("villa%d" % villa, unavailable))
+    return catalogue
+
+
+def free_villas_by_scan(catalogue: list, check_in: datetime.datetime,
+        check_out: datetime.datetime) -> list:
+    last_night = check_out - datetime.timedelta(days=1)
+    return [ villa.villa_id for villa in catalogue
+            if not any(period.date_from <= last_night and period.date_to >= check_in
+                for period in villa.unavailable_dates) ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villas", type=int, default=10000)
+    parser.add_argument("--periods", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    catalogue = build_catalogue(args.villas, args.periods)
+    started = time.perf_counter()
+    index = AvailabilityIndex.from_unavailable_dates(catalogue)
+    build_time = time.perf_counter() - started
+
+    first = datetime.datetime(2017, 1, 1)
+    stays = []
+    for _ in range(args.queries):
+        check_in = first + datetime.timedelta(days=random.randrange(350))
+        stays.append((check_in, check_in + datetime.timedelta(days=random.randint(1, 14))))
+
+    started = time.perf_counter()
+    for stay in stays:
+        expected = free_villas_by_scan(catalogue, *stay)
+    scan_time = (time.perf_counter() - started) / len(stays)
+
+    started = time.perf_counter()
+    for stay in stays:
+        found = index.free_villas(*stay)
+    index_time = (time.perf_counter() - started) / len(stays)
+
+    started = time.perf_counter()
+    villa_ids = index.villa_ids()
+    for stay in stays:
+        for villa_id in villa_ids:
+            index.is_available(villa_id, *stay)
+    lookup_time = (time.perf_counter() - started) / (len(stays) * len(villa_ids))
+
+    print("%d villas x %d unavailable periods" % (args.villas, args.periods))
+    print("index build:            %8.1f ms" % (build_time * 1000))
+    print("free_villas by scan:    %8.2f ms/query" % (scan_time * 1000))
+    print("free_villas by index:   %8.2f ms/query (%.0fx)" % (index_time * 1000, scan_time / index_time))
+    print("is_available:           %8.2f us/lookup" % (lookup_time * 1e6))
+    assert sorted(found) == sorted(free_villas_by_scan(catalogue, *stays[-1]))
+
+
+if __name__ == "__main__":
+    main()
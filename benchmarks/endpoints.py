@@ -0,0 +1,229 @@
+"""
+Benchmarks each public method of `MarketingVillasApi` against a local
+`MockMarketingVillasServer`.
+
+For every method, serial and concurrent runs measure throughput and p50/p99
+latency; the time spent parsing a response and the peak memory allocated by
+one call are measured separately. The server runs in a child process, so
+that neither its CPU time nor its allocations (e.g. for gzip-encoding the
+responses) are counted against the client. Concurrent identical reads are
+not coalesced, so that every call is a request through the transport.
+Results can be saved as a JSON baseline, and compared with an earlier
+baseline to catch regressions:
+
+    python -m benchmarks.endpoints --save baseline.json
+    python -m benchmarks.endpoints --compare baseline.json --tolerance 0.2
+
+The comparison exits with status 1 if any metric is worse than the baseline
+by more than the tolerance.
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.testing import MockMarketingVillasServer
+from pymvlapi.transport import PooledTransport
+
+BOOKING_ARGUMENTS = ("Villa1", datetime.datetime(2017, 11, 11), datetime.datetime(2017, 11, 15),
+        "John", "Doe", "john@example.com", "Isengard", "+601155555555", "+601155555555",
+        1, 0, 0, "Benchmark")
+
+# Public method name, its arguments, and the raw method and parser it combines
+METHODS = [
+    ("get_time_token", (), "_get_time_token", "_parse_token"),
+    ("get_md5_token", (), "_get_md5_token", "_parse_token"),
+    ("get_villa_list", (), "_get_villa_list", "_parse_villa_list"),
+    ("get_villa_rates", ("Villa1",), "_get_villa_rates", "_parse_villa_rates"),
+    ("get_villa_unavailable_dates", ("Villa1",), "_get_villa_unavailable_dates", "_parse_villa_unavailable_dates"),
+    ("insert_ta_hold_booking", BOOKING_ARGUMENTS, "_insert_ta_hold_booking", "_parse_booking"),
+    ("insert_ta_confirmed_booking", BOOKING_ARGUMENTS, "_insert_ta_confirmed_booking", "_parse_booking"),
+]
+
+# Whether a higher value of each metric is better
+METRICS = {
+    "requests_per_second": True,
+    "p50_ms": False,
+    "p99_ms": False,
+    "parse_ms": False,
+    "peak_memory_bytes": False,
+}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def timed_call(function, args: tuple) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def measure_load(function, args: tuple, requests: int, concurrency: int) -> dict:
+    started = time.perf_counter()
+    if concurrency == 1:
+        latencies = [ timed_call(function, args) for _ in range(requests) ]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(lambda _: timed_call(function, args), range(requests)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def measure_parse(api: MarketingVillasApi, raw_method: str, parser: str,
+        args: tuple, repeat: int) -> float:
+    raw = getattr(api, raw_method)(*args)
+    parse = getattr(api, parser)
+    parse_args = (raw, args[0]) if parser in ("_parse_villa_rates", "_parse_villa_unavailable_dates") else (raw,)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parse(*parse_args)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def measure_peak_memory(function, args: tuple) -> int:
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def serve(options: dict, connection):
+    with MockMarketingVillasServer(**options) as server:
+        connection.send(server.url)
+        # Serves until the parent process asks to stop
+        connection.recv()
+
+
+@contextlib.contextmanager
+def server_process(**options):
+    """
+    Runs a `MockMarketingVillasServer` in a child process, yielding its URL.
+    """
+    connection, child_connection = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(options, child_connection), daemon=True)
+    process.start()
+    try:
+        yield connection.recv()
+    finally:
+        connection.send(None)
+        process.join()
+
+
+def run(args) -> dict:
+    results = {}
+    with server_process(villa_count=args.villas, rate_periods=args.rate_periods,
+            unavailable_periods=args.unavailable_periods, latency=args.latency / 1000.0) as url:
+        api = MarketingVillasApi("benchmark", "benchmark", 1, base_url=url,
+                transport=PooledTransport(pool_size=args.concurrency), coalesce=False)
+        try:
+            for name, method_args, raw_method, parser in METHODS:
+                if args.methods and name not in args.methods:
+                    continue
+                method = getattr(api, name)
+                method(*method_args)
+                results[name] = {
+                    "serial": measure_load(method, method_args, args.requests, 1),
+                    "concurrent": measure_load(method, method_args, args.requests, args.concurrency),
+                    "parse_ms": measure_parse(api, raw_method, parser, method_args, args.parse_repeat),
+                    "peak_memory_bytes": measure_peak_memory(method, method_args),
+                }
+        finally:
+            api.close()
+    return results
+
+
+def flatten(results: dict) -> dict:
+    flat = {}
+    for method, measurements in results.items():
+        for key, value in measurements.items():
+            if isinstance(value, dict):
+                for metric, metric_value in value.items():
+                    flat["%s.%s.%s" % (method, key, metric)] = metric_value
+            else:
+                flat["%s.%s" % (method, key)] = value
+    return flat
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns a description of each metric worse than in the baseline by more
+    than `tolerance` (a fraction of the baseline value).
+    """
+    regressions = []
+    current, previous = flatten(results), flatten(baseline)
+    for key, value in sorted(current.items()):
+        if key not in previous or not previous[key]:
+            continue
+        higher_is_better = METRICS[key.rsplit(".", 1)[1]]
+        change = (value - previous[key]) / previous[key]
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append("%s: %.3f -> %.3f (%+.0f%%)" % (key, previous[key], value, change * 100))
+    return regressions
+
+
+def report(results: dict):
+    print("%-28s %-10s %10s %9s %9s" % ("method", "mode", "req/s", "p50 ms", "p99 ms"))
+    for method, measurements in results.items():
+        for mode in ("serial", "concurrent"):
+            load = measurements[mode]
+            print("%-28s %-10s %10.1f %9.2f %9.2f" % (method, mode, load["requests_per_second"],
+                load["p50_ms"], load["p99_ms"]))
+        print("%-28s parse %.3f ms, peak memory %d bytes" % ("", measurements["parse_ms"],
+            measurements["peak_memory_bytes"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MarketingVillasApi against a local mock server.")
+    parser.add_argument("--villas", type=int, default=500, help="villas in the villa list")
+    parser.add_argument("--rate-periods", type=int, default=100, help="rate periods per villa")
+    parser.add_argument("--unavailable-periods", type=int, default=50, help="unavailable periods per villa")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency added by the server, in ms")
+    parser.add_argument("--requests", type=int, default=200, help="requests per method and mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="threads in the concurrent mode")
+    parser.add_argument("--parse-repeat", type=int, default=20, help="repetitions of the parse timing")
+    parser.add_argument("--methods", nargs="*", help="only benchmark these methods")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results with a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression, as a fraction")
+    args = parser.parse_args()
+
+    results = run(args)
+    report(results)
+
+    if args.save:
+        with open(args.save, "w") as baseline_file:
+            json.dump({
+                "python": platform.python_version(),
+                "parameters": { key: value for key, value in vars(args).items()
+                    if key not in ("save", "compare") },
+                "results": results
+            }, baseline_file, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures the throughput of `get_rates_for_villas` against a local
+`MockMarketingVillasServer` serving large rate tables, parsing the responses
+on the fetching threads and then on process pools of increasing size. The
+server runs in a child process, so that it doesn't compete with the client
+for the GIL.
+
+    python -m benchmarks.parse_executor [--villas N] [--rate-periods N]
+        [--threads N] [--workers 1,2,4,8]
+
+Parsing scales with the number of workers only up to the number of cores.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.endpoints import server_process
+from pymvlapi.endpoint import MarketingVillasApi
+
+
+def villas_per_second(url: str, villa_ids: list, threads: int,
+        parse_executor=None) -> float:
+    api = MarketingVillasApi("benchmark", "benchmark", 1, base_url=url,
+            parse_executor=parse_executor)
+    try:
+        api.token_manager.get()
+        started = time.perf_counter()
+        for result in api.get_rates_for_villas(villa_ids, max_workers=threads):
+            if result.error is not None:
+                raise result.error
+        return len(villa_ids) / (time.perf_counter() - started)
+    finally:
+        api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villas", type=int, default=200)
+    parser.add_argument("--rate-periods", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+
+    villa_ids = [ "Villa%d" % index for index in range(args.villas) ]
+    print("%d cores, %d villas of %d rate periods, %d threads" % (os.cpu_count(),
+        args.villas, args.rate_periods, args.threads))
+    with server_process(rate_periods=args.rate_periods) as url:
+        # Warms up the server's cache of generated responses
+        villas_per_second(url, villa_ids, args.threads)
+
+        baseline = villas_per_second(url, villa_ids, args.threads)
+        print("%-16s %8.1f villas/s" % ("in threads", baseline))
+        for workers in [ int(count) for count in args.workers.split(",") ]:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                throughput = villas_per_second(url, villa_ids, args.threads, executor)
+            print("%-16s %8.1f villas/s (%.2fx)" % ("%d processes" % workers,
+                throughput, throughput / baseline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compares the per-row cost of the parsers in `pymvlapi.parsing` with the
+`strptime` and `find()` based conversion they replaced.
+
+    python -m benchmarks.parsing [--rows N]
+"""
+import argparse
+import datetime
+import time
+from xml.etree import ElementTree as ET
+
+from pymvlapi import parsing
+
+
+def legacy_rate(rate: ET.Element) -> dict:
+
+    def parse_date(datestr):
+        return datetime.datetime.strptime(datestr, "%Y-%m-%dT00:00:00")
+
+    return {
+        "from": parse_date(rate.find("From").text),
+        "to": parse_date(rate.find("To").text),
+        "amount": float(rate.find("Amount").text),
+        "min_stay": int(rate.find("MinimumNightStay").text),
+        "percent_tax": float(rate.find("PercentTax").text),
+        "percent_rate": float(rate.find("PercentRate").text)
+    }
+
+
+def legacy_unavailable(unavail: ET.Element) -> dict:
+
+    def parse_date(datestr):
+        return datetime.datetime.strptime(datestr, "%Y-%m-%d")
+
+    return {
+        "from": parse_date( unavail.find("From").text ),
+        "to": parse_date( unavail.find("To").text )
+    }
+
+
+def rates_document(rows: int) -> ET.Element:
+    start = datetime.date(2017, 1, 1)
+    rates = "".join("<Rate><From>%sT00:00:00</From><To>%sT00:00:00</To><Amount>%d.00</Amount>"
+            "<MinimumNightStay>2</MinimumNightStay><PercentTax>10.00</PercentTax>"
+            "<PercentRate>5.00</PercentRate></Rate>" % (
+                start + datetime.timedelta(days=row % 730),
+                start + datetime.timedelta(days=row % 730 + 6), 1000 + row % 50)
+            for row in range(rows))
+    return ET.fromstring("<Rates>%s</Rates>" % rates)
+
+
+def unavailable_document(rows: int) -> ET.Element:
+    start = datetime.date(2017, 1, 1)
+    periods = "".join("<UnavailableDate><From>%s</From><To>%s</To></UnavailableDate>" % (
+                start + datetime.timedelta(days=row % 730),
+                start + datetime.timedelta(days=row % 730 + 3))
+            for row in range(rows))
+    return ET.fromstring("<UnavailableDates>%s</UnavailableDates>" % periods)
+
+
+def per_row(convert, elements: list) -> float:
+    started = time.perf_counter()
+    for element in elements:
+        convert(element)
+    return (time.perf_counter() - started) / len(elements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    for name, elements, legacy, fast in [
+            ("rate", list(rates_document(args.rows)), legacy_rate, parsing.rate_from_element),
+            ("unavailable date", list(unavailable_document(args.rows)), legacy_unavailable, parsing.unavailable_from_element)]:
+        parsing.parse_date.cache_clear()
+        parsing.parse_midnight_datetime.cache_clear()
+        legacy_time = per_row(legacy, elements)
+        fast_time = per_row(fast, elements)
+        print("%-16s legacy %6.2f us/row, parsing %6.2f us/row (%.1fx)" % (
+            name, legacy_time * 1e6, fast_time * 1e6, legacy_time / fast_time))
+
+
+if __name__ == "__main__":
+    main()
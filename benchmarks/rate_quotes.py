@@ -0,0 +1,71 @@
+"""
+Compares pricing stays with `RateTable.quote_many` against looping over a
+villa's rate dictionaries night by night.
+
+    python -m benchmarks.rate_quotes [--periods N] [--stays N]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from pymvlapi import rates
+from pymvlapi.rates import RateTable
+from pymvlapi.records import (RatePeriod, VillaRates)
+
+
+def build_rates(periods: int) -> VillaRates:
+    start = datetime.datetime(2017, 1, 1)
+    return VillaRates("villa", "Standard Rate", [
+        RatePeriod(start + datetime.timedelta(days=period * 7),
+            start + datetime.timedelta(days=period * 7 + 6),
+            1000.00 + period, 2, 10.00, 5.00)
+        for period in range(periods) ])
+
+
+def quote_by_loop(rate_dicts: list, check_in: datetime.datetime,
+        check_out: datetime.datetime) -> float:
+    total = 0.0
+    night = check_in
+    while night < check_out:
+        for rate in rate_dicts:
+            if rate["from"] <= night <= rate["to"]:
+                total += rate["amount"] * (1 + rate["percent_tax"] / 100.0)
+                break
+        night += datetime.timedelta(days=1)
+    return total
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--periods", type=int, default=104)
+    parser.add_argument("--stays", type=int, default=20000)
+    args = parser.parse_args()
+
+    villa_rates = build_rates(args.periods)
+    rate_dicts = villa_rates.as_dict()["rates"]
+    random.seed(1)
+    first = datetime.datetime(2017, 1, 1)
+    stays = []
+    for _ in range(args.stays):
+        check_in = first + datetime.timedelta(days=random.randrange(args.periods * 7 - 30))
+        stays.append((check_in, check_in + datetime.timedelta(days=random.randint(1, 14))))
+
+    loop_time = timed(lambda: [ quote_by_loop(rate_dicts, *stay) for stay in stays ])
+    print("%d stays over %d rate periods" % (args.stays, args.periods))
+    print("dict loop:        %8.1f ms" % (loop_time * 1000))
+    variants = [("array", False)] + ([("numpy", True)] if rates.numpy is not None else [])
+    for name, use_numpy in variants:
+        table = RateTable.from_villa_rates(villa_rates, use_numpy=use_numpy)
+        elapsed = timed(table.quote_many, stays)
+        print("RateTable (%s): %8.1f ms (%.0fx)" % (name, elapsed * 1000, loop_time / elapsed))
+
+
+if __name__ == "__main__":
+    main()
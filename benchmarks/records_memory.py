@@ -0,0 +1,68 @@
+"""
+Compares the memory held by rate tables built from the record classes with
+the dictionaries the client used to return.
+
+    python -m benchmarks.records_memory [--villas N] [--periods N]
+"""
+import argparse
+import datetime
+import gc
+import tracemalloc
+
+from pymvlapi.records import (RatePeriod, VillaRates)
+
+
+def build_dicts(villas: int, periods: int) -> list:
+    start = datetime.datetime(2017, 1, 1)
+    return [ {
+        "villa_id": "villa%d" % villa,
+        "rate_name": "Standard Rate",
+        "rates": [ {
+            "from": start + datetime.timedelta(days=period * 7),
+            "to": start + datetime.timedelta(days=period * 7 + 6),
+            "amount": 1895.00 + period,
+            "min_stay": 2,
+            "percent_tax": 10.00,
+            "percent_rate": 5.00
+        } for period in range(periods) ]
+    } for villa in range(villas) ]
+
+
+def build_records(villas: int, periods: int) -> list:
+    start = datetime.datetime(2017, 1, 1)
+    return [ VillaRates("villa%d" % villa, "Standard Rate", [
+        RatePeriod(start + datetime.timedelta(days=period * 7),
+            start + datetime.timedelta(days=period * 7 + 6),
+            1895.00 + period, 2, 10.00, 5.00)
+        for period in range(periods) ]) for villa in range(villas) ]
+
+
+def measure(build, villas: int, periods: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        data = build(villas, periods)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del data
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villas", type=int, default=1000)
+    parser.add_argument("--periods", type=int, default=50)
+    args = parser.parse_args()
+
+    rows = args.villas * args.periods
+    dict_size = measure(build_dicts, args.villas, args.periods)
+    record_size = measure(build_records, args.villas, args.periods)
+    print("%d villas x %d rate periods" % (args.villas, args.periods))
+    print("dicts:   %10d bytes (%.0f bytes/period)" % (dict_size, dict_size / rows))
+    print("records: %10d bytes (%.0f bytes/period)" % (record_size, record_size / rows))
+    print("saving:  %.1f%%" % (100.0 * (dict_size - record_size) / dict_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Measures `Catalogue.search` on a synthetic catalogue against answering the
+same searches with loops over the records the API returns.
+
+    python -m benchmarks.search [--villas N] [--rate-periods N] [--periods N]
+        [--queries N] [--limit N]
+"""
+import argparse
+import datetime
+import random
+import time
+
+from pymvlapi.records import (Villa, RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates)
+from pymvlapi.search import Catalogue
+from pymvlapi.sync import (Change, VILLA, RATES, UNAVAILABLE_DATES, ADDED)
+
+
+def build_records(villas: int, rate_periods: int, periods: int) -> list:
+    """
+    Returns `(villa, rates, unavailable dates, capacity)` tuples of villas with
+    consecutive fortnightly rate periods and random unavailable periods.
+    """
+    random.seed(1)
+    first = datetime.datetime(2017, 1, 1)
+    records = []
+    for index in range(villas):
+        villa_id = "villa%d" % index
+        rates = [ RatePeriod(first + datetime.timedelta(days=period * 14),
+                    first + datetime.timedelta(days=period * 14 + 13),
+                    float(random.randrange(300, 3000)), random.choice([1, 2, 3, 7]), 10.0, 5.0)
+                for period in range(rate_periods) ]
+        unavailable = []
+        for _ in range(periods):
+            start = first + datetime.timedelta(days=random.randrange(365))
+            unavailable.append(UnavailablePeriod(start, start + datetime.timedelta(days=random.randint(0, 10))))
+        records.append((Villa(villa_id, villa_id, villa_id, "Villa %d" % index),
+            VillaRates(villa_id, "Standard Rate", rates),
+            VillaUnavailableDates(villa_id, unavailable), random.randint(2, 16)))
+    return records
+
+
+def search_by_loops(records: list, check_in: datetime.datetime, check_out: datetime.datetime,
+        guests: int, budget: float) -> list:
+    last_night = check_out - datetime.timedelta(days=1)
+    nights = (check_out - check_in).days
+    found = []
+    for villa, rates, unavailable, capacity in records:
+        if capacity < guests:
+            continue
+        if any(period.date_from <= last_night and period.date_to >= check_in
+                for period in unavailable.unavailable_dates):
+            continue
+        total, min_stay, covered = 0.0, None, True
+        night = check_in
+        while night < check_out:
+            rate = next((rate for rate in rates.rates if rate.date_from <= night <= rate.date_to), None)
+            if rate is None:
+                covered = False
+                break
+            if min_stay is None:
+                min_stay = rate.min_stay
+            total += rate.amount * (1 + rate.percent_tax / 100.0)
+            night += datetime.timedelta(days=1)
+        if covered and nights >= min_stay and total <= budget:
+            found.append((round(total, 2), villa.villa_id))
+    return sorted(found)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--villas", type=int, default=2000)
+    parser.add_argument("--rate-periods", type=int, default=26)
+    parser.add_argument("--periods", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    records = build_records(args.villas, args.rate_periods, args.periods)
+    catalogue = Catalogue(None, capacities={ villa.villa_id: capacity
+        for villa, _, _, capacity in records })
+    changes = []
+    for villa, rates, unavailable, _ in records:
+        changes.extend([ Change(VILLA, villa.villa_id, ADDED, villa),
+            Change(RATES, villa.villa_id, ADDED, rates),
+            Change(UNAVAILABLE_DATES, villa.villa_id, ADDED, unavailable) ])
+    started = time.perf_counter()
+    catalogue.apply(changes)
+    # The first search concatenates the rate tables
+    catalogue.search(datetime.date(2017, 1, 1), datetime.date(2017, 1, 2))
+    build_time = time.perf_counter() - started
+
+    first = datetime.datetime(2017, 1, 1)
+    searches = []
+    for _ in range(args.queries):
+        check_in = first + datetime.timedelta(days=random.randrange(340))
+        searches.append((check_in, check_in + datetime.timedelta(days=random.randint(2, 14)),
+            random.randint(2, 10), random.randrange(2000, 30000)))
+
+    started = time.perf_counter()
+    for search in searches:
+        expected = search_by_loops(records, *search)
+    loop_time = (time.perf_counter() - started) / len(searches)
+
+    started = time.perf_counter()
+    for search in searches:
+        found = catalogue.search(*search)
+    search_time = (time.perf_counter() - started) / len(searches)
+
+    started = time.perf_counter()
+    for search in searches:
+        top = catalogue.search(*search, limit=args.limit)
+    top_time = (time.perf_counter() - started) / len(searches)
+
+    print("%d villas x %d rate periods x %d unavailable periods" % (args.villas,
+        args.rate_periods, args.periods))
+    print("catalogue build:        %8.1f ms" % (build_time * 1000))
+    print("search by loops:        %8.2f ms/query" % (loop_time * 1000))
+    print("Catalogue.search:       %8.2f ms/query (%.0fx)" % (search_time * 1000,
+        loop_time / search_time))
+    print("Catalogue.search top %-3d %7.2f ms/query (%.0fx)" % (args.limit, top_time * 1000,
+        loop_time / top_time))
+    assert [ (result.quote.total, result.villa_id) for result in found ] == expected
+    assert top == found[:args.limit]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares building request URLs with `CompiledEndpoint`, as the client now
+does, with the `urljoin`/`urlparse`/`urlencode`/`urlunparse` construction it
+replaced, for a read and a booking endpoint.
+
+    python -m benchmarks.url_construction [--calls N]
+"""
+import argparse
+import datetime
+import time
+from posixpath import join as posixjoin
+from urllib.parse import (urljoin, urlparse, urlencode, urlunparse)
+
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasUrls, BOOKING_QUERY_ARGS)
+
+TOKEN = "1e8046523db8ad1d376df5e1447f3b4a"
+
+
+def legacy_construct_endpoint(endpoint: tuple, get_params: dict, base_url: str) -> str:
+    for key in endpoint[1]:
+        if key not in get_params:
+            raise KeyError(key)
+    joined_endpoint = urljoin(base_url, posixjoin(MarketingVillasUrls.BASE_PATH, endpoint[0].lstrip("/")))
+    parsed_endpoint = urlparse(joined_endpoint)
+    return urlunparse(parsed_endpoint._replace(query=urlencode(get_params)))
+
+
+def per_call(function, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    api = MarketingVillasApi("benchmark", "benchmark", 1)
+    rates_params = { "p_UserID": "benchmark", "p_VillaID": "Shangri La" }
+    booking_params = api._booking_params("Shangri La", datetime.datetime(2017, 11, 11),
+            datetime.datetime(2017, 11, 15), "John", "Doe", "john@example.com", "Isengard",
+            "+601155555555", "+601155555555", 1, 0, 0, "Late check-in, please")
+    assert set(booking_params) | { "p_Token" } == set(BOOKING_QUERY_ARGS)
+
+    for name, endpoint, params in [
+            ("getVillaRates", MarketingVillasUrls.VILLA_RATES_ENDPOINT, rates_params),
+            ("insertTAHoldBooking", MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, booking_params)]:
+        legacy = per_call(lambda: legacy_construct_endpoint(endpoint,
+            dict(params, p_Token=TOKEN), api.base_url), args.calls)
+        compiled = per_call(lambda: api._endpoint_url(endpoint, params, TOKEN), args.calls)
+        print("%-20s legacy %6.2f us/call, compiled %6.2f us/call (%.1fx)" % (
+            name, legacy * 1e6, compiled * 1e6, legacy / compiled))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import asyncio
+import datetime
+import io
+import time
+
+from .auth import AsyncTokenManager
+from .coalesce import AsyncSingleFlight
+from .endpoint import (MarketingVillasApi, MarketingVillasUrls, VillaResult)
+from .records import (VillaRates, VillaUnavailableDates, BookingResult)
+from .transport import (AsyncTransport, ExecutorTransport, PooledTransport)
+
+
+class AsyncMarketingVillasApi(MarketingVillasApi):
+    """
+    An asyncio version of `MarketingVillasApi`.
+
+    Every endpoint method of `MarketingVillasApi`, public and underscore-
+    prefixed alike, is available here under the same name and signature as a
+    coroutine. URL construction and response parsing are shared with the
+    blocking client.
+
+    At most `max_concurrency` requests are in flight at once per client.
+    Requests are sent through an `AsyncTransport`, which by default runs a
+    `PooledTransport` sized to `max_concurrency` on the event loop's thread
+    pool; pass an `AiohttpTransport` to use an existing aiohttp session.
+
+    Responses parsed on a `parse_executor` are awaited without blocking the
+    event loop.
+    """
+
+    def __init__(self, user_id: str, password: str, travel_agent_id: int,
+            token_ttl: float=60.0, token_refresh_margin: float=None,
+            transport: AsyncTransport=None, base_url: str=None,
+            max_concurrency: int=10, cache=None, policy=None, coalesce: bool=True,
+            rate_limiter=None, parse_executor=None):
+        if transport is None:
+            transport = ExecutorTransport(PooledTransport(pool_size=max_concurrency))
+        super(AsyncMarketingVillasApi, self).__init__(user_id, password,
+                travel_agent_id, transport=transport, base_url=base_url,
+                cache=cache, policy=policy, coalesce=coalesce,
+                rate_limiter=rate_limiter, parse_executor=parse_executor)
+        self.token_manager = AsyncTokenManager(lambda: self.get_md5_token(),
+                ttl=token_ttl, refresh_margin=token_refresh_margin)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._flights = AsyncSingleFlight() if coalesce else None
+
+
+    # Utilities and common operations
+
+    async def _make_request(self, url: str, timeout: tuple=None) -> bytes:
+        async with self._semaphore:
+            if timeout is None:
+                return await self.transport.request(url)
+            return await self.transport.request(url, timeout=timeout)
+
+    async def close(self):
+        await self.transport.close()
+
+    async def _coalesced(self, key: tuple, function):
+        if self._flights is None:
+            return await function()
+        return await self._flights.do(key, function)
+
+    async def _parse_async(self, endpoint: tuple, parser, raw: bytes, *args):
+        """
+        Returns `parser(raw, *args)` as `_parse` does, awaiting the
+        `parse_executor` for the endpoints parsed on it.
+        """
+        if not self._parses_on_executor(endpoint):
+            return self._parse(endpoint, parser, raw, *args)
+
+        hooks = self._hooks
+        started = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self.parse_executor.submit(parser, raw, *args))
+        finally:
+            if hooks:
+                self._notify_parse_end(hooks, endpoint, raw, started)
+
+    async def _send(self, endpoint: tuple, url: str, timeout: tuple=None) -> bytes:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async(self._priority_for(endpoint))
+        hooks = self._hooks
+        if not hooks:
+            return await self._make_request(url, timeout)
+
+        started = self._notify_request_start(hooks, endpoint, url)
+        try:
+            resp = await self._make_request(url, timeout)
+        except Exception as error:
+            self._notify_request_end(hooks, endpoint, url, 0, started, error)
+            raise
+        self._notify_request_end(hooks, endpoint, url, len(resp), started, None)
+        return resp
+
+    async def _request(self, endpoint: tuple, get_params: dict, token: str=None) -> bytes:
+        url = self._endpoint_url(endpoint, get_params, token)
+        with self._resend_scope(endpoint):
+            if self.policy is None:
+                return await self._send(endpoint, url)
+            with self.policy.budget():
+                return await self.policy.call_async(endpoint,
+                        lambda timeout: self._send(endpoint, url, timeout))
+
+    async def _authenticated_request(self, endpoint: tuple, get_params: dict) -> bytes:
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, get_params)
+            if cached is not None:
+                return cached
+
+        if self.policy is None and self.rate_limiter is None:
+            return await self._fetch_authenticated(endpoint, get_params)
+        with self._call_scope(endpoint):
+            return await self._fetch_authenticated(endpoint, get_params)
+
+    async def _fetch_authenticated(self, endpoint: tuple, get_params: dict) -> bytes:
+        token = await self.token_manager.get()
+        resp = await self._request(endpoint, get_params, token)
+        if self._is_token_rejected(resp):
+            self.token_manager.invalidate(token)
+            token = await self.token_manager.get()
+            resp = await self._request(endpoint, get_params, token)
+
+        if self.cache is not None and not self._is_error_response(resp):
+            self.cache.set(endpoint, get_params, resp)
+        return resp
+
+    async def _fan_out(self, method, villa_ids):
+        with self._bulk_priority():
+            if villa_ids is None:
+                villa_ids = [villa.villa_id for villa in await self.get_villa_list()]
+
+            # Authenticate up front, so that every task uses the same token
+            await self.token_manager.get()
+
+        async def run(villa_id):
+            try:
+                return VillaResult(villa_id, await method(villa_id), None)
+            except Exception as error:
+                return VillaResult(villa_id, None, error)
+
+        with self._bulk_priority():
+            tasks = [ asyncio.ensure_future(run(villa_id)) for villa_id in villa_ids ]
+        try:
+            for next_completed in asyncio.as_completed(tasks):
+                yield await next_completed
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+    # API endpoints wrapped in coroutines
+
+    async def _get_time_token(self) -> bytes:
+        return await self._request(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, {})
+
+    async def get_time_token(self) -> str:
+        async def fetch():
+            return self._parse(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, self._parse_token,
+                    await self._get_time_token())
+        return await self._coalesced((MarketingVillasUrls.TIME_TOKEN_ENDPOINT[0],), fetch)
+
+    async def _get_md5_token(self) -> bytes:
+        return await self._request(MarketingVillasUrls.MD5_TOKEN_ENDPOINT,
+                self._hash_params(await self.get_time_token()))
+
+    async def get_md5_token(self) -> str:
+        async def fetch():
+            return self._parse(MarketingVillasUrls.MD5_TOKEN_ENDPOINT, self._parse_token,
+                    await self._get_md5_token())
+        return await self._coalesced((MarketingVillasUrls.MD5_TOKEN_ENDPOINT[0],), fetch)
+
+    async def _get_villa_list(self) -> bytes:
+        return await self._authenticated_request(MarketingVillasUrls.VILLA_LIST_ENDPOINT,
+                {
+                    "p_UserID": self.user_id
+                })
+
+    async def get_villa_list(self) -> list:
+        async def fetch():
+            return await self._parse_async(MarketingVillasUrls.VILLA_LIST_ENDPOINT,
+                    self._parse_villa_list, await self._get_villa_list())
+        return await self._coalesced((MarketingVillasUrls.VILLA_LIST_ENDPOINT[0],), fetch)
+
+    async def _get_villa_rates(self, villa_id: str) -> bytes:
+        return await self._authenticated_request(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
+                {
+                    "p_UserID": self.user_id,
+                    "p_VillaID": villa_id
+                })
+
+    async def get_villa_rates(self, villa_id: str) -> VillaRates:
+        async def fetch():
+            return await self._parse_async(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
+                    self._parse_villa_rates, await self._get_villa_rates(villa_id), villa_id)
+        return await self._coalesced((MarketingVillasUrls.VILLA_RATES_ENDPOINT[0], villa_id), fetch)
+
+    async def _get_villa_unavailable_dates(self, villa_id: str) -> bytes:
+        return await self._authenticated_request(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
+                {
+                    "p_UserID": self.user_id,
+                    "p_VillaID": villa_id,
+                    "p_EquateHoldToBook": "Y"
+                })
+
+    async def get_villa_unavailable_dates(self, villa_id: str) -> VillaUnavailableDates:
+        async def fetch():
+            return await self._parse_async(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
+                    self._parse_villa_unavailable_dates,
+                    await self._get_villa_unavailable_dates(villa_id), villa_id)
+        return await self._coalesced((MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT[0],
+            villa_id), fetch)
+
+
+    async def _insert_ta_hold_booking(self, villa_id: str,
+            check_in: datetime.datetime, check_out: datetime.datetime,
+            first_name: str, last_name: str, email: str, country: str,
+            mobile: str, telno: str, adults: int, children: int, infants: int,
+            special_requests: str) -> bytes:
+        return await self._authenticated_request(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING,
+                self._booking_params(villa_id, check_in, check_out, first_name,
+                    last_name, email, country, mobile, telno, adults, children,
+                    infants, special_requests))
+
+
+    async def insert_ta_hold_booking(self, villa_id: str,
+            check_in: datetime.datetime, check_out: datetime.datetime,
+            first_name: str, last_name: str, email: str, country: str,
+            mobile: str, telno: str, adults: int, children: int, infants: int,
+            special_requests: str) -> BookingResult:
+        return self._parse(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, self._parse_booking,
+            await self._insert_ta_hold_booking(villa_id,
+            check_in, check_out, first_name, last_name, email, country, mobile,
+            telno, adults, children, infants, special_requests))
+
+
+    async def _insert_ta_confirmed_booking(self, villa_id: str,
+            check_in: datetime.datetime, check_out: datetime.datetime,
+            first_name: str, last_name: str, email: str, country: str,
+            mobile: str, telno: str, adults: int, children: int, infants: int,
+            special_requests: str) -> bytes:
+        return await self._authenticated_request(MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING,
+                self._booking_params(villa_id, check_in, check_out, first_name,
+                    last_name, email, country, mobile, telno, adults, children,
+                    infants, special_requests))
+
+
+    async def insert_ta_confirmed_booking(self, villa_id: str,
+            check_in: datetime.datetime, check_out: datetime.datetime,
+            first_name: str, last_name: str, email: str, country: str,
+            mobile: str, telno: str, adults: int, children: int, infants: int,
+            special_requests: str) -> BookingResult:
+        return self._parse(MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING, self._parse_booking,
+            await self._insert_ta_confirmed_booking(villa_id,
+            check_in, check_out, first_name, last_name, email, country, mobile,
+            telno, adults, children, infants, special_requests))
+
+
+    # Record-at-a-time variants of the read endpoints. The response is
+    # received in full before parsing, as the transports return whole bodies.
+
+    async def iter_villa_list(self):
+        raw = await self._get_villa_list()
+        for villa in self._iterparse(io.BytesIO(raw), "Villa"):
+            yield self._villa_from_element(villa)
+
+    async def iter_villa_rates(self, villa_id: str):
+        raw = await self._get_villa_rates(villa_id)
+        for rate in self._iterparse(io.BytesIO(raw), "Rate"):
+            yield self._rate_from_element(rate)
+
+    async def iter_villa_unavailable_dates(self, villa_id: str):
+        raw = await self._get_villa_unavailable_dates(villa_id)
+        for unavail in self._iterparse(io.BytesIO(raw), "UnavailableDate"):
+            yield self._unavailable_from_element(unavail)
+
+
+    # Bulk operations; concurrency is bounded by `max_concurrency`
+
+    async def get_rates_for_villas(self, villa_ids=None):
+        async for result in self._fan_out(self.get_villa_rates, villa_ids):
+            yield result
+
+    async def get_availability_for_villas(self, villa_ids=None):
+        async for result in self._fan_out(self.get_villa_unavailable_dates, villa_ids):
+            yield result
@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+
+
+class TokenManager(object):
+    """
+    Caches the authentication token returned by a `fetch` callable.
+
+    A cached token is handed out until `ttl` seconds have passed since it was
+    fetched. Once a token enters the last `refresh_margin` seconds of its life,
+    the next caller still receives it immediately, but a background thread is
+    started to fetch its replacement so that callers rarely have to wait on the
+    token round-trips themselves.
+
+    A `ttl` of zero (or less) disables caching, so that every call to `get()`
+    fetches a new token, as the client did originally.
+    """
+
+    def __init__(self, fetch, ttl: float=60.0, refresh_margin: float=None,
+            clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_margin = ttl * 0.2 if refresh_margin is None else refresh_margin
+        self.clock = clock
+
+        self._token = None
+        self._expires_at = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def get(self) -> str:
+        if self.ttl <= 0:
+            return self.fetch()
+
+        with self._lock:
+            now = self.clock()
+            if self._token is not None and now < self._expires_at:
+                if now >= self._expires_at - self.refresh_margin and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return self._token
+            stale_token = self._token
+
+        with self._fetch_lock:
+            # Another thread may have refreshed the token while we waited
+            with self._lock:
+                if self._token is not stale_token and self.clock() < self._expires_at:
+                    return self._token
+            return self._fetch_and_store()
+
+    def invalidate(self, token: str=None):
+        """
+        Forget the cached token. If `token` is given, the cache is only cleared
+        if it still holds that token, so that several callers reporting the
+        same rejected token cause a single re-authentication.
+        """
+        with self._lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def _fetch_and_store(self) -> str:
+        fetched_at = self.clock()
+        token = self.fetch()
+        with self._lock:
+            self._token = token
+            self._expires_at = fetched_at + self.ttl
+        return token
+
+    def _background_refresh(self):
+        try:
+            with self._fetch_lock:
+                self._fetch_and_store()
+        except Exception:
+            # The current token stays valid until it expires; the next
+            # synchronous refresh will surface the error to a caller.
+            pass
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+class AsyncTokenManager(object):
+    """
+    The asyncio counterpart of `TokenManager`, for use with
+    `AsyncMarketingVillasApi`. `fetch` is a coroutine function, and the
+    background refresh runs as a task on the running event loop.
+    """
+
+    def __init__(self, fetch, ttl: float=60.0, refresh_margin: float=None,
+            clock=time.monotonic):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_margin = ttl * 0.2 if refresh_margin is None else refresh_margin
+        self.clock = clock
+
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_task = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> str:
+        if self.ttl <= 0:
+            return await self.fetch()
+
+        now = self.clock()
+        if self._token is not None and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin and self._refresh_task is None:
+                self._refresh_task = asyncio.ensure_future(self._background_refresh())
+            return self._token
+        stale_token = self._token
+
+        async with self._lock:
+            # Another task may have refreshed the token while we waited
+            if self._token is not stale_token and self.clock() < self._expires_at:
+                return self._token
+            return await self._fetch_and_store()
+
+    def invalidate(self, token: str=None):
+        if token is None or token == self._token:
+            self._token = None
+            self._expires_at = 0.0
+
+    async def _fetch_and_store(self) -> str:
+        fetched_at = self.clock()
+        token = await self.fetch()
+        self._token = token
+        self._expires_at = fetched_at + self.ttl
+        return token
+
+    async def _background_refresh(self):
+        try:
+            async with self._lock:
+                await self._fetch_and_store()
+        except Exception:
+            pass
+        finally:
+            self._refresh_task = None
@@ -0,0 +1,173 @@
+import datetime
+from array import array
+from bisect import bisect_right
+
+from .records import VillaUnavailableDates
+
+
+class AvailabilityIndex(object):
+    """
+    Answers availability queries across many villas from their unavailable
+    dates, as returned by `MarketingVillasApi.get_villa_unavailable_dates`.
+
+    An unavailable period blocks the nights starting on each day from its
+    `date_from` to its `date_to` inclusive, and a stay from `check_in` to
+    `check_out` occupies the nights from `check_in` to the day before
+    `check_out`.
+
+    Each villa's periods are merged into sorted, non-overlapping intervals, so
+    that `is_available` is a binary search. For `free_villas`, every blocked
+    day also keeps a bitset of the villas it blocks; a query ORs the bitsets
+    of the nights of the stay, which costs one pass over a few machine words
+    per villa-night rather than a scan over every villa's periods.
+
+    Villas can be re-indexed individually with `update` when they are
+    re-fetched.
+    """
+
+    def __init__(self):
+        self._starts = {}
+        self._ends = {}
+        self._slots = {}
+        self._villa_ids = []
+        self._free_slots = []
+        self._blocked = {}
+        self._capacity = 0
+        self._all = 0
+
+    @classmethod
+    def from_unavailable_dates(cls, results) -> "AvailabilityIndex":
+        """
+        Builds an index from an iterable of `VillaUnavailableDates`.
+        """
+        index = cls()
+        for unavailable in results:
+            index.update(unavailable)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, villa_id: str) -> bool:
+        return villa_id in self._slots
+
+    def villa_ids(self) -> list:
+        return list(self._slots)
+
+    def update(self, unavailable: VillaUnavailableDates):
+        """
+        Indexes the unavailable dates of a villa, replacing any previously
+        indexed for it.
+        """
+        self.set_unavailable(unavailable.villa_id, [ (period.date_from, period.date_to)
+                for period in unavailable.unavailable_dates ])
+
+    def set_unavailable(self, villa_id: str, periods: list):
+        """
+        Indexes a villa as unavailable for the given `(date_from, date_to)`
+        periods, replacing any previously indexed for it.
+        """
+        if villa_id in self._slots:
+            self._set_blocked_days(villa_id, False)
+        else:
+            self._add_slot(villa_id)
+
+        starts, ends = array("l"), array("l")
+        for start, end in sorted((date_from.toordinal(), date_to.toordinal())
+                for date_from, date_to in periods):
+            if end < start:
+                continue
+            if starts and start <= ends[-1] + 1:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts[villa_id] = starts
+        self._ends[villa_id] = ends
+        self._set_blocked_days(villa_id, True)
+
+    def remove(self, villa_id: str):
+        self._set_blocked_days(villa_id, False)
+        slot = self._slots.pop(villa_id)
+        del self._starts[villa_id]
+        del self._ends[villa_id]
+        self._villa_ids[slot] = None
+        self._free_slots.append(slot)
+        self._all &= ~(1 << slot)
+
+    def unavailable_periods(self, villa_id: str) -> list:
+        """
+        Returns the villa's merged unavailable periods as `(date_from,
+        date_to)` pairs of dates.
+        """
+        return [ (datetime.date.fromordinal(start), datetime.date.fromordinal(end))
+                for start, end in zip(self._starts[villa_id], self._ends[villa_id]) ]
+
+    def is_available(self, villa_id: str, check_in: datetime.date,
+            check_out: datetime.date) -> bool:
+        """
+        Returns True if no night of the stay is unavailable. Raises `KeyError`
+        if the villa is not indexed.
+        """
+        first_night, last_night = check_in.toordinal(), check_out.toordinal() - 1
+        starts = self._starts[villa_id]
+        i = bisect_right(starts, last_night) - 1
+        return i < 0 or self._ends[villa_id][i] < first_night
+
+    def free_villas(self, check_in: datetime.date, check_out: datetime.date) -> list:
+        """
+        Returns the IDs of the indexed villas with no unavailable night during
+        the stay.
+        """
+        blocked = 0
+        blocked_days = self._blocked
+        for day in range(check_in.toordinal(), check_out.toordinal()):
+            villas = blocked_days.get(day)
+            if villas is not None:
+                blocked |= int.from_bytes(villas, "little")
+        return self._villa_ids_in(self._all & ~blocked)
+
+    def _villa_ids_in(self, mask: int) -> list:
+        villa_ids = self._villa_ids
+        found = []
+        data = mask.to_bytes((mask.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            if byte:
+                base = byte_index * 8
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        found.append(villa_ids[base + bit])
+        return found
+
+    def _add_slot(self, villa_id: str):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._villa_ids[slot] = villa_id
+        else:
+            slot = len(self._villa_ids)
+            self._villa_ids.append(villa_id)
+        self._slots[villa_id] = slot
+        self._all |= 1 << slot
+
+        if slot // 8 >= self._capacity:
+            # Grow every day's bitset geometrically to make room
+            growth = max(self._capacity, 8)
+            for villas in self._blocked.values():
+                villas.extend(bytes(growth))
+            self._capacity += growth
+
+    def _set_blocked_days(self, villa_id: str, blocked: bool):
+        slot = self._slots[villa_id]
+        byte_index, bit = slot // 8, 1 << (slot % 8)
+        blocked_days = self._blocked
+        for start, end in zip(self._starts[villa_id], self._ends[villa_id]):
+            for day in range(start, end + 1):
+                villas = blocked_days.get(day)
+                if villas is None:
+                    if not blocked:
+                        continue
+                    villas = blocked_days[day] = bytearray(self._capacity)
+                if blocked:
+                    villas[byte_index] |= bit
+                else:
+                    villas[byte_index] &= ~bit & 0xff
@@ -0,0 +1,280 @@
+"""
+Concurrent submission of many bookings, with client-side idempotency keys.
+"""
+import datetime
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import ratelimit
+from .endpoint import (MarketingVillasApi, MarketingVillasApiError, BOOKING_QUERY_ARGS)
+from .records import (BookingRequest, BookingResult)
+
+PENDING = "pending"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+UNKNOWN = "unknown"
+
+# Booking parameters filled in by the client rather than the request
+CLIENT_QUERY_ARGS = frozenset(["p_Token", "p_UserID", "p_TravelAgentID"])
+
+# Booking parameters that may be left empty
+OPTIONAL_QUERY_ARGS = frozenset(["p_TelNo", "p_SpecialRequest"])
+
+# Seconds the in-memory store shared by default remembers each key for
+SHARED_STORE_MAX_AGE = 24 * 3600
+
+
+class BookingValidationError(MarketingVillasApiError):
+    """
+    Raised for a booking request that would be rejected by the API, without
+    sending it.
+    """
+    pass
+
+
+class DuplicateBookingError(MarketingVillasApiError):
+    """
+    Raised instead of submitting a booking whose idempotency key belongs to a
+    booking still in progress, or whose outcome is unknown.
+    """
+    pass
+
+
+class BookingOutcomeUnknown(MarketingVillasApiError):
+    """
+    Raised when a booking request failed in a way that leaves it unknown
+    whether the API recorded it, e.g. after a timeout. The underlying error
+    is the exception's `__cause__`.
+    """
+    pass
+
+
+# The outcome of one request of a `BookingBatch`: exactly one of `result` and
+# `error` is set, depending on whether the booking succeeded.
+BookingOutcome = namedtuple("BookingOutcome", ["request", "result", "error"])
+
+
+def idempotency_key(request: BookingRequest) -> str:
+    """
+    Returns the request's idempotency key, deriving one from the booking
+    details if it has none, so that resubmitting the same booking reuses the
+    same key.
+    """
+    if request.idempotency_key is not None:
+        return request.idempotency_key
+    fields = [ str(value) for value in request.arguments() ] + [ str(request.confirmed) ]
+    return hashlib.sha1("\x1f".join(fields).encode("utf8")).hexdigest()
+
+
+class IdempotencyStore(object):
+    """
+    Tracks the state of each idempotency key in an SQLite database at `path`
+    (in memory by default; use a file to remember keys across restarts).
+
+    A key is `PENDING` while its booking is being submitted, then
+    `SUCCEEDED` (with the booking ID), `FAILED` if the API rejected the
+    booking, or `UNKNOWN` if the request failed without an answer from the
+    API. Only keys that are new or `FAILED` may be submitted again, unless
+    forced.
+
+    If `max_age` is given, keys not updated for `max_age` seconds are
+    forgotten, as if never submitted; by default keys are kept forever.
+    """
+
+    def __init__(self, path: str=":memory:", clock=time.time, max_age: float=None):
+        self.path = path
+        self.clock = clock
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS idempotency_keys ("
+                    "key TEXT PRIMARY KEY, state TEXT, mvl_booking_id TEXT, "
+                    "updated_at REAL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS idempotency_keys_updated_at "
+                    "ON idempotency_keys (updated_at)")
+
+    def state(self, key: str) -> str:
+        """
+        Returns the state of a key, or None if it has never been submitted.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT state FROM idempotency_keys WHERE key = ?",
+                    (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def begin(self, key: str, force: bool=False) -> BookingResult:
+        """
+        Marks a key `PENDING` before its booking is submitted. If the key has
+        already succeeded, nothing changes and the earlier `BookingResult` is
+        returned instead, so that the booking is not made twice. Raises
+        `DuplicateBookingError` if the key is pending or its outcome unknown,
+        unless `force` is True.
+        """
+        with self._lock, self._db:
+            if self.max_age is not None:
+                self._db.execute("DELETE FROM idempotency_keys WHERE updated_at < ?",
+                        (self.clock() - self.max_age,))
+            row = self._db.execute("SELECT state, mvl_booking_id FROM idempotency_keys "
+                    "WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                state, mvl_booking_id = row
+                if state == SUCCEEDED:
+                    return BookingResult(mvl_booking_id)
+                if state in (PENDING, UNKNOWN) and not force:
+                    raise DuplicateBookingError("Booking %s is %s" % (key, state))
+            self._set(key, PENDING, None)
+        return None
+
+    def succeed(self, key: str, result: BookingResult):
+        with self._lock, self._db:
+            self._set(key, SUCCEEDED, result.mvl_booking_id)
+
+    def fail(self, key: str):
+        with self._lock, self._db:
+            self._set(key, FAILED, None)
+
+    def mark_unknown(self, key: str):
+        with self._lock, self._db:
+            self._set(key, UNKNOWN, None)
+
+    def _set(self, key: str, state: str, mvl_booking_id: str):
+        self._db.execute("INSERT OR REPLACE INTO idempotency_keys VALUES (?, ?, ?, ?)",
+                (key, state, mvl_booking_id, self.clock()))
+
+    def close(self):
+        self._db.close()
+
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def set_shared_store(store: IdempotencyStore):
+    """
+    Installs `store` as the idempotency store of the batches created from now
+    on without one of their own, e.g. a file-backed store that remembers keys
+    across restarts. Pass None to go back to an in-memory store.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        _shared_store = store
+
+
+def get_shared_store() -> IdempotencyStore:
+    """
+    Returns the idempotency store shared by every `BookingBatch` created
+    without one, creating an in-memory store on first use, which forgets keys
+    after `SHARED_STORE_MAX_AGE` seconds so as not to grow without bound.
+    """
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = IdempotencyStore(max_age=SHARED_STORE_MAX_AGE)
+        return _shared_store
+
+
+class BookingBatch(object):
+    """
+    Submits a list of `BookingRequest`s concurrently on `max_workers`
+    threads, all using the client's current token, which is fetched once up
+    front.
+
+    Every request is validated locally first, and invalid requests are not
+    sent. Each booking is guarded by its idempotency key in `store`: a key
+    that already succeeded returns its earlier result without a request,
+    and a key whose outcome is unknown (e.g. after a timeout) is refused
+    with `DuplicateBookingError`, since it may already be booked. Check the
+    booking with MarketingVillas, then resubmit with `force=True` if needed.
+
+    Batches created without a `store` share the process-wide store of
+    `get_shared_store()`, so that a booking retried in a new batch is still
+    guarded. That store is in memory, and forgets keys after
+    `SHARED_STORE_MAX_AGE` seconds, unless another one is installed with
+    `set_shared_store`; keys are only remembered across restarts, or for
+    longer, by a file-backed store.
+    """
+
+    def __init__(self, api: MarketingVillasApi, requests: list, max_workers: int=8,
+            store: IdempotencyStore=None):
+        self.api = api
+        self.requests = list(requests)
+        self.max_workers = max_workers
+        self.store = get_shared_store() if store is None else store
+
+    def submit(self, force: bool=False) -> list:
+        """
+        Returns a `BookingOutcome` per request, in the order of `requests`.
+        """
+        outcomes = [ None ] * len(self.requests)
+        valid = []
+        for index, request in enumerate(self.requests):
+            try:
+                self.validate(request)
+            except BookingValidationError as error:
+                outcomes[index] = BookingOutcome(request, None, error)
+            else:
+                valid.append(index)
+
+        if valid:
+            with ratelimit.priority(ratelimit.BOOKING):
+                self.api.token_manager.get()
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = { index: executor.submit(self._book, self.requests[index], force)
+                        for index in valid }
+            for index, future in futures.items():
+                outcomes[index] = future.result()
+        return outcomes
+
+    def validate(self, request: BookingRequest):
+        """
+        Raises `BookingValidationError` if the request lacks any of the
+        `BOOKING_QUERY_ARGS` the API requires, or has inconsistent values.
+        """
+        if not (isinstance(request.check_in, datetime.date)
+                and isinstance(request.check_out, datetime.date)):
+            raise BookingValidationError("Check-in and check-out must be dates")
+        if request.check_out <= request.check_in:
+            raise BookingValidationError("Check-out must be after check-in")
+        for name in ("adults", "children", "infants"):
+            value = getattr(request, name)
+            if not isinstance(value, int) or value < 0:
+                raise BookingValidationError("Invalid number of %s: %r" % (name, value))
+        if request.adults < 1:
+            raise BookingValidationError("A booking needs at least one adult")
+
+        params = self.api._booking_params(*request.arguments())
+        for key in BOOKING_QUERY_ARGS:
+            if key in CLIENT_QUERY_ARGS or key in OPTIONAL_QUERY_ARGS:
+                continue
+            if params.get(key) is None or params.get(key) == "":
+                raise BookingValidationError("Missing %s" % key)
+
+    def _book(self, request: BookingRequest, force: bool) -> BookingOutcome:
+        key = idempotency_key(request)
+        try:
+            result = self.store.begin(key, force=force)
+        except DuplicateBookingError as error:
+            return BookingOutcome(request, None, error)
+        if result is not None:
+            return BookingOutcome(request, result, None)
+
+        book = (self.api.insert_ta_confirmed_booking if request.confirmed
+                else self.api.insert_ta_hold_booking)
+        try:
+            result = book(*request.arguments())
+        except MarketingVillasApiError as error:
+            # The API answered, or the request was never sent
+            self.store.fail(key)
+            return BookingOutcome(request, None, error)
+        except Exception as error:
+            self.store.mark_unknown(key)
+            unknown = BookingOutcomeUnknown("Outcome of booking %s is unknown: %s" % (key, error))
+            unknown.__cause__ = error
+            return BookingOutcome(request, None, unknown)
+        self.store.succeed(key, result)
+        return BookingOutcome(request, result, None)
@@ -0,0 +1,232 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from .endpoint import MarketingVillasUrls
+
+
+class CacheBackend(object):
+    """
+    Base class for the storage used by `ResponseCache`. Entries are
+    `(expires_at, content)` tuples, where `expires_at` is a `time.time()`
+    timestamp; backends return expired entries too, and leave expiry checks to
+    the cache.
+    """
+
+    def get(self, key: str) -> tuple:
+        raise NotImplementedError
+
+    def set(self, key: str, content: bytes, expires_at: float):
+        raise NotImplementedError
+
+    def touch(self, key: str, expires_at: float):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Keeps entries in memory, evicting the least recently used ones once the
+    response bodies held exceed `max_bytes` in total.
+    """
+
+    def __init__(self, max_bytes: int=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, content: bytes, expires_at: float):
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous[1])
+            if len(content) > self.max_bytes:
+                return
+            self._entries[key] = (expires_at, content)
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def touch(self, key: str, expires_at: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (expires_at, entry[1])
+                self._entries.move_to_end(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class SqliteBackend(CacheBackend):
+    """
+    Keeps entries in an SQLite database at `path`, so that they survive
+    restarts and can be shared between processes. The least recently used
+    entries are evicted once the response bodies stored exceed `max_bytes`.
+
+    Reads don't write to the database: the time each entry was last read is
+    kept in memory, and written back with the next `set` (before evicting)
+    or on `close`.
+    """
+
+    def __init__(self, path: str, max_bytes: int=256 * 1024 * 1024, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._accessed = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, expires_at REAL, accessed_at REAL, "
+                    "size INTEGER, content BLOB)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                    "ON responses (accessed_at)")
+
+    def _write_accessed(self):
+        self._db.executemany("UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [ (accessed_at, key) for key, accessed_at in self._accessed.items() ])
+        self._accessed.clear()
+
+    def get(self, key: str) -> tuple:
+        with self._lock:
+            row = self._db.execute("SELECT expires_at, content FROM responses "
+                    "WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._accessed[key] = self.clock()
+                return row[0], bytes(row[1])
+        return None
+
+    def set(self, key: str, content: bytes, expires_at: float):
+        if len(content) > self.max_bytes:
+            return
+        with self._lock, self._db:
+            self._accessed.pop(key, None)
+            self._write_accessed()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (key, expires_at, self.clock(), len(content), content))
+            total = self._db.execute("SELECT SUM(size) FROM responses").fetchone()[0]
+            rows = self._db.execute("SELECT key, size FROM responses "
+                    "ORDER BY accessed_at, rowid").fetchall() if total > self.max_bytes else []
+            evicted = []
+            for evicted_key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                evicted.append((evicted_key,))
+                total -= size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def touch(self, key: str, expires_at: float):
+        with self._lock, self._db:
+            self._accessed.pop(key, None)
+            self._db.execute("UPDATE responses SET expires_at = ?, accessed_at = ? "
+                    "WHERE key = ?", (expires_at, self.clock(), key))
+
+    def clear(self):
+        with self._lock, self._db:
+            self._accessed.clear()
+            self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        with self._lock:
+            with self._db:
+                self._write_accessed()
+            self._db.close()
+
+
+class ResponseCache(object):
+    """
+    Caches the raw responses of the read-only endpoints of the API, keyed on
+    the endpoint and its query parameters other than `p_Token`.
+
+    `ttls` maps endpoint paths (the first item of a `MarketingVillasUrls`
+    endpoint tuple) to the number of seconds their responses stay fresh,
+    overriding `DEFAULT_TTLS`. Only endpoints listed in `DEFAULT_TTLS` are ever
+    cached; the booking endpoints are not, whatever `ttls` contains.
+
+    When an expired entry is refreshed and the server returns identical
+    content, only the entry's expiry is extended, which spares backends
+    rewriting unchanged data.
+    """
+
+    DEFAULT_TTLS = {
+        MarketingVillasUrls.VILLA_LIST_ENDPOINT[0]: 3600,
+        MarketingVillasUrls.VILLA_RATES_ENDPOINT[0]: 3600,
+        MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT[0]: 300,
+    }
+
+    def __init__(self, backend: CacheBackend=None, ttls: dict=None, clock=time.time):
+        self.backend = MemoryBackend() if backend is None else backend
+        self.ttls = dict(self.DEFAULT_TTLS)
+        for path, ttl in (ttls or {}).items():
+            if path in self.DEFAULT_TTLS:
+                self.ttls[path] = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.unchanged_refreshes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def key_for(cls, endpoint: tuple, get_params: dict) -> str:
+        params = sorted((key, str(value)) for key, value in get_params.items()
+                if key != "p_Token")
+        return endpoint[0] + "?" + urlencode(params)
+
+    def is_cacheable(self, endpoint: tuple) -> bool:
+        return self.ttls.get(endpoint[0], 0) > 0
+
+    def get(self, endpoint: tuple, get_params: dict) -> bytes:
+        """
+        Returns the cached response for the request, or None if there is no
+        fresh entry for it.
+        """
+        if not self.is_cacheable(endpoint):
+            return None
+        entry = self.backend.get(self.key_for(endpoint, get_params))
+        hit = entry is not None and entry[0] > self.clock()
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[1] if hit else None
+
+    def set(self, endpoint: tuple, get_params: dict, content: bytes):
+        if not self.is_cacheable(endpoint):
+            return
+        key = self.key_for(endpoint, get_params)
+        expires_at = self.clock() + self.ttls[endpoint[0]]
+        previous = self.backend.get(key)
+        if previous is not None and previous[1] == content:
+            self.backend.touch(key, expires_at)
+            with self._lock:
+                self.unchanged_refreshes += 1
+        else:
+            self.backend.set(key, content, expires_at)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "unchanged_refreshes": self.unchanged_refreshes
+            }
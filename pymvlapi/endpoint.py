@@ -1,9 +1,24 @@
+import contextlib
+import contextvars
 import datetime
-from urllib.parse import (urljoin, urlparse, parse_qs, urlencode, urlunparse)
-from urllib.request import (urlopen)
+import io
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import (Executor, ThreadPoolExecutor, as_completed)
+from urllib.parse import (urljoin, urlparse, parse_qs, urlunparse, quote_plus)
 from posixpath import join as posixjoin
 from xml.etree import ElementTree as ET
 
+from . import parsing
+from . import ratelimit
+from .auth import TokenManager
+from .coalesce import SingleFlight
+from .instrumentation import (Hooks, CountingReader)
+from .records import (Villa, RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates, BookingResult)
+from .transport import (Transport, PooledTransport, no_resend)
+
 BOOKING_QUERY_ARGS = ["p_Token", "p_UserID", "p_TravelAgentID", "p_VillaID",
         "p_CIDate", "p_CODate", "p_GuestFirstName", "p_GuestLastName", "p_Email",
         "p_CountryOfResidence", "p_MobileNo", "p_TelNo", "p_TotalAdults",
@@ -26,10 +41,70 @@ class MarketingVillasUrls(object):
     INSERT_TA_CONFIRMED_BOOKING = ("/insertTAConfirmedBooking", BOOKING_QUERY_ARGS,)
 
 
+# Matches the strings `quote_plus` leaves unchanged
+_is_url_safe = re.compile(r"[A-Za-z0-9_.~-]*\Z").match
+
+
+def _quote(value) -> str:
+    if not isinstance(value, (str, bytes)):
+        value = str(value)
+    elif isinstance(value, str) and _is_url_safe(value):
+        return value
+    return quote_plus(value)
+
+
+class CompiledEndpoint(object):
+    """
+    An endpoint of `MarketingVillasUrls` resolved against a base URL once, so
+    that building the URL of a request only checks the required parameters
+    and encodes their values.
+    """
+
+    __slots__ = ("path", "required", "url", "_key_prefixes")
+
+    def __init__(self, endpoint: tuple, base_url: str=None):
+        if base_url is None:
+            base_url = MarketingVillasUrls.BASE_URL
+        self.path = endpoint[0]
+        self.required = tuple(endpoint[1])
+        joined_endpoint = urljoin(base_url, posixjoin(MarketingVillasUrls.BASE_PATH,
+            self.path.lstrip("/")))
+        self.url = urlunparse(urlparse(joined_endpoint)._replace(query=""))
+        self._key_prefixes = {}
+
+    def build(self, get_params: dict, token: str=None) -> str:
+        """
+        Returns the URL of a request with `get_params`, followed by `token` as
+        the `p_Token` parameter if it is given. Raises `KeyError` for a
+        missing required parameter. The query is encoded as by `urlencode`.
+        """
+        for key in self.required:
+            if key not in get_params and not (key == "p_Token" and token is not None):
+                raise KeyError(key)
+
+        fields = []
+        prefixes = self._key_prefixes
+        for key, value in get_params.items():
+            prefix = prefixes.get(key)
+            if prefix is None:
+                prefix = prefixes[key] = _quote(key) + "="
+            fields.append(prefix + _quote(value))
+        if token is not None:
+            fields.append("p_Token=" + _quote(token))
+        if not fields:
+            return self.url
+        return self.url + "?" + "&".join(fields)
+
+
 class MarketingVillasApiError(Exception):
     pass
 
 
+# A per-villa outcome of the bulk methods: exactly one of `result` and `error`
+# is set, depending on whether the request for that villa succeeded.
+VillaResult = namedtuple("VillaResult", ["villa_id", "result", "error"])
+
+
 class MarketingVillasApi(object):
     """
     This class encapsulates the MarketingVillas API.
@@ -48,150 +123,546 @@ class MarketingVillasApi(object):
         (typically containing XML-formatted data). These private methods
         bear the same signature as their public counterparts, except the
         method identifier is prefixed with a single underscore.
+
+    The MD5 token required by the data and booking endpoints is cached by a
+    `TokenManager` for `token_ttl` seconds, so that most calls cost a single
+    round-trip. A token rejected by the server is discarded and the request is
+    retried once with a freshly fetched token. Pass `token_ttl=0` to fetch a
+    new token for every request.
+
+    Requests are sent through `transport`, which defaults to a
+    `PooledTransport` keeping persistent connections to the API host.
+    `base_url` overrides `MarketingVillasUrls.BASE_URL`, e.g. to point the
+    client at a staging server or a local stub.
+
+    Responses from the read-only endpoints are cached when a `ResponseCache`
+    is passed as `cache`; a cache hit skips authentication as well.
+
+    A `resilience.ResiliencePolicy` passed as `policy` adds per-endpoint
+    timeouts, retries of the read endpoints, circuit breaking and per-call
+    deadlines; it applies to the bulk methods and `AsyncMarketingVillasApi`
+    as well.
+
+    Requests wait for `rate_limiter`, a `ratelimit.RateLimiter` which may be
+    shared between clients, or for the process-wide limiter installed with
+    `ratelimit.set_shared_limiter`, if any. Bookings have priority over other
+    calls, which have priority over the bulk methods.
+
+    Concurrent calls to the public read methods (and the token methods) with
+    the same arguments are coalesced into a single request, whose result is
+    shared by all of the callers; records returned this way should not be
+    modified. Pass `coalesce=False` to disable this. Bookings are never
+    coalesced.
+
+    Observers registered with `add_hook` are notified of every request made
+    and every response parsed (see `instrumentation.Hooks`). When no hooks
+    are registered, the only cost is a check of an empty list per call.
+
+    Responses of the read endpoints are parsed on `parse_executor`, if given,
+    e.g. a `concurrent.futures.ProcessPoolExecutor`, so that the bulk methods
+    can parse on several cores while their threads wait on the network. The
+    parsers and the records they return are picklable. Token and booking
+    responses, and the streaming methods, are always parsed in the calling
+    thread.
     """
 
-    def __init__(self, user_id: str, password: str, travel_agent_id: int):
+    # Size of the chunks read from the network by the streaming parsers
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # Paths of the endpoints whose responses are parsed on the `parse_executor`
+    EXECUTOR_PARSED_ENDPOINTS = frozenset([
+        MarketingVillasUrls.VILLA_LIST_ENDPOINT[0],
+        MarketingVillasUrls.VILLA_RATES_ENDPOINT[0],
+        MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT[0]
+    ])
+
+    def __init__(self, user_id: str, password: str, travel_agent_id: int,
+            token_ttl: float=60.0, token_refresh_margin: float=None,
+            transport: Transport=None, base_url: str=None, cache=None,
+            policy=None, coalesce: bool=True, rate_limiter=None,
+            parse_executor: Executor=None):
         self.user_id = user_id
         self.password = password
         self.travel_agent_id = travel_agent_id
+        self.transport = PooledTransport() if transport is None else transport
+        self.base_url = base_url
+        self.cache = cache
+        self.policy = policy
+        self.rate_limiter = (ratelimit.get_shared_limiter() if rate_limiter is None
+                else rate_limiter)
+        self.parse_executor = parse_executor
+        self.token_manager = TokenManager(lambda: self.get_md5_token(),
+                ttl=token_ttl, refresh_margin=token_refresh_margin)
+        self._hooks = []
+        self._flights = SingleFlight() if coalesce else None
+
+    def add_hook(self, hook: Hooks):
+        # The list is replaced rather than mutated, so that requests in
+        # progress on other threads keep iterating over a consistent copy
+        self._hooks = self._hooks + [hook]
+
+    def remove_hook(self, hook: Hooks):
+        self._hooks = [ registered for registered in self._hooks if registered is not hook ]
 
 
     # Utilities and common operations
 
+    @property
+    def base_url(self) -> str:
+        return self._base_url
+
+    @base_url.setter
+    def base_url(self, base_url: str):
+        self._base_url = MarketingVillasUrls.BASE_URL if base_url is None else base_url
+        # Endpoints compiled against the previous base URL, keyed on path
+        self._compiled = {}
+
     @classmethod
-    def _construct_endpoint(cls, endpoint: tuple, get_params: dict={}) -> str:
+    def _construct_endpoint(cls, endpoint: tuple, get_params: dict={},
+            base_url: str=None) -> str:
         """
         This function handles construction of API endpoints to be used for
         making HTTP requests. Combined with the `MarketingVillasUrls`, this
         function also verifies that the required GET parameters are being passed.
         """
-        path = endpoint[0]
-        param_keys = endpoint[1]
+        return CompiledEndpoint(endpoint, base_url).build(get_params)
 
-        # Verify required keys are provided
-        for key in param_keys:
-            if key not in get_params:
-                raise KeyError(key)
+    def _endpoint_url(self, endpoint: tuple, get_params: dict, token: str=None) -> str:
+        """
+        Returns the URL of a request to `endpoint` on this client's base URL,
+        compiling the endpoint on first use.
+        """
+        compiled = self._compiled.get(endpoint[0])
+        if compiled is None:
+            compiled = self._compiled[endpoint[0]] = CompiledEndpoint(endpoint, self._base_url)
+        return compiled.build(get_params, token)
 
-        joined_endpoint = urljoin(MarketingVillasUrls.BASE_URL, posixjoin(MarketingVillasUrls.BASE_PATH, path.lstrip("/")))
-        parsed_endpoint = urlparse(joined_endpoint)
-        query_string = urlencode(get_params)
-        result = urlunparse(parsed_endpoint._replace(query=query_string))
-        return result
+    def _make_request(self, url: str, timeout: tuple=None) -> bytes:
+        if timeout is None:
+            return self.transport.request(url)
+        return self.transport.request(url, timeout=timeout)
 
-    @classmethod
-    def _make_request(cls, url: str) -> bytes:
-        with urlopen(url) as response:
-            content = response.read()
-        return content
+    def close(self):
+        """
+        Releases the connections held by the transport.
+        """
+        self.transport.close()
 
     @classmethod
     def _raw_bytes_to_tree(cls, raw: bytes) -> ET.ElementTree:
         return ET.fromstring(raw.decode("utf8"))
 
+    @classmethod
+    def _is_error_response(cls, raw: bytes) -> bool:
+        return b'status="error"' in raw[:512]
+
+    @classmethod
+    def _is_token_rejected(cls, raw: bytes) -> bool:
+        """
+        Returns True if the response reports that the token it was sent with
+        is invalid or has expired.
+        """
+        if not cls._is_error_response(raw):
+            return False
+        try:
+            tree = cls._raw_bytes_to_tree(raw)
+        except ET.ParseError:
+            return False
+        return "token" in "".join(tree.itertext()).lower()
+
+    def _coalesced(self, key: tuple, function):
+        if self._flights is None:
+            return function()
+        return self._flights.do(key, function)
+
+    @classmethod
+    def _endpoint_name(cls, endpoint: tuple) -> str:
+        return endpoint[0].lstrip("/")
+
+    def _notify_request_start(self, hooks: list, endpoint: tuple, url: str) -> float:
+        name = self._endpoint_name(endpoint)
+        for hook in hooks:
+            hook.on_request_start(name, url)
+        return time.perf_counter()
+
+    def _notify_request_end(self, hooks: list, endpoint: tuple, url: str,
+            response_bytes: int, started: float, error: Exception):
+        elapsed = time.perf_counter() - started
+        name = self._endpoint_name(endpoint)
+        for hook in hooks:
+            hook.on_request_end(name, url, response_bytes, elapsed, error)
+
+    @classmethod
+    def _is_booking(cls, endpoint: tuple) -> bool:
+        return endpoint in (MarketingVillasUrls.INSERT_TA_HOLD_BOOKING,
+                MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING)
+
+    @classmethod
+    def _resend_scope(cls, endpoint: tuple):
+        """
+        Returns a context manager stopping the transport from resending a
+        booking on a fresh connection after its pooled one turned out to be
+        closed, as the server may have recorded it.
+        """
+        return no_resend() if cls._is_booking(endpoint) else contextlib.nullcontext()
+
+    @classmethod
+    def _priority_for(cls, endpoint: tuple) -> int:
+        if cls._is_booking(endpoint):
+            return ratelimit.BOOKING
+        current = ratelimit.current_priority()
+        return ratelimit.DEFAULT if current is None else current
+
+    def _call_scope(self, endpoint: tuple):
+        """
+        Returns a context manager applying the policy's deadline and the rate
+        limiting priority of `endpoint` to the requests of a call.
+        """
+        scope = contextlib.ExitStack()
+        if self.policy is not None:
+            scope.enter_context(self.policy.budget())
+        if self.rate_limiter is not None:
+            scope.enter_context(ratelimit.priority(self._priority_for(endpoint)))
+        return scope
+
+    def _send(self, endpoint: tuple, url: str, timeout: tuple=None) -> bytes:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._priority_for(endpoint))
+        hooks = self._hooks
+        if not hooks:
+            return self._make_request(url) if timeout is None else self._make_request(url, timeout)
+
+        started = self._notify_request_start(hooks, endpoint, url)
+        try:
+            resp = self._make_request(url) if timeout is None else self._make_request(url, timeout)
+        except Exception as error:
+            self._notify_request_end(hooks, endpoint, url, 0, started, error)
+            raise
+        self._notify_request_end(hooks, endpoint, url, len(resp), started, None)
+        return resp
+
+    def _request(self, endpoint: tuple, get_params: dict, token: str=None) -> bytes:
+        url = self._endpoint_url(endpoint, get_params, token)
+        with self._resend_scope(endpoint):
+            if self.policy is None:
+                return self._send(endpoint, url)
+            with self.policy.budget():
+                return self.policy.call(endpoint,
+                        lambda timeout: self._send(endpoint, url, timeout))
+
+    def _parse(self, endpoint: tuple, parser, raw: bytes, *args):
+        """
+        Returns `parser(raw, *args)`, timing it for the hooks if any are
+        registered.
+        """
+        hooks = self._hooks
+        if not hooks:
+            return self._run_parser(endpoint, parser, raw, args)
+
+        started = time.perf_counter()
+        try:
+            return self._run_parser(endpoint, parser, raw, args)
+        finally:
+            self._notify_parse_end(hooks, endpoint, raw, started)
+
+    def _notify_parse_end(self, hooks: list, endpoint: tuple, raw: bytes, started: float):
+        elapsed = time.perf_counter() - started
+        name = self._endpoint_name(endpoint)
+        for hook in hooks:
+            hook.on_parse_end(name, len(raw), elapsed)
+
+    def _parses_on_executor(self, endpoint: tuple) -> bool:
+        return self.parse_executor is not None and endpoint[0] in self.EXECUTOR_PARSED_ENDPOINTS
+
+    def _run_parser(self, endpoint: tuple, parser, raw: bytes, args: tuple):
+        if self._parses_on_executor(endpoint):
+            return self.parse_executor.submit(parser, raw, *args).result()
+        return parser(raw, *args)
+
+    def _authenticated_request(self, endpoint: tuple, get_params: dict) -> bytes:
+        """
+        Makes a request to an endpoint requiring a `p_Token` parameter, using
+        the cached token. If the server rejects the token, it is invalidated
+        and the request is retried once with a new one.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, get_params)
+            if cached is not None:
+                return cached
+
+        if self.policy is None and self.rate_limiter is None:
+            return self._fetch_authenticated(endpoint, get_params)
+        # The deadline and priority apply to fetching the token as well
+        with self._call_scope(endpoint):
+            return self._fetch_authenticated(endpoint, get_params)
+
+    def _fetch_authenticated(self, endpoint: tuple, get_params: dict) -> bytes:
+        token = self.token_manager.get()
+        resp = self._request(endpoint, get_params, token)
+        if self._is_token_rejected(resp):
+            self.token_manager.invalidate(token)
+            token = self.token_manager.get()
+            resp = self._request(endpoint, get_params, token)
+
+        if self.cache is not None and not self._is_error_response(resp):
+            self.cache.set(endpoint, get_params, resp)
+        return resp
+
+    def _hash_params(self, time_token: str) -> dict:
+        return {
+            "p_ToHash": "|".join( [self.user_id, self.password, time_token] )
+        }
+
+    def _booking_params(self, villa_id: str,
+            check_in: datetime.datetime, check_out: datetime.datetime,
+            first_name: str, last_name: str, email: str, country: str,
+            mobile: str, telno: str, adults: int, children: int, infants: int,
+            special_requests: str) -> dict:
+        datefmt = "%Y-%m-%d"
+        return {
+            "p_UserID": self.user_id,
+            "p_TravelAgentID": self.travel_agent_id,
+            "p_VillaID": villa_id,
+            "p_CIDate": check_in.strftime(datefmt),
+            "p_CODate": check_out.strftime(datefmt),
+            "p_GuestFirstName": first_name,
+            "p_GuestLastName": last_name,
+            "p_Email": email,
+            "p_CountryOfResidence": country,
+            "p_MobileNo": mobile,
+            "p_TelNo": telno,
+            "p_TotalAdults": adults,
+            "p_TotalChild": children,
+            "p_TotalInfant": infants,
+            "p_SpecialRequest": special_requests
+        }
+
+
+    @classmethod
+    def _iterparse(cls, stream, tag: str):
+        """
+        Parses an XML document incrementally as it is read from `stream`,
+        yielding each element named `tag` as soon as it is complete. Yielded
+        elements are removed from the tree once the consumer resumes, so that
+        memory use does not grow with the size of the document.
+
+        Raises `MarketingVillasApiError` if the document is an error response.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        parents = []
+        root = None
+        while True:
+            chunk = stream.read(cls.STREAM_CHUNK_SIZE)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            for event, element in parser.read_events():
+                if event == "start":
+                    if root is None:
+                        root = element
+                    parents.append(element)
+                    continue
+                parents.pop()
+                if element.tag == tag:
+                    yield element
+                    if parents:
+                        parents[-1].remove(element)
+            if not chunk:
+                break
+
+        if root is not None and root.attrib.get("status", "") == "error":
+            raise MarketingVillasApiError("".join(root.itertext()).strip())
+
+    def _iter_authenticated(self, endpoint: tuple, get_params: dict, tag: str):
+        """
+        The streaming counterpart of `_authenticated_request`, which parses
+        the response as it arrives with `_iterparse`.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(endpoint, get_params)
+            if cached is not None:
+                yield from self._iterparse(io.BytesIO(cached), tag)
+                return
+
+        hooks = self._hooks
+        token = self.token_manager.get()
+        for attempt in range(2):
+            request_uri = self._endpoint_url(endpoint, get_params, token)
+            if hooks:
+                # The request is reported once the response has been parsed
+                started = self._notify_request_start(hooks, endpoint, request_uri)
+                failure, reader = None, None
+            try:
+                with self._open_stream(endpoint, request_uri) as stream:
+                    if hooks:
+                        stream = reader = CountingReader(stream)
+                    try:
+                        yield from self._iterparse(stream, tag)
+                        return
+                    except MarketingVillasApiError as error:
+                        # Error responses carry no records, so nothing has been
+                        # yielded yet and the request can be safely retried
+                        if attempt or "token" not in str(error).lower():
+                            raise
+            except Exception as error:
+                if hooks:
+                    failure = error
+                raise
+            finally:
+                if hooks:
+                    self._notify_request_end(hooks, endpoint, request_uri,
+                            0 if reader is None else reader.bytes_read, started, failure)
+            self.token_manager.invalidate(token)
+            token = self.token_manager.get()
+
+    def _send_stream(self, endpoint: tuple, url: str, timeout: tuple=None):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._priority_for(endpoint))
+        if timeout is None:
+            return self.transport.stream(url)
+        return self.transport.stream(url, timeout=timeout)
+
+    def _open_stream(self, endpoint: tuple, url: str):
+        if self.policy is None:
+            return self._send_stream(endpoint, url)
+        # Only opening the stream is retried, as records may have been
+        # yielded by the time reading it fails
+        with self.policy.budget():
+            return self.policy.call(endpoint,
+                    lambda timeout: self._send_stream(endpoint, url, timeout))
+
+    @classmethod
+    def _bulk_priority(cls):
+        if ratelimit.current_priority() is not None:
+            return contextlib.nullcontext()
+        return ratelimit.priority(ratelimit.BACKGROUND)
+
+    def _fan_out(self, method, villa_ids, max_workers: int):
+        with self._bulk_priority():
+            if villa_ids is None:
+                villa_ids = [villa.villa_id for villa in self.get_villa_list()]
+
+            # Authenticate up front, so that every worker uses the same token
+            self.token_manager.get()
+
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Each call runs in a copy of the caller's context, so that a
+            # deadline set around the bulk call applies to it, and with a
+            # background priority unless the caller chose one
+            with self._bulk_priority():
+                futures = { executor.submit(contextvars.copy_context().run, method, villa_id): villa_id
+                        for villa_id in villa_ids }
+            for future in as_completed(futures):
+                villa_id = futures[future]
+                try:
+                    yield VillaResult(villa_id, future.result(), None)
+                except Exception as error:
+                    yield VillaResult(villa_id, None, error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    # Response parsers, shared with `AsyncMarketingVillasApi`
+
+    @classmethod
+    def _parse_token(cls, raw: bytes) -> str:
+        tree = cls._raw_bytes_to_tree(raw)
+        return tree.text
+
+    @classmethod
+    def _villa_from_element(cls, villa: ET.Element) -> Villa:
+        return parsing.villa_from_element(villa)
+
+    @classmethod
+    def _rate_from_element(cls, rate: ET.Element) -> RatePeriod:
+        return parsing.rate_from_element(rate)
+
+    @classmethod
+    def _unavailable_from_element(cls, unavail: ET.Element) -> UnavailablePeriod:
+        return parsing.unavailable_from_element(unavail)
+
+    @classmethod
+    def _parse_villa_list(cls, raw: bytes) -> list:
+        return parsing.parse_villa_list(raw)
+
+    @classmethod
+    def _parse_villa_rates(cls, raw: bytes, villa_id: str) -> VillaRates:
+        return parsing.parse_villa_rates(raw, villa_id)
+
+    @classmethod
+    def _parse_villa_unavailable_dates(cls, raw: bytes,
+            villa_id: str) -> VillaUnavailableDates:
+        return parsing.parse_villa_unavailable_dates(raw, villa_id)
+
+    @classmethod
+    def _parse_booking(cls, raw: bytes) -> BookingResult:
+        tree = cls._raw_bytes_to_tree(raw)
+        status = tree.attrib.get("status", "")
+        extrainfo = tree[0]
+
+        if status == "error":
+            raise MarketingVillasApiError(extrainfo.text)
+
+        return BookingResult(extrainfo.text)
+
 
     # API endpoints wrapped in member functions
 
     def _get_time_token(self) -> bytes:
-        request_uri = self._construct_endpoint(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, {})
-        resp = self._make_request(request_uri)
-        return resp
+        return self._request(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, {})
 
     def get_time_token(self) -> str:
-        tree = self._raw_bytes_to_tree(self._get_time_token())
-        time_token = tree.text
-        return time_token
+        return self._coalesced((MarketingVillasUrls.TIME_TOKEN_ENDPOINT[0],),
+                lambda: self._parse(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, self._parse_token,
+                    self._get_time_token()))
 
     def _get_md5_token(self) -> bytes:
-        tohash = "|".join( [self.user_id, self.password, self.get_time_token()] )
-        request_uri = self._construct_endpoint(MarketingVillasUrls.MD5_TOKEN_ENDPOINT,
-                {
-                    "p_ToHash": tohash
-                })
-        resp = self._make_request(request_uri)
-        return resp
+        return self._request(MarketingVillasUrls.MD5_TOKEN_ENDPOINT,
+                self._hash_params(self.get_time_token()))
 
     def get_md5_token(self) -> str:
-        tree = self._raw_bytes_to_tree(self._get_md5_token())
-        md5_token = tree.text
-        return md5_token
+        return self._coalesced((MarketingVillasUrls.MD5_TOKEN_ENDPOINT[0],),
+                lambda: self._parse(MarketingVillasUrls.MD5_TOKEN_ENDPOINT, self._parse_token,
+                    self._get_md5_token()))
 
     def _get_villa_list(self) -> bytes:
-        request_uri = self._construct_endpoint(MarketingVillasUrls.VILLA_LIST_ENDPOINT,
+        return self._authenticated_request(MarketingVillasUrls.VILLA_LIST_ENDPOINT,
                 {
-                    "p_Token": self.get_md5_token(),
                     "p_UserID": self.user_id
                 })
-        resp = self._make_request(request_uri)
-        return resp
 
     def get_villa_list(self) -> list:
-        tree = self._raw_bytes_to_tree(self._get_villa_list())
-        villas_element = tree
-        villas_children = villas_element.getchildren()
-        villas_list = [ {
-            "villa_id": villa.attrib["villaid"],
-            "sort_name": villa.attrib["sortname"],
-            "base_url": villa.attrib["baseurl"],
-            "name": villa.text
-        } for villa in villas_children ]
-        return villas_list
+        return self._coalesced((MarketingVillasUrls.VILLA_LIST_ENDPOINT[0],),
+                lambda: self._parse(MarketingVillasUrls.VILLA_LIST_ENDPOINT, self._parse_villa_list,
+                    self._get_villa_list()))
 
     def _get_villa_rates(self, villa_id: str) -> bytes:
-        request_uri = self._construct_endpoint(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
+        return self._authenticated_request(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
                 {
-                    "p_Token": self.get_md5_token(),
                     "p_UserID": self.user_id,
                     "p_VillaID": villa_id
                 })
-        return self._make_request(request_uri)
-
-    def get_villa_rates(self, villa_id: str) -> dict:
-
-        def parse_date(datestr):
-            return datetime.datetime.strptime(datestr, "%Y-%m-%dT00:00:00")
-
-        tree = self._raw_bytes_to_tree(self._get_villa_rates(villa_id))
-        rates_element = tree.getchildren()[0]
-        rates_children = rates_element.getchildren()
-        villa_rates_obj = {
-            "villa_id": villa_id,
-            "rate_name": rates_children[0].text,
-            "rates": [ {
-                "from": parse_date(rate.find("From").text),
-                "to": parse_date(rate.find("To").text),
-                "amount": float(rate.find("Amount").text),
-                "min_stay": int(rate.find("MinimumNightStay").text),
-                "percent_tax": float(rate.find("PercentTax").text),
-                "percent_rate": float(rate.find("PercentRate").text)
-            } for rate in rates_children[1:] ]
-        }
-        return villa_rates_obj
+
+    def get_villa_rates(self, villa_id: str) -> VillaRates:
+        return self._coalesced((MarketingVillasUrls.VILLA_RATES_ENDPOINT[0], villa_id),
+                lambda: self._parse(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
+                    self._parse_villa_rates, self._get_villa_rates(villa_id), villa_id))
 
     def _get_villa_unavailable_dates(self, villa_id: str) -> bytes:
-        request_uri = self._construct_endpoint(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
+        return self._authenticated_request(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
                 {
-                    "p_Token": self.get_md5_token(),
                     "p_UserID": self.user_id,
                     "p_VillaID": villa_id,
                     "p_EquateHoldToBook": "Y"
                 })
-        return self._make_request(request_uri)
-
-    def get_villa_unavailable_dates(self, villa_id: str) -> list:
-
-        def parse_date(datestr):
-            return datetime.datetime.strptime(datestr, "%Y-%m-%d")
 
-        tree = self._raw_bytes_to_tree(self._get_villa_unavailable_dates(villa_id))
-        unavailability_element = tree.getchildren()[0]
-        unavailabile_dates = unavailability_element.getchildren()
-        avail_dict = {}
-        avail_dict["unavailable_dates"] = [ {
-            "from": parse_date( unavail.find("From").text ),
-            "to": parse_date( unavail.find("To").text )
-        } for unavail in unavailabile_dates ]
-        return avail_dict
+    def get_villa_unavailable_dates(self, villa_id: str) -> VillaUnavailableDates:
+        return self._coalesced((MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT[0], villa_id),
+                lambda: self._parse(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
+                    self._parse_villa_unavailable_dates,
+                    self._get_villa_unavailable_dates(villa_id), villa_id))
 
 
     def _insert_ta_hold_booking(self, villa_id: str,
@@ -199,44 +670,21 @@ class MarketingVillasApi(object):
             first_name: str, last_name: str, email: str, country: str,
             mobile: str, telno: str, adults: int, children: int, infants: int,
             special_requests: str) -> bytes:
-        datefmt = "%Y-%m-%d"
-        request_uri = self._construct_endpoint(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING,
-                {
-                    "p_Token": self.get_md5_token(),
-                    "p_UserID": self.user_id,
-                    "p_TravelAgentID": self.travel_agent_id,
-                    "p_VillaID": villa_id,
-                    "p_CIDate": check_in.strftime(datefmt),
-                    "p_CODate": check_out.strftime(datefmt),
-                    "p_GuestFirstName": first_name,
-                    "p_GuestLastName": last_name,
-                    "p_Email": email,
-                    "p_CountryOfResidence": country,
-                    "p_MobileNo": mobile,
-                    "p_TelNo": telno,
-                    "p_TotalAdults": adults,
-                    "p_TotalChild": children,
-                    "p_TotalInfant": infants,
-                    "p_SpecialRequest": special_requests
-                })
-        return self._make_request(request_uri)
+        return self._authenticated_request(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING,
+                self._booking_params(villa_id, check_in, check_out, first_name,
+                    last_name, email, country, mobile, telno, adults, children,
+                    infants, special_requests))
 
 
     def insert_ta_hold_booking(self, villa_id: str,
             check_in: datetime.datetime, check_out: datetime.datetime,
             first_name: str, last_name: str, email: str, country: str,
             mobile: str, telno: str, adults: int, children: int, infants: int,
-            special_requests: str) -> dict:
-        tree = self._raw_bytes_to_tree(self._insert_ta_hold_booking(villa_id,
+            special_requests: str) -> BookingResult:
+        return self._parse(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, self._parse_booking,
+            self._insert_ta_hold_booking(villa_id,
             check_in, check_out, first_name, last_name, email, country, mobile,
             telno, adults, children, infants, special_requests))
-        status = tree.attrib.get("status", "")
-        extrainfo = tree.getchildren()[0]
-
-        if status == "error":
-            raise MarketingVillasApiError(extrainfo.text)
-
-        return { "mvl_booking_id": extrainfo.text }
 
 
     def _insert_ta_confirmed_booking(self, villa_id: str,
@@ -244,42 +692,80 @@ class MarketingVillasApi(object):
             first_name: str, last_name: str, email: str, country: str,
             mobile: str, telno: str, adults: int, children: int, infants: int,
             special_requests: str) -> bytes:
-        datefmt = "%Y-%m-%d"
-        request_uri = self._construct_endpoint(MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING,
-                {
-                    "p_Token": self.get_md5_token(),
-                    "p_UserID": self.user_id,
-                    "p_TravelAgentID": self.travel_agent_id,
-                    "p_VillaID": villa_id,
-                    "p_CIDate": check_in.strftime(datefmt),
-                    "p_CODate": check_out.strftime(datefmt),
-                    "p_GuestFirstName": first_name,
-                    "p_GuestLastName": last_name,
-                    "p_Email": email,
-                    "p_CountryOfResidence": country,
-                    "p_MobileNo": mobile,
-                    "p_TelNo": telno,
-                    "p_TotalAdults": adults,
-                    "p_TotalChild": children,
-                    "p_TotalInfant": infants,
-                    "p_SpecialRequest": special_requests
-                })
-        return self._make_request(request_uri)
+        return self._authenticated_request(MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING,
+                self._booking_params(villa_id, check_in, check_out, first_name,
+                    last_name, email, country, mobile, telno, adults, children,
+                    infants, special_requests))
 
 
     def insert_ta_confirmed_booking(self, villa_id: str,
             check_in: datetime.datetime, check_out: datetime.datetime,
             first_name: str, last_name: str, email: str, country: str,
             mobile: str, telno: str, adults: int, children: int, infants: int,
-            special_requests: str) -> dict:
-        tree = self._raw_bytes_to_tree(self._insert_ta_confirmed_booking(villa_id,
+            special_requests: str) -> BookingResult:
+        return self._parse(MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING, self._parse_booking,
+            self._insert_ta_confirmed_booking(villa_id,
             check_in, check_out, first_name, last_name, email, country, mobile,
             telno, adults, children, infants, special_requests))
-        status = tree.attrib.get("status", "")
-        extrainfo = tree.getchildren()[0]
 
-        if status == "error":
-            raise MarketingVillasApiError(extrainfo.text)
 
-        return { "mvl_booking_id": extrainfo.text }
+    # Streaming variants of the read endpoints
 
+    def iter_villa_list(self):
+        """
+        Yields the villas of `get_villa_list()` one at a time, parsing the
+        response as it is received rather than loading it whole.
+        """
+        for villa in self._iter_authenticated(MarketingVillasUrls.VILLA_LIST_ENDPOINT,
+                {
+                    "p_UserID": self.user_id
+                }, "Villa"):
+            yield self._villa_from_element(villa)
+
+    def iter_villa_rates(self, villa_id: str):
+        """
+        Yields the rate periods of `get_villa_rates(villa_id).rates` one at
+        a time, parsing the response as it is received.
+        """
+        for rate in self._iter_authenticated(MarketingVillasUrls.VILLA_RATES_ENDPOINT,
+                {
+                    "p_UserID": self.user_id,
+                    "p_VillaID": villa_id
+                }, "Rate"):
+            yield self._rate_from_element(rate)
+
+    def iter_villa_unavailable_dates(self, villa_id: str):
+        """
+        Yields the periods of
+        `get_villa_unavailable_dates(villa_id).unavailable_dates` one at a
+        time, parsing the response as it is received.
+        """
+        for unavail in self._iter_authenticated(MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT,
+                {
+                    "p_UserID": self.user_id,
+                    "p_VillaID": villa_id,
+                    "p_EquateHoldToBook": "Y"
+                }, "UnavailableDate"):
+            yield self._unavailable_from_element(unavail)
+
+
+    # Bulk operations
+
+    def get_rates_for_villas(self, villa_ids=None, max_workers: int=8):
+        """
+        Fetches the rates of many villas concurrently on a pool of
+        `max_workers` threads, defaulting to every villa in
+        `get_villa_list()`.
+
+        Yields a `VillaResult` per villa in the order the requests complete.
+        A failed request is reported in the `error` field of its result rather
+        than interrupting the others.
+        """
+        return self._fan_out(self.get_villa_rates, villa_ids, max_workers)
+
+    def get_availability_for_villas(self, villa_ids=None, max_workers: int=8):
+        """
+        Fetches the unavailable dates of many villas concurrently, in the same
+        manner as `get_rates_for_villas`.
+        """
+        return self._fan_out(self.get_villa_unavailable_dates, villa_ids, max_workers)
@@ -0,0 +1,168 @@
+import threading
+from bisect import bisect_left
+
+
+class Hooks(object):
+    """
+    Base class for observers of the requests made by `MarketingVillasApi`,
+    registered with its `add_hook` method. Subclasses override the callbacks
+    they are interested in.
+
+    `endpoint` is the name of the API endpoint (e.g. "getVillaRates"), and
+    durations are in seconds. Token fetches appear as requests to the
+    "Security_GetTimeToken" and "Security_GetMD5Hash" endpoints. Responses
+    served from the cache are neither requested nor reported.
+
+    The streaming `iter_*` methods parse a response while it is received, so
+    they report the request once it has been parsed in full, and don't call
+    `on_parse_end`.
+    """
+
+    def on_request_start(self, endpoint: str, url: str):
+        pass
+
+    def on_request_end(self, endpoint: str, url: str, response_bytes: int,
+            elapsed: float, error: Exception):
+        """
+        Called when a request completes, or fails with `error`, in which case
+        `response_bytes` is zero.
+        """
+        pass
+
+    def on_parse_end(self, endpoint: str, response_bytes: int, elapsed: float):
+        pass
+
+
+class CountingReader(object):
+    """
+    Wraps a file-like response stream, counting the bytes read from it.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.bytes_read = 0
+
+    def read(self, size: int=-1) -> bytes:
+        data = self.stream.read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+class Histogram(object):
+    """
+    Counts observations into cumulative buckets with the given upper bounds,
+    in the manner of a Prometheus histogram.
+    """
+
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """
+        Returns `(upper_bound, count)` pairs, ending with an infinite bound.
+        """
+        total, pairs = 0, []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def as_dict(self) -> dict:
+        return {
+            "buckets": [ [bound, count] for bound, count in self.cumulative() ],
+            "sum": self.sum,
+            "count": self.count
+        }
+
+
+class MetricsCollector(Hooks):
+    """
+    Collects per-endpoint request and error counts, response sizes, and
+    histograms of request and parse durations. The metrics can be exported
+    with `as_dict()`, or with `to_prometheus()` in the Prometheus text
+    exposition format.
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+            1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple=DEFAULT_BUCKETS, prefix: str="pymvlapi"):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _metrics_for(self, endpoint: str) -> dict:
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = {
+                "requests": 0,
+                "errors": 0,
+                "response_bytes": 0,
+                "request_duration": Histogram(self.buckets),
+                "parse_duration": Histogram(self.buckets)
+            }
+        return metrics
+
+    def on_request_end(self, endpoint: str, url: str, response_bytes: int,
+            elapsed: float, error: Exception):
+        with self._lock:
+            metrics = self._metrics_for(endpoint)
+            metrics["requests"] += 1
+            if error is not None:
+                metrics["errors"] += 1
+            metrics["response_bytes"] += response_bytes
+            metrics["request_duration"].observe(elapsed)
+
+    def on_parse_end(self, endpoint: str, response_bytes: int, elapsed: float):
+        with self._lock:
+            self._metrics_for(endpoint)["parse_duration"].observe(elapsed)
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return { endpoint: {
+                "requests": metrics["requests"],
+                "errors": metrics["errors"],
+                "response_bytes": metrics["response_bytes"],
+                "request_duration": metrics["request_duration"].as_dict(),
+                "parse_duration": metrics["parse_duration"].as_dict()
+            } for endpoint, metrics in self._endpoints.items() }
+
+    def to_prometheus(self) -> str:
+        metrics = self.as_dict()
+        lines = []
+
+        def counter(name: str, key: str, description: str):
+            lines.append("# HELP %s_%s %s" % (self.prefix, name, description))
+            lines.append("# TYPE %s_%s counter" % (self.prefix, name))
+            for endpoint, values in sorted(metrics.items()):
+                lines.append('%s_%s{endpoint="%s"} %d' % (self.prefix, name, endpoint, values[key]))
+
+        def histogram(name: str, key: str, description: str):
+            lines.append("# HELP %s_%s %s" % (self.prefix, name, description))
+            lines.append("# TYPE %s_%s histogram" % (self.prefix, name))
+            for endpoint, values in sorted(metrics.items()):
+                for bound, count in values[key]["buckets"]:
+                    lines.append('%s_%s_bucket{endpoint="%s",le="%s"} %d' % (self.prefix,
+                        name, endpoint, "+Inf" if bound == float("inf") else repr(bound), count))
+                lines.append('%s_%s_sum{endpoint="%s"} %r' % (self.prefix, name, endpoint, values[key]["sum"]))
+                lines.append('%s_%s_count{endpoint="%s"} %d' % (self.prefix, name, endpoint, values[key]["count"]))
+
+        counter("requests_total", "requests", "Requests made to the MarketingVillas API.")
+        counter("request_errors_total", "errors", "Requests to the MarketingVillas API that failed.")
+        counter("response_bytes_total", "response_bytes", "Bytes received from the MarketingVillas API.")
+        histogram("request_duration_seconds", "request_duration", "Duration of requests to the MarketingVillas API.")
+        histogram("parse_duration_seconds", "parse_duration", "Duration of parsing MarketingVillas API responses.")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,87 @@
+"""
+Conversion of the XML responses of the API into records.
+
+The dates in the responses always use one of two fixed formats, so they are
+parsed by slicing rather than with `datetime.strptime`, and memoised, since
+rate and availability tables repeat the same dates many times. Values that
+don't match the expected format fall back to `strptime`, which raises the
+usual `ValueError` for malformed input.
+"""
+import datetime
+from functools import lru_cache
+from xml.etree import ElementTree as ET
+
+from .records import (Villa, RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates)
+
+DATE_FORMAT = "%Y-%m-%d"
+MIDNIGHT_DATETIME_FORMAT = "%Y-%m-%dT00:00:00"
+
+# Child elements of a <Rate>, in the order the API sends them
+RATE_TAGS = ("From", "To", "Amount", "MinimumNightStay", "PercentTax", "PercentRate")
+
+
+@lru_cache(maxsize=8192)
+def parse_date(datestr: str) -> datetime.datetime:
+    """
+    Parses a date in the "%Y-%m-%d" format, as used for unavailable dates.
+    """
+    if len(datestr) == 10 and datestr[4] == "-" and datestr[7] == "-":
+        try:
+            return datetime.datetime(int(datestr[:4]), int(datestr[5:7]), int(datestr[8:10]))
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(datestr, DATE_FORMAT)
+
+
+@lru_cache(maxsize=8192)
+def parse_midnight_datetime(datestr: str) -> datetime.datetime:
+    """
+    Parses a date in the "%Y-%m-%dT00:00:00" format, as used for rates.
+    """
+    if len(datestr) == 19 and datestr.endswith("T00:00:00"):
+        return parse_date(datestr[:10])
+    return datetime.datetime.strptime(datestr, MIDNIGHT_DATETIME_FORMAT)
+
+
+def villa_from_element(villa: ET.Element) -> Villa:
+    attrib = villa.attrib
+    return Villa(attrib["villaid"], attrib["sortname"], attrib["baseurl"], villa.text)
+
+
+def rate_from_element(rate: ET.Element) -> RatePeriod:
+    """
+    Converts a <Rate> element in a single pass over its children, looking them
+    up by tag only if they are not in the usual order.
+    """
+    children = list(rate)
+    if tuple(child.tag for child in children) == RATE_TAGS:
+        date_from, date_to, amount, min_stay, percent_tax, percent_rate = [
+            child.text for child in children ]
+    else:
+        texts = { child.tag: child.text for child in children }
+        date_from, date_to, amount, min_stay, percent_tax, percent_rate = [
+            texts[tag] for tag in RATE_TAGS ]
+    return RatePeriod(parse_midnight_datetime(date_from), parse_midnight_datetime(date_to),
+            float(amount), int(min_stay), float(percent_tax), float(percent_rate))
+
+
+def unavailable_from_element(unavail: ET.Element) -> UnavailablePeriod:
+    texts = { child.tag: child.text for child in unavail }
+    return UnavailablePeriod(parse_date(texts["From"]), parse_date(texts["To"]))
+
+
+def parse_villa_list(raw: bytes) -> list:
+    return [ villa_from_element(villa) for villa in ET.fromstring(raw) ]
+
+
+def parse_villa_rates(raw: bytes, villa_id: str) -> VillaRates:
+    rates_children = list(ET.fromstring(raw)[0])
+    return VillaRates(villa_id, rates_children[0].text,
+            [ rate_from_element(rate) for rate in rates_children[1:] ])
+
+
+def parse_villa_unavailable_dates(raw: bytes, villa_id: str) -> VillaUnavailableDates:
+    unavailability_element = ET.fromstring(raw)[0]
+    return VillaUnavailableDates(villa_id,
+            [ unavailable_from_element(unavail) for unavail in unavailability_element ])
@@ -0,0 +1,181 @@
+"""
+Client-side rate limiting of the requests sent to the API.
+
+A `RateLimiter` is a token bucket shared by any number of clients, passed to
+them as `rate_limiter`, or installed for every client in the process with
+`set_shared_limiter`. Requests wait for a token in priority order: bookings
+(`BOOKING`) go ahead of ordinary calls (`DEFAULT`), which go ahead of the
+bulk methods (`BACKGROUND`). Token fetches take the priority of the call that
+needs the token.
+"""
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+
+BOOKING = 0
+DEFAULT = 1
+BACKGROUND = 2
+
+PRIORITY_NAMES = { BOOKING: "booking", DEFAULT: "default", BACKGROUND: "background" }
+
+# Priority of the requests made by the current call, if it sets one
+_priority = contextvars.ContextVar("pymvlapi_priority", default=None)
+
+_shared_limiter = None
+
+
+@contextlib.contextmanager
+def priority(level: int):
+    """
+    Makes the requests within the block, on the current thread or task, wait
+    for the rate limiter with priority `level` (bookings excepted).
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """
+    Returns the priority set by the innermost `priority` block, or None.
+    """
+    return _priority.get()
+
+
+def set_shared_limiter(limiter):
+    """
+    Installs `limiter` as the rate limiter of the clients created from now on
+    without one of their own. Pass None to remove it.
+    """
+    global _shared_limiter
+    _shared_limiter = limiter
+
+
+def get_shared_limiter():
+    return _shared_limiter
+
+
+class RateLimiter(object):
+    """
+    A token bucket admitting `rate` requests per second on average, and
+    bursts of up to `burst` requests (by default, one second's worth).
+
+    Waiting requests are admitted strictly by priority, then in arrival
+    order. `stats()` reports the current queue depth and, per priority, the
+    number of requests admitted and the time they waited.
+    """
+
+    def __init__(self, rate: float, burst: float=None, clock=time.monotonic):
+        self.rate = rate
+        self.burst = max(1.0, rate if burst is None else burst)
+        self.clock = clock
+        self._tokens = self.burst
+        self._updated_at = clock()
+        self._waiting = []
+        self._counter = itertools.count()
+        self._waits = {}
+        self._condition = threading.Condition()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def _enqueue(self, level: int) -> tuple:
+        ticket = (level, next(self._counter))
+        heapq.heappush(self._waiting, ticket)
+        return ticket
+
+    def _abandon(self, ticket: tuple):
+        with self._condition:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._condition.notify_all()
+
+    def _poll(self, ticket: tuple) -> float:
+        """
+        Admits the request holding `ticket` if it is first in line and a token
+        is available, returning 0. Otherwise, returns how long the head of the
+        queue must wait for a token, or None if the request is not first.
+        Must be called with the condition held.
+        """
+        self._refill(self.clock())
+        if self._waiting[0] != ticket:
+            return None
+        if self._tokens >= 1:
+            heapq.heappop(self._waiting)
+            self._tokens -= 1
+            self._condition.notify_all()
+            return 0
+        return (1 - self._tokens) / self.rate
+
+    def _record_wait(self, level: int, waited: float):
+        stats = self._waits.get(level)
+        if stats is None:
+            stats = self._waits[level] = { "admitted": 0, "total_wait": 0.0, "max_wait": 0.0 }
+        stats["admitted"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+
+    def acquire(self, level: int=DEFAULT) -> float:
+        """
+        Blocks until a request with priority `level` may be sent, returning
+        the time waited.
+        """
+        started = self.clock()
+        with self._condition:
+            ticket = self._enqueue(level)
+            try:
+                while True:
+                    delay = self._poll(ticket)
+                    if delay == 0:
+                        break
+                    self._condition.wait(delay)
+            except BaseException:
+                self._abandon(ticket)
+                raise
+            waited = self.clock() - started
+            self._record_wait(level, waited)
+        return waited
+
+    async def acquire_async(self, level: int=DEFAULT) -> float:
+        """
+        The asyncio counterpart of `acquire`, which waits without blocking the
+        event loop.
+        """
+        started = self.clock()
+        with self._condition:
+            ticket = self._enqueue(level)
+        try:
+            while True:
+                with self._condition:
+                    delay = self._poll(ticket)
+                if delay == 0:
+                    break
+                # Requests behind the head of the queue check back after the
+                # time it takes to issue one token
+                await asyncio.sleep(1 / self.rate if delay is None else delay)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        waited = self.clock() - started
+        with self._condition:
+            self._record_wait(level, waited)
+        return waited
+
+    def queue_depth(self) -> int:
+        with self._condition:
+            return len(self._waiting)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {
+                "queue_depth": len(self._waiting),
+                "waits": { PRIORITY_NAMES.get(level, level): dict(stats)
+                    for level, stats in self._waits.items() }
+            }
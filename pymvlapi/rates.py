@@ -0,0 +1,188 @@
+import datetime
+from array import array
+from itertools import accumulate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .records import (Record, VillaRates)
+
+
+class Quote(Record):
+    """
+    The price of a stay from `check_in` to `check_out`, i.e. of the nights
+    starting on each day from `check_in` up to the day before `check_out`.
+
+    `covered` is False if any of those nights has no rate. `min_stay` is the
+    minimum stay of the rate period containing the first night, and `valid` is
+    True only if the stay is covered and at least that long.
+    """
+
+    __slots__ = ("check_in", "check_out", "nights", "subtotal", "tax", "total",
+            "min_stay", "covered", "valid")
+
+    def __init__(self, check_in: datetime.date, check_out: datetime.date,
+            nights: int, subtotal: float, tax: float, min_stay: int, covered: bool):
+        self.check_in = check_in
+        self.check_out = check_out
+        self.nights = nights
+        self.subtotal = subtotal
+        self.tax = tax
+        self.total = round(subtotal + tax, 2)
+        self.min_stay = min_stay
+        self.covered = covered
+        self.valid = covered and nights >= min_stay
+
+
+class RateTable(object):
+    """
+    A villa's rate periods stored column-wise, for pricing many stays quickly.
+
+    The period boundaries are kept as day ordinals and the other fields as
+    parallel columns, using NumPy arrays when NumPy is installed (or
+    `use_numpy` is True) and `array.array` otherwise. Periods include both
+    their first and last days; where periods overlap, the later one wins.
+
+    For quoting, the nightly amount and tax of every day between the first
+    and last periods are accumulated into prefix sums, so that pricing a stay
+    costs a constant number of lookups whatever its length.
+    """
+
+    def __init__(self, villa_id: str, rates: list, use_numpy: bool=None):
+        self.villa_id = villa_id
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        rates = sorted(rates, key=lambda rate: rate.date_from)
+
+        date_from = [ rate.date_from.toordinal() for rate in rates ]
+        date_to = [ rate.date_to.toordinal() for rate in rates ]
+        amount = [ rate.amount for rate in rates ]
+        min_stay = [ rate.min_stay for rate in rates ]
+        percent_tax = [ rate.percent_tax for rate in rates ]
+        percent_rate = [ rate.percent_rate for rate in rates ]
+
+        if self.use_numpy:
+            self.date_from = numpy.array(date_from, dtype=numpy.int64)
+            self.date_to = numpy.array(date_to, dtype=numpy.int64)
+            self.amount = numpy.array(amount, dtype=numpy.float64)
+            self.min_stay = numpy.array(min_stay, dtype=numpy.int64)
+            self.percent_tax = numpy.array(percent_tax, dtype=numpy.float64)
+            self.percent_rate = numpy.array(percent_rate, dtype=numpy.float64)
+        else:
+            self.date_from = array("l", date_from)
+            self.date_to = array("l", date_to)
+            self.amount = array("d", amount)
+            self.min_stay = array("l", min_stay)
+            self.percent_tax = array("d", percent_tax)
+            self.percent_rate = array("d", percent_rate)
+
+        self._build_daily_sums()
+
+    @classmethod
+    def from_villa_rates(cls, villa_rates: VillaRates, use_numpy: bool=None) -> "RateTable":
+        return cls(villa_rates.villa_id, villa_rates.rates, use_numpy=use_numpy)
+
+    def __len__(self) -> int:
+        return len(self.date_from)
+
+    def _build_daily_sums(self):
+        if len(self) == 0:
+            self.first_day = 0
+            self.days = 0
+        else:
+            self.first_day = int(min(self.date_from))
+            self.days = int(max(self.date_to)) - self.first_day + 1
+
+        first_day, days = self.first_day, self.days
+        if self.use_numpy:
+            nightly = numpy.zeros(days)
+            nightly_tax = numpy.zeros(days)
+            covered = numpy.zeros(days, dtype=numpy.int64)
+            min_stay = numpy.zeros(days, dtype=numpy.int64)
+            period = numpy.full(days, -1, dtype=numpy.int64)
+            for i in range(len(self)):
+                start, end = self.date_from[i] - first_day, self.date_to[i] - first_day + 1
+                nightly[start:end] = self.amount[i]
+                nightly_tax[start:end] = self.amount[i] * self.percent_tax[i] / 100.0
+                covered[start:end] = 1
+                min_stay[start:end] = self.min_stay[i]
+                period[start:end] = i
+            self._amount_sums = numpy.concatenate(([0.0], numpy.cumsum(nightly)))
+            self._tax_sums = numpy.concatenate(([0.0], numpy.cumsum(nightly_tax)))
+            self._covered_sums = numpy.concatenate(([0], numpy.cumsum(covered)))
+        else:
+            nightly = array("d", bytes(8 * days))
+            nightly_tax = array("d", bytes(8 * days))
+            covered = array("l", [0]) * days
+            min_stay = array("l", [0]) * days
+            period = array("l", [-1]) * days
+            for i in range(len(self)):
+                start, end = self.date_from[i] - first_day, self.date_to[i] - first_day + 1
+                length = end - start
+                nightly[start:end] = array("d", [self.amount[i]]) * length
+                nightly_tax[start:end] = array("d", [self.amount[i] * self.percent_tax[i] / 100.0]) * length
+                covered[start:end] = array("l", [1]) * length
+                min_stay[start:end] = array("l", [self.min_stay[i]]) * length
+                period[start:end] = array("l", [i]) * length
+            self._amount_sums = array("d", accumulate(nightly, initial=0.0))
+            self._tax_sums = array("d", accumulate(nightly_tax, initial=0.0))
+            self._covered_sums = array("l", accumulate(covered, initial=0))
+        self._daily_min_stay = min_stay
+        self._daily_period = period
+
+    def period_index(self, day: datetime.date) -> int:
+        """
+        Returns the index of the rate period that prices `day`, i.e. the
+        latest of the periods containing it, or -1 if there is none.
+        """
+        offset = day.toordinal() - self.first_day
+        if offset < 0 or offset >= self.days:
+            return -1
+        return int(self._daily_period[offset])
+
+    def quote(self, check_in: datetime.date, check_out: datetime.date) -> Quote:
+        return self.quote_many([(check_in, check_out)])[0]
+
+    def quote_many(self, stays: list) -> list:
+        """
+        Quotes each `(check_in, check_out)` pair in `stays`, returning a list
+        of `Quote`s in the same order.
+        """
+        check_ins = [ stay[0].toordinal() for stay in stays ]
+        check_outs = [ stay[1].toordinal() for stay in stays ]
+        subtotals, taxes, covered_nights, min_stays = self._quote_columns(check_ins, check_outs)
+        return [ Quote(stay[0], stay[1], check_outs[i] - check_ins[i],
+                    round(float(subtotals[i]), 2), round(float(taxes[i]), 2),
+                    int(min_stays[i]),
+                    check_outs[i] > check_ins[i] and covered_nights[i] == check_outs[i] - check_ins[i])
+                for i, stay in enumerate(stays) ]
+
+    def _quote_columns(self, check_ins: list, check_outs: list) -> tuple:
+        """
+        Computes the subtotal, tax, number of nights with a rate and minimum
+        stay of each stay given by day ordinals, as four parallel sequences.
+        """
+        first_day, days = self.first_day, self.days
+        if self.use_numpy:
+            starts = numpy.clip(numpy.array(check_ins, dtype=numpy.int64) - first_day, 0, days)
+            ends = numpy.clip(numpy.array(check_outs, dtype=numpy.int64) - first_day, 0, days)
+            ends = numpy.maximum(starts, ends)
+            subtotals = self._amount_sums[ends] - self._amount_sums[starts]
+            taxes = self._tax_sums[ends] - self._tax_sums[starts]
+            covered_nights = self._covered_sums[ends] - self._covered_sums[starts]
+            min_stays = numpy.zeros(len(check_ins), dtype=numpy.int64)
+            in_range = starts < ends
+            min_stays[in_range] = self._daily_min_stay[starts[in_range]]
+            return subtotals, taxes, covered_nights, min_stays
+
+        subtotals, taxes, covered_nights, min_stays = [], [], [], []
+        amount_sums, tax_sums, covered_sums = self._amount_sums, self._tax_sums, self._covered_sums
+        for check_in, check_out in zip(check_ins, check_outs):
+            start = min(max(check_in - first_day, 0), days)
+            end = max(min(max(check_out - first_day, 0), days), start)
+            subtotals.append(amount_sums[end] - amount_sums[start])
+            taxes.append(tax_sums[end] - tax_sums[start])
+            covered_nights.append(covered_sums[end] - covered_sums[start])
+            min_stays.append(self._daily_min_stay[start] if start < end else 0)
+        return subtotals, taxes, covered_nights, min_stays
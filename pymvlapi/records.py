@@ -0,0 +1,150 @@
+import datetime
+
+
+class Record(object):
+    """
+    Base class for the compact, `__slots__`-based records returned by
+    `MarketingVillasApi`. Records compare equal field by field, and
+    `as_dict()` returns the dictionary the client returned for the same data
+    before records were introduced.
+    """
+
+    __slots__ = ()
+
+    # Keys used by `as_dict()` for fields whose attribute name differs
+    _dict_keys = {}
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __hash__(self):
+        return hash(tuple(self._hashable(getattr(self, name)) for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ", ".join("%s=%r" % (name, getattr(self, name)) for name in self.__slots__)
+        return "%s(%s)" % (type(self).__name__, fields)
+
+    @staticmethod
+    def _hashable(value):
+        return tuple(value) if isinstance(value, list) else value
+
+    def as_dict(self) -> dict:
+        return { self._dict_keys.get(name, name): self._dict_value(getattr(self, name))
+                for name in self.__slots__ }
+
+    @staticmethod
+    def _dict_value(value):
+        if isinstance(value, list):
+            return [ item.as_dict() if isinstance(item, Record) else item for item in value ]
+        return value
+
+
+class Villa(Record):
+    __slots__ = ("villa_id", "sort_name", "base_url", "name")
+
+    def __init__(self, villa_id: str, sort_name: str, base_url: str, name: str):
+        self.villa_id = villa_id
+        self.sort_name = sort_name
+        self.base_url = base_url
+        self.name = name
+
+
+class RatePeriod(Record):
+    """
+    The nightly `amount` charged for stays from `date_from` to `date_to`
+    inclusive, with the minimum stay, tax and rate percentages that apply.
+    """
+
+    __slots__ = ("date_from", "date_to", "amount", "min_stay", "percent_tax",
+            "percent_rate")
+    _dict_keys = { "date_from": "from", "date_to": "to" }
+
+    def __init__(self, date_from: datetime.datetime, date_to: datetime.datetime,
+            amount: float, min_stay: int, percent_tax: float, percent_rate: float):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.amount = amount
+        self.min_stay = min_stay
+        self.percent_tax = percent_tax
+        self.percent_rate = percent_rate
+
+
+class VillaRates(Record):
+    __slots__ = ("villa_id", "rate_name", "rates")
+
+    def __init__(self, villa_id: str, rate_name: str, rates: list):
+        self.villa_id = villa_id
+        self.rate_name = rate_name
+        self.rates = rates
+
+
+class UnavailablePeriod(Record):
+    __slots__ = ("date_from", "date_to")
+    _dict_keys = { "date_from": "from", "date_to": "to" }
+
+    def __init__(self, date_from: datetime.datetime, date_to: datetime.datetime):
+        self.date_from = date_from
+        self.date_to = date_to
+
+
+class VillaUnavailableDates(Record):
+    __slots__ = ("villa_id", "unavailable_dates")
+
+    def __init__(self, villa_id: str, unavailable_dates: list):
+        self.villa_id = villa_id
+        self.unavailable_dates = unavailable_dates
+
+    def as_dict(self) -> dict:
+        # The dictionary format predates records and carries no villa ID
+        return { "unavailable_dates": self._dict_value(self.unavailable_dates) }
+
+
+class BookingResult(Record):
+    __slots__ = ("mvl_booking_id",)
+
+    def __init__(self, mvl_booking_id: str):
+        self.mvl_booking_id = mvl_booking_id
+
+
+class BookingRequest(Record):
+    """
+    The arguments of one `insert_ta_hold_booking` call (or, if `confirmed` is
+    True, `insert_ta_confirmed_booking`), for submission in a
+    `booking.BookingBatch`. `idempotency_key` identifies the booking across
+    resubmissions; if it is None, a key is derived from the booking details.
+    """
+
+    __slots__ = ("villa_id", "check_in", "check_out", "first_name", "last_name",
+            "email", "country", "mobile", "telno", "adults", "children", "infants",
+            "special_requests", "confirmed", "idempotency_key")
+
+    def __init__(self, villa_id: str, check_in: datetime.datetime,
+            check_out: datetime.datetime, first_name: str, last_name: str,
+            email: str, country: str, mobile: str, telno: str="", adults: int=1,
+            children: int=0, infants: int=0, special_requests: str="",
+            confirmed: bool=False, idempotency_key: str=None):
+        self.villa_id = villa_id
+        self.check_in = check_in
+        self.check_out = check_out
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.country = country
+        self.mobile = mobile
+        self.telno = telno
+        self.adults = adults
+        self.children = children
+        self.infants = infants
+        self.special_requests = special_requests
+        self.confirmed = confirmed
+        self.idempotency_key = idempotency_key
+
+    def arguments(self) -> tuple:
+        """
+        Returns the positional arguments of the booking methods.
+        """
+        return (self.villa_id, self.check_in, self.check_out, self.first_name,
+                self.last_name, self.email, self.country, self.mobile, self.telno,
+                self.adults, self.children, self.infants, self.special_requests)
@@ -0,0 +1,154 @@
+"""
+Recording of API responses to an on-disk archive, and replay of them without
+a network, e.g. to warm caches before the API is reachable, or for repeatable
+load tests of the parsers.
+
+An archive is a directory holding the response bodies back to back in
+`responses.bin`, and `index.json`, which maps each request's normalized URL
+to the offset and length of its body. The URL is normalized by dropping the
+scheme and host, and the token parameters, whose values change with every
+token, and by sorting the query, so that an archive replays for any token and
+base URL (though not for another user ID).
+
+Bookings are never recorded nor replayed: a replayed booking would report a
+stale booking ID as a success without reaching the API, and the archive would
+keep the guests' personal details.
+
+    api = MarketingVillasApi(..., transport=RecordingTransport(PooledTransport(), "archive"))
+    api.get_rates_for_villas()
+    api.close()
+
+    api = MarketingVillasApi(..., transport=ReplayTransport("archive"))
+"""
+import json
+import mmap
+import os
+import threading
+from urllib.parse import (urlsplit, parse_qsl, urlencode)
+
+from .endpoint import MarketingVillasUrls
+from .transport import Transport
+
+DATA_FILE = "responses.bin"
+INDEX_FILE = "index.json"
+
+# Query parameters left out of the normalized URLs, as their values are tied
+# to a token: the token itself, and the time token hashed for the MD5 token
+VOLATILE_PARAMS = frozenset(["p_Token", "p_ToHash"])
+
+# Paths of the endpoints passed through by `RecordingTransport` and refused by
+# `ReplayTransport`
+BOOKING_PATHS = (MarketingVillasUrls.INSERT_TA_HOLD_BOOKING[0],
+    MarketingVillasUrls.INSERT_TA_CONFIRMED_BOOKING[0])
+
+
+class NotRecordedError(LookupError):
+    """
+    Raised by `ReplayTransport` for a request missing from its archive.
+    """
+    pass
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key not in VOLATILE_PARAMS)
+    return parts.path + ("?" + urlencode(query) if query else "")
+
+
+def is_booking_url(url: str) -> bool:
+    return urlsplit(url).path.endswith(BOOKING_PATHS)
+
+
+def _load_index(path: str) -> dict:
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as index_file:
+            return { key: tuple(entry) for key, entry in json.load(index_file).items() }
+    except FileNotFoundError:
+        return {}
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests through `transport`, appending every successful response
+    but those of bookings to the archive at `path`, which is created if
+    needed. Responses recorded earlier for the same normalized URL are
+    superseded.
+
+    The index is written by `flush` and `close`; closing also closes the
+    wrapped transport.
+    """
+
+    def __init__(self, transport: Transport, path: str):
+        self.transport = transport
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._index = _load_index(path)
+        self._data = open(os.path.join(path, DATA_FILE), "ab")
+        self._lock = threading.Lock()
+
+    def _record(self, url: str, content: bytes):
+        with self._lock:
+            offset = self._data.tell()
+            self._data.write(content)
+            self._index[normalize_url(url)] = (offset, len(content))
+
+    def request(self, url: str, timeout: tuple=None) -> bytes:
+        if timeout is None:
+            content = self.transport.request(url)
+        else:
+            content = self.transport.request(url, timeout=timeout)
+        if not is_booking_url(url):
+            self._record(url, content)
+        return content
+
+    def flush(self):
+        with self._lock:
+            self._data.flush()
+            index_path = os.path.join(self.path, INDEX_FILE)
+            with open(index_path + ".tmp", "w") as index_file:
+                json.dump(self._index, index_file, sort_keys=True)
+            os.replace(index_path + ".tmp", index_path)
+
+    def close(self):
+        try:
+            self.flush()
+            self._data.close()
+        finally:
+            self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Serves requests from the archive at `path`, memory-mapped, without any
+    network access. Requests missing from the archive, and bookings, raise
+    `NotRecordedError`. `timeout` is accepted and ignored.
+
+    Wrap it in an `ExecutorTransport` for `AsyncMarketingVillasApi`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._index = _load_index(path)
+        self._data = b""
+        with open(os.path.join(path, DATA_FILE), "rb") as data_file:
+            if os.fstat(data_file.fileno()).st_size > 0:
+                self._data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, url: str) -> bool:
+        return not is_booking_url(url) and normalize_url(url) in self._index
+
+    def request(self, url: str, timeout: tuple=None) -> bytes:
+        # Archives written before bookings were skipped may still hold some
+        entry = None if is_booking_url(url) else self._index.get(normalize_url(url))
+        if entry is None:
+            raise NotRecordedError(url)
+        offset, length = entry
+        return self._data[offset:offset + length]
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
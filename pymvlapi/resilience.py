@@ -0,0 +1,294 @@
+"""
+Timeouts, retries, circuit breaking and deadlines for the requests made by
+`MarketingVillasApi` and `AsyncMarketingVillasApi`, configured by passing a
+`ResiliencePolicy` as their `policy`.
+"""
+import asyncio
+import contextlib
+import contextvars
+import http.client
+import random
+import threading
+import time
+from urllib.error import HTTPError
+
+from .endpoint import (MarketingVillasUrls, MarketingVillasApiError)
+from .transport import PoolTimeout
+
+# Monotonic time by which the requests of the current call must complete
+_deadline = contextvars.ContextVar("pymvlapi_deadline", default=None)
+
+
+class CircuitOpenError(MarketingVillasApiError):
+    """
+    Raised without contacting the API while its circuit breaker is open.
+    """
+    pass
+
+
+class DeadlineExceeded(MarketingVillasApiError):
+    """
+    Raised when a call runs out of its deadline budget before a request could
+    be made or retried.
+    """
+    pass
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """
+    Bounds the time spent on the requests made within the block, on the
+    current thread or task, to `seconds` in total. A deadline nested within
+    another can shorten it, but not extend it.
+
+        with deadline(5.0):
+            api.get_villa_rates("Adasa")
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None and current < expires_at:
+        expires_at = current
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float:
+    """
+    Returns the seconds left before the current deadline, or None if there is
+    no deadline.
+    """
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return expires_at - time.monotonic()
+
+
+class CircuitBreaker(object):
+    """
+    Fails requests fast while the API is down. After `failure_threshold`
+    consecutive failed requests the circuit opens, and requests raise
+    `CircuitOpenError` for `reset_timeout` seconds. A single trial request
+    is then let through: the circuit closes again if it succeeds, and
+    re-opens if it fails.
+
+    A breaker can be shared by several clients talking to the same host.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int=5, reset_timeout: float=30.0,
+            clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def before_request(self) -> bool:
+        """
+        Raises `CircuitOpenError` unless a request may be made now. Returns
+        True if the request is the trial of a half-open circuit, whose
+        outcome must then be recorded whatever it is, or the circuit would
+        stay half-open.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            raise CircuitOpenError("Circuit open after %d consecutive failures" % self.failures)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+    def release_trial(self):
+        """
+        Gives up a trial request that never reached the server, leaving the
+        circuit open, with the next request as its trial.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+
+class ResiliencePolicy(object):
+    """
+    Governs how requests to the API are timed out and retried.
+
+    Each request gets a `(connect, read)` timeout pair: the one given for its
+    endpoint path in `timeouts` (e.g. `{"/getMVLVillaList": (5.0, 60.0)}`),
+    or `default_timeout`. Requests to the endpoints in `RETRY_ENDPOINTS`,
+    which are idempotent, are retried up to `retries` times after connection
+    errors, timeouts and 5xx or 429 responses, waiting a random delay of up to
+    `backoff_base * 2 ** attempt` (capped at `backoff_max`) seconds between
+    attempts. Bookings are never retried, as a failed attempt may still have
+    been recorded by the server.
+
+    If a `CircuitBreaker` is given, it sees every request, bookings included.
+    A `PoolTimeout`, raised when no pooled connection became free in time, is
+    neither retried nor counted as a failure, as the server was never asked.
+    If `deadline` is set, each public API call (including fetching its token
+    and any retries) must complete within that many seconds; timeouts are
+    shortened to fit, and `DeadlineExceeded` is raised once it has passed.
+    """
+
+    RETRY_ENDPOINTS = frozenset([
+        MarketingVillasUrls.TIME_TOKEN_ENDPOINT[0],
+        MarketingVillasUrls.MD5_TOKEN_ENDPOINT[0],
+        MarketingVillasUrls.VILLA_LIST_ENDPOINT[0],
+        MarketingVillasUrls.VILLA_RATES_ENDPOINT[0],
+        MarketingVillasUrls.VILLA_UNAVAILABLE_DATES_ENDPOINT[0],
+    ])
+
+    def __init__(self, timeouts: dict=None, default_timeout: tuple=(10.0, 30.0),
+            retries: int=2, backoff_base: float=0.1, backoff_max: float=2.0,
+            circuit_breaker: CircuitBreaker=None, deadline: float=None,
+            sleep=time.sleep, random=random.random):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.circuit_breaker = circuit_breaker
+        self.deadline = deadline
+        self.sleep = sleep
+        self.random = random
+
+    def budget(self):
+        """
+        Returns a context manager applying the policy's deadline to the
+        requests made within it, unless a deadline is already in force.
+        """
+        if self.deadline is None:
+            return contextlib.nullcontext()
+        return deadline(self.deadline)
+
+    def timeout_for(self, endpoint: tuple) -> tuple:
+        """
+        Returns the `(connect, read)` timeouts of the next request to
+        `endpoint`, shortened to the time left before the deadline.
+        """
+        connect_timeout, read_timeout = self.timeouts.get(endpoint[0], self.default_timeout)
+        remaining = remaining_time()
+        if remaining is None:
+            return connect_timeout, read_timeout
+        if remaining <= 0:
+            raise DeadlineExceeded("Deadline exceeded before requesting %s" % endpoint[0])
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+    @classmethod
+    def is_transient(cls, error: Exception) -> bool:
+        """
+        Returns True for errors worth retrying, which are also those counted
+        as failures by the circuit breaker. A `PoolTimeout` is not: it only
+        means the client's own connection pool is exhausted.
+        """
+        if isinstance(error, PoolTimeout):
+            return False
+        if isinstance(error, HTTPError):
+            return error.code >= 500 or error.code == 429
+        return isinstance(error, (OSError, http.client.HTTPException))
+
+    def backoff(self, attempt: int) -> float:
+        return self.random() * min(self.backoff_max, self.backoff_base * 2 ** attempt)
+
+    def _retry_delay(self, endpoint: tuple, attempt: int, error: Exception,
+            trial: bool) -> float:
+        """
+        Records the failure of an attempt, returning how long to wait before
+        the next one, or None if the error should be raised. Any failure of a
+        circuit breaker's trial request re-opens the circuit, unless the
+        request never left the connection pool.
+        """
+        transient = self.is_transient(error)
+        if trial and isinstance(error, PoolTimeout):
+            self.circuit_breaker.release_trial()
+        elif (transient or trial) and self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
+        if not transient or attempt >= self.retries or endpoint[0] not in self.RETRY_ENDPOINTS:
+            return None
+        delay = self.backoff(attempt)
+        remaining = remaining_time()
+        if remaining is not None and delay >= remaining:
+            return None
+        return delay
+
+    def _before_attempt(self, endpoint: tuple) -> tuple:
+        """
+        Returns the timeout of the next attempt, and whether it is the trial
+        request of a half-open circuit.
+        """
+        timeout = self.timeout_for(endpoint)
+        if self.circuit_breaker is None:
+            return timeout, False
+        return timeout, self.circuit_breaker.before_request()
+
+    def _after_interruption(self, trial: bool):
+        # A trial cancelled or interrupted before its outcome was known
+        if trial:
+            self.circuit_breaker.record_failure()
+
+    def _after_success(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+
+    def call(self, endpoint: tuple, send):
+        """
+        Returns `send(timeout)`, retrying it according to the policy.
+        """
+        attempt = 0
+        while True:
+            timeout, trial = self._before_attempt(endpoint)
+            try:
+                result = send(timeout)
+            except Exception as error:
+                delay = self._retry_delay(endpoint, attempt, error, trial)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._after_interruption(trial)
+                raise
+            else:
+                self._after_success()
+                return result
+            self.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, endpoint: tuple, send):
+        """
+        The asyncio counterpart of `call`, for a coroutine function `send`.
+        """
+        attempt = 0
+        while True:
+            timeout, trial = self._before_attempt(endpoint)
+            try:
+                result = await send(timeout)
+            except Exception as error:
+                delay = self._retry_delay(endpoint, attempt, error, trial)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._after_interruption(trial)
+                raise
+            else:
+                self._after_success()
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
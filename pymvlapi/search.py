@@ -0,0 +1,252 @@
+"""
+Searches for villas free for a stay, within a budget, answered from an
+in-memory copy of the catalogue rather than from the API.
+"""
+import datetime
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .availability import AvailabilityIndex
+from .rates import (RateTable, Quote)
+from .records import (Record, Villa, VillaRates)
+from .sync import (DeltaSync, SnapshotStore, VILLA, RATES, UNAVAILABLE_DATES, REMOVED,
+    serialize, content_hash)
+
+
+class SearchResult(Record):
+    """
+    A villa matching a search, with the `Quote` for the stay searched for.
+    """
+
+    __slots__ = ("villa_id", "villa", "quote")
+
+    def __init__(self, villa_id: str, villa: Villa, quote: Quote):
+        self.villa_id = villa_id
+        self.villa = villa
+        self.quote = quote
+
+
+class _RateColumns(object):
+    """
+    The prefix sums and daily minimum stays of every villa's `RateTable`,
+    concatenated into single NumPy arrays, so that a stay can be quoted for
+    many villas at once. Row `i` holds the villa `villa_ids[i]`.
+    """
+
+    def __init__(self, rate_tables: dict, capacities: dict):
+        self.villa_ids = list(rate_tables)
+        self.rows = { villa_id: row for row, villa_id in enumerate(self.villa_ids) }
+        tables = [ rate_tables[villa_id] for villa_id in self.villa_ids ]
+        self.first_day = numpy.array([ table.first_day for table in tables ], dtype=numpy.int64)
+        self.days = numpy.array([ table.days for table in tables ], dtype=numpy.int64)
+        self.capacity = numpy.array([ capacities.get(villa_id, 0) for villa_id in self.villa_ids ],
+                dtype=numpy.int64)
+        # Each villa has `days + 1` prefix sums and `days` minimum stays
+        self.sums_offset = numpy.concatenate(([0], numpy.cumsum(self.days + 1)[:-1]))
+        self.min_stay_offset = numpy.concatenate(([0], numpy.cumsum(self.days)[:-1]))
+        self.amount_sums = self._concatenate(tables, "_amount_sums", numpy.float64)
+        self.tax_sums = self._concatenate(tables, "_tax_sums", numpy.float64)
+        self.covered_sums = self._concatenate(tables, "_covered_sums", numpy.int64)
+        self.min_stay = self._concatenate(tables, "_daily_min_stay", numpy.int64)
+
+    @classmethod
+    def _concatenate(cls, tables: list, name: str, dtype):
+        return numpy.concatenate([ numpy.zeros(0, dtype=dtype) ] + [
+            numpy.asarray(getattr(table, name), dtype=dtype) for table in tables ])
+
+    def quote(self, rows, check_in: int, check_out: int) -> tuple:
+        """
+        Computes the subtotal, tax, number of nights with a rate and minimum
+        stay of a stay given by day ordinals, for each villa in `rows`, in the
+        manner of `RateTable._quote_columns`.
+        """
+        first_day, days = self.first_day[rows], self.days[rows]
+        starts = numpy.clip(check_in - first_day, 0, days)
+        ends = numpy.maximum(starts, numpy.clip(check_out - first_day, 0, days))
+        sums_offset = self.sums_offset[rows]
+        subtotals = self.amount_sums[sums_offset + ends] - self.amount_sums[sums_offset + starts]
+        taxes = self.tax_sums[sums_offset + ends] - self.tax_sums[sums_offset + starts]
+        covered_nights = (self.covered_sums[sums_offset + ends]
+                - self.covered_sums[sums_offset + starts])
+        min_stays = numpy.zeros(len(rows), dtype=numpy.int64)
+        in_range = starts < ends
+        min_stays[in_range] = self.min_stay[self.min_stay_offset[rows][in_range] + starts[in_range]]
+        return subtotals, taxes, covered_nights, min_stays
+
+
+class Catalogue(object):
+    """
+    Keeps the villa list, a `RateTable` per villa and an `AvailabilityIndex`
+    of every villa in memory, for `search` to answer without any request.
+
+    `refresh()` brings the catalogue up to date with a `DeltaSync` against
+    `store` (a fresh in-memory `SnapshotStore` by default, which must not be
+    shared), rebuilding only the villas whose records changed since the
+    previous refresh. `refresh_villa` re-fetches a single villa, e.g. after
+    booking it.
+
+    The API doesn't report how many guests a villa sleeps, so capacities are
+    supplied as a `{villa_id: guests}` dictionary in `capacities`, or with
+    `set_capacity`; searches for a number of guests skip villas of unknown
+    capacity.
+
+    With NumPy installed (or `use_numpy` True), a search quotes every free
+    villa at once from the rate tables' prefix sums, concatenated into single
+    arrays on the first search after the catalogue changes; otherwise villas
+    are quoted one at a time.
+    """
+
+    def __init__(self, api, capacities: dict=None, store: SnapshotStore=None,
+            max_workers: int=8, use_numpy: bool=None):
+        self.api = api
+        self.capacities = dict(capacities or {})
+        self.store = SnapshotStore() if store is None else store
+        self.max_workers = max_workers
+        self.use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self.villas = {}
+        self.rate_tables = {}
+        self.availability = AvailabilityIndex()
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.villas)
+
+    def set_capacity(self, villa_id: str, guests: int):
+        with self._lock:
+            self.capacities[villa_id] = guests
+            self._columns = None
+
+    def refresh(self) -> dict:
+        """
+        Applies the changes found by a `DeltaSync` run, returning the errors
+        raised while fetching individual villas, keyed on `(kind, villa_id)`.
+        Villas that could not be fetched keep their previous records.
+        """
+        result = DeltaSync(self.api, self.store, max_workers=self.max_workers).run()
+        self.apply(result.changes)
+        return result.errors
+
+    def refresh_villa(self, villa_id: str):
+        """
+        Re-fetches the rates and unavailable dates of one villa, recording
+        them in `store` too, so that the next `refresh()` compares the villa
+        with what the catalogue holds.
+        """
+        rates = self.api.get_villa_rates(villa_id)
+        unavailable = self.api.get_villa_unavailable_dates(villa_id)
+        upserts = []
+        for kind, record in ((RATES, rates), (UNAVAILABLE_DATES, unavailable)):
+            payload = serialize(record)
+            upserts.append((kind, villa_id, content_hash(payload), payload))
+        with self._lock:
+            self.store.write(upserts, [])
+            self._set_rates(rates)
+            self.availability.update(unavailable)
+            self._columns = None
+
+    def apply(self, changes: list):
+        """
+        Applies a list of `sync.Change`s to the catalogue.
+        """
+        with self._lock:
+            self._columns = None
+            for change in changes:
+                if change.kind == VILLA:
+                    if change.action == REMOVED:
+                        self._remove_villa(change.villa_id)
+                    else:
+                        self.villas[change.villa_id] = change.record
+                elif change.kind == RATES:
+                    if change.action == REMOVED:
+                        self.rate_tables.pop(change.villa_id, None)
+                    else:
+                        self._set_rates(change.record)
+                elif change.kind == UNAVAILABLE_DATES:
+                    if change.action == REMOVED:
+                        if change.villa_id in self.availability:
+                            self.availability.remove(change.villa_id)
+                    else:
+                        self.availability.update(change.record)
+
+    def _set_rates(self, rates: VillaRates):
+        self.rate_tables[rates.villa_id] = RateTable.from_villa_rates(rates,
+                use_numpy=self.use_numpy)
+
+    def _remove_villa(self, villa_id: str):
+        self.villas.pop(villa_id, None)
+        self.rate_tables.pop(villa_id, None)
+        if villa_id in self.availability:
+            self.availability.remove(villa_id)
+
+    def search(self, check_in: datetime.date, check_out: datetime.date,
+            guests: int=None, budget: float=None, limit: int=None) -> list:
+        """
+        Returns a `SearchResult` for every listed villa that is free for the
+        whole stay, has a rate for every night, accepts stays of its length
+        (by the minimum stay of the rate period of the first night) and, if
+        given, sleeps at least `guests` and costs at most `budget` including
+        tax. Results are sorted by total price, then villa ID, and cut to
+        `limit` if given.
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out must be after check-in")
+
+        with self._lock:
+            free = [ villa_id for villa_id in self.availability.free_villas(check_in, check_out)
+                    if villa_id in self.villas and villa_id in self.rate_tables ]
+            if self.use_numpy:
+                results = self._search_columns(free, check_in, check_out, guests, budget, limit)
+            else:
+                results = self._search_tables(free, check_in, check_out, guests, budget)
+
+        results.sort(key=lambda result: (result.quote.total, result.villa_id))
+        return results if limit is None else results[:limit]
+
+    def _search_tables(self, villa_ids: list, check_in: datetime.date,
+            check_out: datetime.date, guests: int, budget: float) -> list:
+        results = []
+        for villa_id in villa_ids:
+            if guests is not None and self.capacities.get(villa_id, 0) < guests:
+                continue
+            quote = self.rate_tables[villa_id].quote(check_in, check_out)
+            if quote.valid and (budget is None or quote.total <= budget):
+                results.append(SearchResult(villa_id, self.villas[villa_id], quote))
+        return results
+
+    def _search_columns(self, villa_ids: list, check_in: datetime.date,
+            check_out: datetime.date, guests: int, budget: float, limit: int) -> list:
+        if self._columns is None:
+            self._columns = _RateColumns(self.rate_tables, self.capacities)
+        columns = self._columns
+        rows = numpy.array([ columns.rows[villa_id] for villa_id in villa_ids ], dtype=numpy.int64)
+        if guests is not None:
+            rows = rows[columns.capacity[rows] >= guests]
+
+        first_night, last_day = check_in.toordinal(), check_out.toordinal()
+        nights = last_day - first_night
+        subtotals, taxes, covered_nights, min_stays = columns.quote(rows, first_night, last_day)
+        totals = subtotals + taxes
+        # Totals are rounded, and compared exactly, once quoted below, so the
+        # matches are narrowed down with a cent of slack
+        matches = (covered_nights == nights) & (min_stays <= nights)
+        if budget is not None:
+            matches &= totals <= budget + 0.01
+        matches = numpy.flatnonzero(matches)
+        if limit is not None and limit < len(matches):
+            cutoff = numpy.partition(totals[matches], limit - 1)[limit - 1]
+            matches = matches[totals[matches] <= cutoff + 0.01]
+
+        results = []
+        for row, subtotal, tax, min_stay in zip(rows[matches].tolist(),
+                subtotals[matches].tolist(), taxes[matches].tolist(), min_stays[matches].tolist()):
+            quote = Quote(check_in, check_out, nights, round(subtotal, 2), round(tax, 2),
+                    min_stay, True)
+            if budget is None or quote.total <= budget:
+                villa_id = columns.villa_ids[row]
+                results.append(SearchResult(villa_id, self.villas[villa_id], quote))
+        return results
@@ -0,0 +1,171 @@
+import datetime
+import hashlib
+import json
+import sqlite3
+import threading
+
+from .records import Record
+
+VILLA = "villa"
+RATES = "rates"
+UNAVAILABLE_DATES = "unavailable_dates"
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+
+
+class Change(Record):
+    """
+    A difference between the snapshot and the API: a record of `kind` (one of
+    `VILLA`, `RATES` and `UNAVAILABLE_DATES`) for villa `villa_id` that was
+    `ADDED`, `CHANGED` or `REMOVED`. `record` holds the new record, and is
+    None for removals.
+    """
+
+    __slots__ = ("kind", "villa_id", "action", "record")
+
+    def __init__(self, kind: str, villa_id: str, action: str, record: Record):
+        self.kind = kind
+        self.villa_id = villa_id
+        self.action = action
+        self.record = record
+
+
+class SyncResult(Record):
+    """
+    The outcome of a `DeltaSync.run()`: the list of `Change`s applied to the
+    snapshot, and a dictionary of the exceptions raised while fetching
+    individual villas, keyed on `(kind, villa_id)`. The snapshot of a villa
+    that could not be fetched is left as it was.
+    """
+
+    __slots__ = ("changes", "errors")
+
+    def __init__(self, changes: list, errors: dict):
+        self.changes = changes
+        self.errors = errors
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(repr(value))
+
+
+def serialize(record: Record) -> str:
+    """
+    Returns the canonical JSON form of a record, from which its content hash
+    is computed.
+    """
+    return json.dumps(record.as_dict(), sort_keys=True, separators=(",", ":"),
+            default=_json_default)
+
+
+def content_hash(payload: str) -> str:
+    return hashlib.sha1(payload.encode("utf8")).hexdigest()
+
+
+class SnapshotStore(object):
+    """
+    Keeps the last synchronised copy of the catalogue in an SQLite database at
+    `path`, as one row per kind of record and villa holding the record's JSON
+    form and its content hash.
+    """
+
+    def __init__(self, path: str=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("CREATE TABLE IF NOT EXISTS snapshot ("
+                    "kind TEXT, villa_id TEXT, hash TEXT, payload TEXT, "
+                    "PRIMARY KEY (kind, villa_id))")
+
+    def hashes(self, kind: str) -> dict:
+        with self._lock:
+            return dict(self._db.execute("SELECT villa_id, hash FROM snapshot "
+                    "WHERE kind = ?", (kind,)))
+
+    def load(self, kind: str) -> dict:
+        """
+        Returns the stored records of a kind as dictionaries (in the format of
+        their `as_dict()`, with dates as ISO 8601 strings), keyed on villa ID.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT villa_id, payload FROM snapshot "
+                    "WHERE kind = ?", (kind,)).fetchall()
+        return { villa_id: json.loads(payload) for villa_id, payload in rows }
+
+    def write(self, upserts: list, removals: list):
+        """
+        Applies `(kind, villa_id, hash, payload)` upserts and `(kind,
+        villa_id)` removals in a single transaction.
+        """
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?, ?)", upserts)
+            self._db.executemany("DELETE FROM snapshot WHERE kind = ? AND villa_id = ?", removals)
+
+    def close(self):
+        self._db.close()
+
+
+class DeltaSync(object):
+    """
+    Synchronises a `SnapshotStore` with the API, reporting only what changed.
+
+    Each `run()` re-fetches the villa list, then the rates and unavailable
+    dates of every villa with the API's bulk methods on `max_workers`
+    threads. Records are compared with the snapshot by content hash, and the
+    snapshot is updated with the differences, which are returned.
+    """
+
+    def __init__(self, api, store: SnapshotStore, max_workers: int=8):
+        self.api = api
+        self.store = store
+        self.max_workers = max_workers
+
+    def run(self) -> SyncResult:
+        villas = { villa.villa_id: villa for villa in self.api.get_villa_list() }
+        villa_ids = list(villas)
+        errors = {}
+
+        rates, failed = self._collect(RATES,
+                self.api.get_rates_for_villas(villa_ids, max_workers=self.max_workers), errors)
+        unavailable, failed_unavailable = self._collect(UNAVAILABLE_DATES,
+                self.api.get_availability_for_villas(villa_ids, max_workers=self.max_workers), errors)
+
+        changes, upserts, removals = [], [], []
+        self._diff(VILLA, villas, set(), changes, upserts, removals)
+        self._diff(RATES, rates, failed, changes, upserts, removals)
+        self._diff(UNAVAILABLE_DATES, unavailable, failed_unavailable, changes, upserts, removals)
+        self.store.write(upserts, removals)
+        return SyncResult(changes, errors)
+
+    @classmethod
+    def _collect(cls, kind: str, results, errors: dict) -> tuple:
+        records, failed = {}, set()
+        for result in results:
+            if result.error is None:
+                records[result.villa_id] = result.result
+            else:
+                errors[(kind, result.villa_id)] = result.error
+                failed.add(result.villa_id)
+        return records, failed
+
+    def _diff(self, kind: str, records: dict, failed: set, changes: list,
+            upserts: list, removals: list):
+        previous = self.store.hashes(kind)
+        for villa_id, record in records.items():
+            payload = serialize(record)
+            digest = content_hash(payload)
+            previous_digest = previous.get(villa_id)
+            if previous_digest == digest:
+                continue
+            changes.append(Change(kind, villa_id,
+                ADDED if previous_digest is None else CHANGED, record))
+            upserts.append((kind, villa_id, digest, payload))
+        for villa_id in previous:
+            if villa_id not in records and villa_id not in failed:
+                changes.append(Change(kind, villa_id, REMOVED, None))
+                removals.append((kind, villa_id))
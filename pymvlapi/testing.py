@@ -0,0 +1,234 @@
+"""
+A local stand-in for the MarketingVillas `partners.asmx` web service, for use
+in tests and benchmarks.
+"""
+import datetime
+import gzip
+import threading
+import time
+from http.server import (BaseHTTPRequestHandler, ThreadingHTTPServer)
+from urllib.parse import (parse_qs, urlsplit)
+from xml.sax.saxutils import quoteattr
+
+from .endpoint import MarketingVillasUrls
+
+SAMPLE_RESPONSES = {
+    "Security_GetTimeToken": b'<?xml version="1.0" encoding="utf-8"?>\r\n<string xmlns="http://ws.marketingvillas.com/partners/">1e8046523db8ad1d376df5e1447f3b4a</string>',
+    "Security_GetMD5Hash": b'<?xml version="1.0" encoding="utf-8"?>\r\n<string xmlns="http://ws.marketingvillas.com/partners/">0c959320c1e7804cbd91c9125b1c1d21</string>',
+    "getMVLVillaList": b'<?xml version="1.0" encoding="utf-8"?>\r\n<Villas>\r\n  <Villa villaid="39LightHouse" sortname="39 Galle Fort" baseurl="39-galle-fort">No. 39 Galle Fort</Villa>\r\n  <Villa villaid="Adasa" sortname="Adasa" baseurl="laksmana-estate-villa-adasa">Villa Adasa</Villa>\r\n</Villas>',
+    "getVillaRates": b'<?xml version="1.0" encoding="utf-8"?>\r\n<Villa villaid="Arnalaya">\r\n  <Rates ratenameid="983">\r\n    <RateName><![CDATA[Standard Rate]]></RateName>\r\n    <Rate>\r\n      <From>2017-02-05T00:00:00</From>\r\n      <To>2017-03-31T00:00:00</To>\r\n      <Amount>1895.00</Amount>\r\n      <MinimumNightStay>2</MinimumNightStay>\r\n      <PercentTax>10.00</PercentTax>\r\n      <PercentRate>5.00</PercentRate>\r\n    </Rate>\r\n  </Rates>\r\n</Villa>',
+    "getVillaUnavailableDates": b'<?xml version="1.0" encoding="utf-8"?>\r\n<Availability>\r\n  <UnavailableDates villaid="arnalaya">\r\n    <UnavailableDate>\r\n      <From>2017-02-24</From>\r\n      <To>2017-03-03</To>\r\n    </UnavailableDate>\r\n  </UnavailableDates>\r\n</Availability>',
+    "insertTAHoldBooking": b'<?xml version="1.0" encoding="utf-8"?>\r\n<Response status="ok">\r\n  <ExtraInfo>20170329180131JD</ExtraInfo>\r\n</Response>',
+    "insertTAConfirmedBooking": b'<?xml version="1.0" encoding="utf-8"?>\r\n<Response status="ok">\r\n  <ExtraInfo>20170329180131JD</ExtraInfo>\r\n</Response>',
+}
+
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\r\n'
+
+
+def villa_list_response(villa_count: int) -> bytes:
+    """
+    Generates a `getMVLVillaList` response listing `villa_count` villas.
+    """
+    villas = "".join('  <Villa villaid="Villa%d" sortname="Villa %d" baseurl="villa-%d">Villa %d</Villa>\r\n'
+            % (villa, villa, villa, villa) for villa in range(villa_count))
+    return (XML_DECLARATION + "<Villas>\r\n" + villas + "</Villas>").encode("utf8")
+
+
+def villa_rates_response(villa_id: str, periods: int) -> bytes:
+    """
+    Generates a `getVillaRates` response with `periods` consecutive weekly
+    rate periods.
+    """
+    start = datetime.date(2017, 1, 1)
+    rates = "".join("    <Rate>\r\n"
+            "      <From>%sT00:00:00</From>\r\n"
+            "      <To>%sT00:00:00</To>\r\n"
+            "      <Amount>%d.00</Amount>\r\n"
+            "      <MinimumNightStay>2</MinimumNightStay>\r\n"
+            "      <PercentTax>10.00</PercentTax>\r\n"
+            "      <PercentRate>5.00</PercentRate>\r\n"
+            "    </Rate>\r\n" % (start + datetime.timedelta(days=period * 7),
+                start + datetime.timedelta(days=period * 7 + 6), 1000 + period % 50)
+            for period in range(periods))
+    return (XML_DECLARATION + "<Villa villaid=%s>\r\n" % quoteattr(villa_id)
+            + '  <Rates ratenameid="983">\r\n'
+            + "    <RateName><![CDATA[Standard Rate]]></RateName>\r\n"
+            + rates + "  </Rates>\r\n</Villa>").encode("utf8")
+
+
+def villa_unavailable_dates_response(villa_id: str, periods: int) -> bytes:
+    """
+    Generates a `getVillaUnavailableDates` response with `periods` unavailable
+    periods of three nights, one every ten days.
+    """
+    start = datetime.date(2017, 1, 1)
+    dates = "".join("    <UnavailableDate>\r\n"
+            "      <From>%s</From>\r\n"
+            "      <To>%s</To>\r\n"
+            "    </UnavailableDate>\r\n" % (start + datetime.timedelta(days=period * 10),
+                start + datetime.timedelta(days=period * 10 + 2))
+            for period in range(periods))
+    return (XML_DECLARATION + "<Availability>\r\n"
+            + "  <UnavailableDates villaid=%s>\r\n" % quoteattr(villa_id)
+            + dates + "  </UnavailableDates>\r\n</Availability>").encode("utf8")
+
+
+class MockMarketingVillasServer(object):
+    """
+    Serves canned responses for the `MarketingVillasUrls` endpoints over
+    HTTP/1.1 with keep-alive, on a random local port, from a background
+    thread. Responses are gzip-encoded for clients that accept it.
+
+    `responses` maps endpoint names (e.g. "getVillaRates") to response bodies,
+    overriding `SAMPLE_RESPONSES`. Alternatively, larger payloads can be
+    generated by giving the number of villas listed (`villa_count`), of rate
+    periods per villa (`rate_periods`) and of unavailable periods per villa
+    (`unavailable_periods`). Every response is delayed by `latency` seconds.
+
+    The server counts the connections it accepts and the requests it serves,
+    so tests can check connection reuse. Failures can be injected into the
+    next requests with `add_fault`.
+
+        with MockMarketingVillasServer() as server:
+            api = MarketingVillasApi("user", "pass", 1, base_url=server.url)
+            api.get_villa_list()
+    """
+
+    def __init__(self, responses: dict=None, host: str="127.0.0.1", port: int=0,
+            villa_count: int=None, rate_periods: int=None,
+            unavailable_periods: int=None, latency: float=0.0):
+        self.responses = dict(SAMPLE_RESPONSES)
+        if villa_count is not None:
+            self.responses["getMVLVillaList"] = villa_list_response(villa_count)
+        self.responses.update(responses or {})
+        self.rate_periods = rate_periods
+        self.unavailable_periods = unavailable_periods
+        self.latency = latency
+        self._generated = {}
+        self.connection_count = 0
+        self.request_count = 0
+        self.requested_paths = []
+        self._faults = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return "http://%s:%d/" % (host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                kwargs={ "poll_interval": 0.05 }, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def add_fault(self, endpoint_name: str=None, status: int=503, delay: float=0.0,
+            drop: bool=False, count: int=1):
+        """
+        Makes the next `count` requests to `endpoint_name` (or to any endpoint,
+        if it is None) fail. Each is delayed by `delay` seconds, then answered
+        with an empty `status` response, or, if `drop` is True, with the
+        connection closed without a response. A `status` of None sends the
+        normal response after the delay, which is useful to trigger timeouts.
+        """
+        with self._lock:
+            self._faults.append({ "endpoint_name": endpoint_name, "status": status,
+                "delay": delay, "drop": drop, "count": count })
+
+    def _take_fault(self, endpoint_name: str) -> dict:
+        with self._lock:
+            for fault in self._faults:
+                if fault["endpoint_name"] in (None, endpoint_name):
+                    fault["count"] -= 1
+                    if not fault["count"]:
+                        self._faults.remove(fault)
+                    return fault
+        return None
+
+    def body_for(self, endpoint_name: str, query: str) -> bytes:
+        """
+        Returns the response body for a request. Subclasses may override this
+        to generate responses dynamically.
+        """
+        if endpoint_name == "getVillaRates" and self.rate_periods is not None:
+            return self._generate(villa_rates_response, query, self.rate_periods)
+        if endpoint_name == "getVillaUnavailableDates" and self.unavailable_periods is not None:
+            return self._generate(villa_unavailable_dates_response, query, self.unavailable_periods)
+        return self.responses.get(endpoint_name)
+
+    def _generate(self, generator, query: str, periods: int) -> bytes:
+        villa_id = parse_qs(query).get("p_VillaID", [""])[0]
+        key = (generator, villa_id)
+        body = self._generated.get(key)
+        if body is None:
+            body = self._generated[key] = generator(villa_id, periods)
+        return body
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle's
+            # algorithm delays every keep-alive response by tens of ms
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connection_count += 1
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                base_path = MarketingVillasUrls.BASE_PATH.rstrip("/") + "/"
+                endpoint_name = (parts.path[len(base_path):]
+                        if parts.path.startswith(base_path) else None)
+                with server._lock:
+                    server.request_count += 1
+                    server.requested_paths.append(self.path)
+
+                fault = server._take_fault(endpoint_name)
+                if fault is not None:
+                    time.sleep(fault["delay"])
+                    if fault["drop"]:
+                        self.close_connection = True
+                        return
+                if server.latency:
+                    time.sleep(server.latency)
+                body = server.body_for(endpoint_name, parts.query)
+                if fault is not None and fault["status"] is not None:
+                    self.send_response(fault["status"])
+                    body = b""
+                elif body is None:
+                    self.send_response(404)
+                    body = b"Not Found"
+                else:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/xml; charset=utf-8")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
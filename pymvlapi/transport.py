@@ -0,0 +1,353 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import gzip
+import http.client
+import io
+import threading
+from collections import deque
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+# Whether a request that fails because the server closed an idle keep-alive
+# connection may be resent on a new connection
+_resend_stale = contextvars.ContextVar("pymvlapi_resend_stale", default=True)
+
+
+@contextlib.contextmanager
+def no_resend():
+    """
+    Stops `PooledTransport` from resending the requests made within the block
+    when it finds that their pooled connection was closed. The server may
+    have received such a request, so it must not be sent twice unless it is
+    idempotent, which bookings are not.
+    """
+    token = _resend_stale.set(False)
+    try:
+        yield
+    finally:
+        _resend_stale.reset(token)
+
+
+class Transport(object):
+    """
+    Base class for the objects `MarketingVillasApi` uses to perform HTTP GET
+    requests. Subclasses implement `request`, returning the body of the
+    response as bytes, and may implement `close` to release any resources.
+
+    `timeout`, when given, is a `(connect, read)` pair of timeouts in seconds
+    overriding the transport's own for one request.
+    """
+
+    def request(self, url: str, timeout: tuple=None) -> bytes:
+        raise NotImplementedError
+
+    def stream(self, url: str, timeout: tuple=None):
+        """
+        Returns a readable, closeable file-like object over the body of the
+        response, for incremental parsing. Transports that cannot stream
+        return the complete response wrapped in a `BytesIO`.
+        """
+        if timeout is None:
+            return io.BytesIO(self.request(url))
+        return io.BytesIO(self.request(url, timeout=timeout))
+
+    def close(self):
+        pass
+
+
+class UrllibTransport(Transport):
+    """
+    Opens a new connection with `urllib.request.urlopen` for every request.
+    As `urlopen` takes a single timeout, the longer of a `(connect, read)`
+    pair passed to `request` is used.
+    """
+
+    def __init__(self, timeout: float=None):
+        self.timeout = timeout
+
+    def request(self, url: str, timeout: tuple=None) -> bytes:
+        if timeout is not None:
+            timeout = max(timeout)
+        elif self.timeout is not None:
+            timeout = self.timeout
+        kwargs = {} if timeout is None else { "timeout": timeout }
+        with urlopen(url, **kwargs) as response:
+            content = response.read()
+        return content
+
+
+class PoolTimeout(TimeoutError):
+    """
+    Raised when no pooled connection became free within the connect timeout.
+    """
+    pass
+
+
+class _ConnectionPool(object):
+    """
+    A bounded pool of keep-alive connections to a single origin. At most
+    `size` connections are open at once for requests; callers beyond that
+    wait for a connection to be released. Streams borrow connections outside
+    that bound, since a stream may be held open while its reader makes other
+    requests, and up to `size` idle connections are kept for reuse.
+    """
+
+    def __init__(self, scheme: str, host: str, port: int, size: int,
+            connect_timeout: float):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.size = size
+        self.connect_timeout = connect_timeout
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def new_connection(self) -> http.client.HTTPConnection:
+        connection_class = (http.client.HTTPSConnection if self.scheme == "https"
+                else http.client.HTTPConnection)
+        return connection_class(self.host, self.port, timeout=self.connect_timeout)
+
+    def acquire(self, timeout: float=None) -> tuple:
+        """
+        Returns a `(connection, reused)` tuple, where `reused` is True if the
+        connection has already served a request. Raises `PoolTimeout` if no
+        connection is free within `timeout` seconds.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout("No connection to %s:%s became free within %s seconds" % (
+                self.host, self.port, timeout))
+        return self.borrow()
+
+    def borrow(self) -> tuple:
+        """
+        Returns a connection in the manner of `acquire`, without waiting for
+        one of the `size` connections to be free. Borrowed connections are
+        released with `counted=False`.
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self.new_connection(), False
+
+    def release(self, connection: http.client.HTTPConnection, reusable: bool,
+            counted: bool=True):
+        with self._lock:
+            keep = reusable and len(self._idle) < self.size
+            if keep:
+                self._idle.append(connection)
+        if not keep:
+            connection.close()
+        if counted:
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+
+
+class _StreamedResponse(object):
+    """
+    A response body being read from a connection borrowed from a pool. Closing
+    it returns the connection to the pool if the body was read in full, and
+    discards the connection otherwise.
+    """
+
+    def __init__(self, response: http.client.HTTPResponse, pool: _ConnectionPool,
+            connection: http.client.HTTPConnection):
+        self.response = response
+        self.pool = pool
+        self.connection = connection
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            self.body = gzip.GzipFile(fileobj=response, mode="rb")
+        else:
+            self.body = response
+
+    def read(self, size: int=-1) -> bytes:
+        return self.body.read(size)
+
+    def close(self):
+        if self.connection is None:
+            return
+        reusable = self.response.isclosed() and not self.response.will_close
+        self.pool.release(self.connection, reusable, counted=False)
+        self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PooledTransport(Transport):
+    """
+    Keeps a bounded pool of persistent HTTP/1.1 connections per origin, so that
+    consecutive requests to the API skip the TCP (and TLS) handshake.
+
+    `connect_timeout` bounds waiting for a free connection (raising
+    `PoolTimeout`) and establishing one, and `read_timeout` bounds each wait
+    for data once connected. Responses are requested with gzip
+    content-encoding when `gzip` is True, and decoded transparently.
+
+    Streams are not counted against `pool_size`, so that requests made while
+    reading a stream do not wait for it to finish.
+    """
+
+    # Errors indicating that the server closed an idle keep-alive connection
+    STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected,
+            ConnectionResetError, BrokenPipeError)
+
+    def __init__(self, pool_size: int=4, connect_timeout: float=10.0,
+            read_timeout: float=30.0, gzip: bool=True):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.gzip = gzip
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool_for(self, scheme: str, host: str, port: int) -> _ConnectionPool:
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = _ConnectionPool(scheme, host, port, self.pool_size,
+                        self.connect_timeout)
+                self._pools[key] = pool
+        return pool
+
+    def _send(self, connection: http.client.HTTPConnection, path: str,
+            timeout: tuple) -> http.client.HTTPResponse:
+        connect_timeout, read_timeout = ((self.connect_timeout, self.read_timeout)
+                if timeout is None else timeout)
+        if connection.sock is None:
+            connection.timeout = connect_timeout
+            connection.connect()
+        connection.sock.settimeout(read_timeout)
+        headers = { "Accept-Encoding": "gzip" if self.gzip else "identity" }
+        connection.request("GET", path, headers=headers)
+        return connection.getresponse()
+
+    def _open(self, url: str, timeout: tuple, counted: bool=True) -> tuple:
+        """
+        Sends a request on a pooled connection, returning the pool, the
+        connection and the response, whose body is still to be read. Streams
+        pass `counted=False` to borrow a connection.
+        """
+        parts = urlsplit(url)
+        pool = self._pool_for(parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or "/") + ("?" + parts.query if parts.query else "")
+
+        if counted:
+            connection, reused = pool.acquire(self.connect_timeout if timeout is None
+                    else timeout[0])
+        else:
+            connection, reused = pool.borrow()
+        try:
+            try:
+                response = self._send(connection, path, timeout)
+            except self.STALE_CONNECTION_ERRORS:
+                if not reused or not _resend_stale.get():
+                    raise
+                connection.close()
+                response = self._send(connection, path, timeout)
+        except BaseException:
+            pool.release(connection, False, counted)
+            raise
+        return pool, connection, response
+
+    def request(self, url: str, timeout: tuple=None) -> bytes:
+        pool, connection, response = self._open(url, timeout)
+        reusable = False
+        try:
+            content = response.read()
+            reusable = not response.will_close
+        finally:
+            pool.release(connection, reusable)
+
+        if response.getheader("Content-Encoding", "").lower() == "gzip":
+            content = gzip.decompress(content)
+        if response.status >= 400:
+            raise HTTPError(url, response.status, response.reason,
+                    response.headers, io.BytesIO(content))
+        return content
+
+    def stream(self, url: str, timeout: tuple=None) -> _StreamedResponse:
+        pool, connection, response = self._open(url, timeout, counted=False)
+        streamed = _StreamedResponse(response, pool, connection)
+        if response.status >= 400:
+            try:
+                content = streamed.read()
+            finally:
+                streamed.close()
+            raise HTTPError(url, response.status, response.reason,
+                    response.headers, io.BytesIO(content))
+        return streamed
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
+
+
+class AsyncTransport(object):
+    """
+    Base class for the transports used by `AsyncMarketingVillasApi`, whose
+    `request` and `close` methods are coroutines. `request` takes the same
+    optional `timeout` pair as `Transport.request`.
+    """
+
+    async def request(self, url: str, timeout: tuple=None) -> bytes:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class ExecutorTransport(AsyncTransport):
+    """
+    Runs a blocking `Transport` on an executor (the event loop's default
+    thread pool unless `executor` is given), so that requests do not block the
+    event loop. Requests run in a copy of the calling task's context.
+    """
+
+    def __init__(self, transport: Transport=None, executor=None):
+        self.transport = PooledTransport() if transport is None else transport
+        self.executor = executor
+
+    async def request(self, url: str, timeout: tuple=None) -> bytes:
+        loop = asyncio.get_running_loop()
+        run = contextvars.copy_context().run
+        if timeout is None:
+            return await loop.run_in_executor(self.executor, run, self.transport.request, url)
+        return await loop.run_in_executor(self.executor,
+                functools.partial(run, self.transport.request, url, timeout=timeout))
+
+    async def close(self):
+        self.transport.close()
+
+
+class AiohttpTransport(AsyncTransport):
+    """
+    Sends requests with an existing `aiohttp.ClientSession`, which remains
+    owned (and closed) by the caller.
+    """
+
+    def __init__(self, session):
+        self.session = session
+
+    async def request(self, url: str, timeout: tuple=None) -> bytes:
+        kwargs = {}
+        if timeout is not None:
+            import aiohttp
+            kwargs["timeout"] = aiohttp.ClientTimeout(sock_connect=timeout[0],
+                    sock_read=timeout[1])
+        async with self.session.get(url, **kwargs) as response:
+            response.raise_for_status()
+            return await response.read()
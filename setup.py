@@ -11,7 +11,7 @@ setup(
     download_url="https://github.com/mbwk/pymvlapi/tarball/0.0.4",
     author="Red Ape Solutions Sdn Bhd",
     author_email="karl@redapesolutions.com",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     zip_safe=False
 )
 
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+from concurrent.futures import ProcessPoolExecutor
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.aio import AsyncMarketingVillasApi
+from pymvlapi.endpoint import MarketingVillasApiError
+from pymvlapi.testing import MockMarketingVillasServer
+from pymvlapi.transport import AsyncTransport
+
+
+class CountingTransport(AsyncTransport):
+    """
+    Answers every request with the same body after a short delay, recording
+    the highest number of requests in flight at once.
+    """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.request_count = 0
+
+    async def request(self, url: str) -> bytes:
+        self.request_count += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.body
+
+
+class AsyncEndpointTestCase(TestCase):
+    def test_fetches_from_server(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=server.url)
+            try:
+                return (await api.get_villa_list(),
+                        await api.get_villa_rates("Arnalaya"),
+                        await api.get_villa_unavailable_dates("Arnalaya"))
+            finally:
+                await api.close()
+
+        with MockMarketingVillasServer() as server:
+            villas, rates, unavailable = asyncio.run(run())
+
+        self.assertEqual([villa.villa_id for villa in villas], ["39LightHouse", "Adasa"])
+        self.assertEqual(rates.rates[0].amount, 1895.00)
+        self.assertEqual(unavailable.unavailable_dates[0].date_from, datetime.datetime(2017, 2, 24))
+        # Two token requests, then one request per call
+        self.assertEqual(server.request_count, 5)
+
+    def test_limits_requests_in_flight(self):
+        transport = CountingTransport(b'<Villa villaid="x"><Rates><RateName>Standard</RateName></Rates></Villa>')
+        api = AsyncMarketingVillasApi("", "", 1218, transport=transport, max_concurrency=3)
+
+        async def token():
+            return "token"
+        api.get_md5_token = token
+
+        async def run():
+            return await asyncio.gather(*[api.get_villa_rates(str(i)) for i in range(12)])
+
+        results = asyncio.run(run())
+        self.assertEqual(len(results), 12)
+        self.assertEqual(transport.request_count, 12)
+        self.assertEqual(transport.max_in_flight, 3)
+
+    def test_raises_error_on_failed_booking(self):
+        transport = CountingTransport(b'<Response status="error"><ExtraInfo>[The dates you selected are no longer available.]</ExtraInfo></Response>')
+        api = AsyncMarketingVillasApi("", "", 1218, transport=transport)
+
+        async def token():
+            return "token"
+        api.get_md5_token = token
+
+        arguments = ["Arnalaya", datetime.datetime(2017, 11, 11), datetime.datetime(2017, 11, 15),
+                "John", "Doe", "john@example.com", "Isengard", "+601155555555",
+                "+601155555555", 1, 0, 0, "This is a test"]
+        with self.assertRaises(MarketingVillasApiError):
+            asyncio.run(api.insert_ta_hold_booking(*arguments))
+
+    def test_does_not_resend_dropped_booking(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=server.url, max_concurrency=1)
+            try:
+                await api.token_manager.get()
+                server.add_fault("insertTAHoldBooking", drop=True)
+                await api.insert_ta_hold_booking("Arnalaya", datetime.datetime(2017, 11, 11),
+                        datetime.datetime(2017, 11, 15), "John", "Doe", "john@example.com",
+                        "Isengard", "+601155555555", "+601155555555", 1, 0, 0, "")
+            finally:
+                await api.close()
+
+        with MockMarketingVillasServer() as server:
+            with self.assertRaises(ConnectionError):
+                asyncio.run(run())
+            self.assertEqual(len([ path for path in server.requested_paths
+                if "insertTAHoldBooking" in path ]), 1)
+
+    def test_fans_out_over_villas(self):
+        transport = CountingTransport(b'<Villa villaid="x"><Rates><RateName>Standard</RateName></Rates></Villa>')
+        api = AsyncMarketingVillasApi("", "", 1218, transport=transport, max_concurrency=2)
+
+        async def token():
+            return "token"
+        api.get_md5_token = token
+
+        async def run():
+            return [result async for result in api.get_rates_for_villas(["Adasa", "Arnalaya", "Alamanda"])]
+
+        results = asyncio.run(run())
+        self.assertEqual(sorted(result.villa_id for result in results), ["Adasa", "Alamanda", "Arnalaya"])
+        self.assertTrue(all(result.error is None for result in results))
+        self.assertEqual(transport.max_in_flight, 2)
+
+    def test_parses_on_process_pool(self):
+        async def run(executor):
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=server.url,
+                    parse_executor=executor)
+            try:
+                return (await api.get_villa_rates("Arnalaya"),
+                        await api.get_villa_unavailable_dates("Arnalaya"))
+            finally:
+                await api.close()
+
+        with MockMarketingVillasServer() as server, ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(asyncio.run(run(executor)), asyncio.run(run(None)))
+
+
+if __name__ == "__main__":
+    main()
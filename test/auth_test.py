@@ -0,0 +1,120 @@
+import threading
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.auth import TokenManager
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasUrls,
+    BOOKING_QUERY_ARGS)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenManagerTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetch_count = 0
+
+    def fetch(self):
+        self.fetch_count += 1
+        return "token-%d" % self.fetch_count
+
+    def test_reuses_token_within_ttl(self):
+        manager = TokenManager(self.fetch, ttl=60, refresh_margin=0, clock=self.clock)
+
+        self.assertEqual(manager.get(), "token-1")
+        self.clock.now = 59
+        self.assertEqual(manager.get(), "token-1")
+        self.assertEqual(self.fetch_count, 1)
+
+    def test_fetches_new_token_after_expiry(self):
+        manager = TokenManager(self.fetch, ttl=60, refresh_margin=0, clock=self.clock)
+
+        manager.get()
+        self.clock.now = 60
+        self.assertEqual(manager.get(), "token-2")
+
+    def test_zero_ttl_disables_caching(self):
+        manager = TokenManager(self.fetch, ttl=0, clock=self.clock)
+
+        manager.get()
+        manager.get()
+        self.assertEqual(self.fetch_count, 2)
+
+    def test_refreshes_in_background_near_expiry(self):
+        manager = TokenManager(self.fetch, ttl=60, refresh_margin=10, clock=self.clock)
+        manager.get()
+        self.clock.now = 55
+        self.assertEqual(manager.get(), "token-1", "Should hand out current token while refreshing")
+
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.daemon:
+                thread.join(5)
+        self.assertEqual(manager.get(), "token-2")
+        self.assertEqual(self.fetch_count, 2)
+
+    def test_invalidate_only_clears_matching_token(self):
+        manager = TokenManager(self.fetch, ttl=60, refresh_margin=0, clock=self.clock)
+
+        manager.get()
+        manager.invalidate("some-other-token")
+        self.assertEqual(manager.get(), "token-1")
+        manager.invalidate("token-1")
+        self.assertEqual(manager.get(), "token-2")
+
+
+class AuthenticatedRequestTestCase(TestCase):
+    def setUp(self):
+        self.mvlapi = MarketingVillasApi("", "", 1218)
+        self.tokens_issued = 0
+        self.requested_urls = []
+        self.mvlapi.get_md5_token = self.fake_md5_token
+        self.mvlapi._make_request = self.fake_make_request
+        self.responses = []
+
+    def fake_md5_token(self):
+        self.tokens_issued += 1
+        return "token%d" % self.tokens_issued
+
+    def fake_make_request(self, url):
+        self.requested_urls.append(url)
+        return self.responses.pop(0)
+
+    def test_shares_token_between_calls(self):
+        self.responses = [b'<Villas />', b'<Villas />']
+
+        self.mvlapi._get_villa_list()
+        self.mvlapi._get_villa_list()
+        self.assertEqual(self.tokens_issued, 1)
+        self.assertTrue(all("p_Token=token1" in url for url in self.requested_urls))
+
+    def test_retries_once_when_token_rejected(self):
+        self.responses = [
+            b'<?xml version="1.0" encoding="utf-8"?>\r\n<Response status="error">\r\n  <ExtraInfo>[Invalid Token]</ExtraInfo>\r\n</Response>',
+            b'<Villas />'
+        ]
+
+        self.assertEqual(self.mvlapi._get_villa_list(), b'<Villas />')
+        self.assertEqual(self.tokens_issued, 2)
+        self.assertIn("p_Token=token2", self.requested_urls[1])
+
+    def test_does_not_retry_other_errors(self):
+        failure = b'<?xml version="1.0" encoding="utf-8"?>\r\n<Response status="error">\r\n  <ExtraInfo>[The dates you selected are no longer available.]</ExtraInfo>\r\n</Response>'
+        self.responses = [failure]
+
+        booking_params = dict.fromkeys(BOOKING_QUERY_ARGS[1:], "")
+        resp = self.mvlapi._authenticated_request(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, booking_params)
+        self.assertEqual(resp, failure)
+        self.assertEqual(len(self.requested_urls), 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import datetime
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.availability import AvailabilityIndex
+from pymvlapi.records import (UnavailablePeriod, VillaUnavailableDates)
+
+
+def unavailable(villa_id, *periods):
+    return VillaUnavailableDates(villa_id, [ UnavailablePeriod(
+        datetime.datetime.strptime(date_from, "%Y-%m-%d"),
+        datetime.datetime.strptime(date_to, "%Y-%m-%d")) for date_from, date_to in periods ])
+
+
+class AvailabilityIndexTestCase(TestCase):
+    def setUp(self):
+        self.index = AvailabilityIndex.from_unavailable_dates([
+            unavailable("Arnalaya", ("2017-02-24", "2017-03-03"), ("2017-03-01", "2017-03-05"), ("2018-02-14", "2018-02-19")),
+            unavailable("Adasa", ("2017-03-10", "2017-03-12")),
+            unavailable("Yalta"),
+        ])
+
+    def test_merges_overlapping_periods(self):
+        self.assertEqual(self.index.unavailable_periods("Arnalaya"), [
+            (datetime.date(2017, 2, 24), datetime.date(2017, 3, 5)),
+            (datetime.date(2018, 2, 14), datetime.date(2018, 2, 19))
+        ])
+
+    def test_checks_single_villa(self):
+        self.assertFalse(self.index.is_available("Arnalaya", datetime.date(2017, 3, 4), datetime.date(2017, 3, 8)))
+        self.assertTrue(self.index.is_available("Arnalaya", datetime.date(2017, 3, 6), datetime.date(2017, 3, 8)))
+        self.assertTrue(self.index.is_available("Arnalaya", datetime.date(2017, 2, 20), datetime.date(2017, 2, 24)))
+        self.assertFalse(self.index.is_available("Arnalaya", datetime.date(2017, 2, 20), datetime.date(2017, 2, 25)))
+        self.assertTrue(self.index.is_available("Yalta", datetime.date(2017, 2, 20), datetime.date(2017, 2, 25)))
+
+    def test_lists_free_villas(self):
+        self.assertEqual(sorted(self.index.free_villas(datetime.date(2017, 3, 1), datetime.date(2017, 3, 11))), ["Yalta"])
+        self.assertEqual(sorted(self.index.free_villas(datetime.date(2017, 3, 6), datetime.date(2017, 3, 10))), ["Adasa", "Arnalaya", "Yalta"])
+
+    def test_updates_single_villa(self):
+        self.index.update(unavailable("Yalta", ("2017-03-06", "2017-03-06")))
+        self.index.update(unavailable("Arnalaya"))
+
+        self.assertEqual(sorted(self.index.free_villas(datetime.date(2017, 3, 1), datetime.date(2017, 3, 8))), ["Adasa", "Arnalaya"])
+        self.assertFalse(self.index.is_available("Yalta", datetime.date(2017, 3, 6), datetime.date(2017, 3, 7)))
+
+    def test_removes_villa(self):
+        self.index.remove("Yalta")
+        self.index.update(unavailable("Kalyani"))
+
+        self.assertNotIn("Yalta", self.index)
+        self.assertEqual(sorted(self.index.free_villas(datetime.date(2017, 3, 1), datetime.date(2017, 3, 2))), ["Adasa", "Kalyani"])
+
+    def test_matches_scan_for_many_villas(self):
+        index = AvailabilityIndex()
+        for villa in range(300):
+            index.set_unavailable(str(villa), [ (datetime.date(2017, 1, 1) + datetime.timedelta(days=villa % 40 + offset),
+                datetime.date(2017, 1, 1) + datetime.timedelta(days=villa % 40 + offset + villa % 3))
+                for offset in (0, 50) ])
+
+        check_in, check_out = datetime.date(2017, 1, 20), datetime.date(2017, 1, 25)
+        expected = [ villa_id for villa_id in index.villa_ids() if index.is_available(villa_id, check_in, check_out) ]
+        self.assertEqual(sorted(index.free_villas(check_in, check_out)), sorted(expected))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import datetime
+import tempfile
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi import booking
+from pymvlapi.booking import (BookingBatch, IdempotencyStore, BookingValidationError,
+    DuplicateBookingError, BookingOutcomeUnknown, FAILED, SUCCEEDED, UNKNOWN)
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasApiError)
+from pymvlapi.records import (BookingRequest, BookingResult)
+from pymvlapi.testing import (MockMarketingVillasServer, SAMPLE_RESPONSES)
+
+FAILED_BOOKING = (b'<?xml version="1.0" encoding="utf-8"?>\r\n<Response status="error">\r\n'
+        b'  <ExtraInfo>[The dates you selected are no longer available.]</ExtraInfo>\r\n</Response>')
+
+
+def booking_request(villa_id: str, **kwargs) -> BookingRequest:
+    arguments = dict(villa_id=villa_id, check_in=datetime.datetime(2017, 11, 11),
+            check_out=datetime.datetime(2017, 11, 15), first_name="John", last_name="Doe",
+            email="john@example.com", country="Isengard", mobile="+601155555555")
+    arguments.update(kwargs)
+    return BookingRequest(**arguments)
+
+
+class BookingBatchTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+        self.store = IdempotencyStore()
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def requests_to(self, endpoint_name):
+        return len([ path for path in self.server.requested_paths
+            if path.split("?")[0].endswith("/" + endpoint_name) ])
+
+    def submit(self, requests, force=False):
+        return BookingBatch(self.mvlapi, requests, max_workers=4, store=self.store).submit(force=force)
+
+    def test_submits_bookings_under_one_token(self):
+        requests = [ booking_request(villa_id) for villa_id in ("Adasa", "Yalta", "Arnalaya") ]
+        requests.append(booking_request("Adasa", confirmed=True))
+
+        outcomes = self.submit(requests)
+        self.assertEqual([ outcome.request for outcome in outcomes ], requests)
+        self.assertEqual([ outcome.result for outcome in outcomes ],
+                [ BookingResult("20170329180131JD") ] * 4)
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 3)
+        self.assertEqual(self.requests_to("insertTAConfirmedBooking"), 1)
+        self.assertEqual(self.requests_to("Security_GetMD5Hash"), 1)
+
+    def test_invalid_requests_are_not_sent(self):
+        outcomes = self.submit([ booking_request("Adasa", email=""),
+            booking_request("Yalta", check_out=datetime.datetime(2017, 11, 10)),
+            booking_request("Arnalaya", adults=0) ])
+
+        for outcome in outcomes:
+            self.assertIsInstance(outcome.error, BookingValidationError)
+        self.assertIn("p_Email", str(outcomes[0].error))
+        self.assertEqual(self.server.request_count, 0)
+
+    def test_succeeded_keys_are_not_resubmitted(self):
+        request = booking_request("Adasa", idempotency_key="order-1")
+        self.submit([ request ])
+
+        outcomes = self.submit([ request ])
+        self.assertEqual(outcomes[0].result, BookingResult("20170329180131JD"))
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 1)
+        self.assertEqual(self.store.state("order-1"), SUCCEEDED)
+
+    def test_duplicates_within_batch_are_refused(self):
+        # Keeps the first booking pending while the second one starts
+        self.server.add_fault("insertTAHoldBooking", status=None, delay=0.5)
+        outcomes = self.submit([ booking_request("Adasa"), booking_request("Adasa") ])
+
+        errors = [ outcome.error for outcome in outcomes if outcome.error is not None ]
+        self.assertEqual(len(errors), 1)
+        self.assertIsInstance(errors[0], DuplicateBookingError)
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 1)
+
+    def test_rejected_bookings_can_be_resubmitted(self):
+        self.server.responses["insertTAHoldBooking"] = FAILED_BOOKING
+        request = booking_request("Adasa", idempotency_key="order-1")
+
+        outcome, = self.submit([ request ])
+        self.assertIsInstance(outcome.error, MarketingVillasApiError)
+        self.assertEqual(self.store.state("order-1"), FAILED)
+
+        self.server.responses["insertTAHoldBooking"] = SAMPLE_RESPONSES["insertTAHoldBooking"]
+        outcome, = self.submit([ request ])
+        self.assertEqual(outcome.result, BookingResult("20170329180131JD"))
+
+    def test_unknown_outcomes_need_force(self):
+        self.server.add_fault("insertTAHoldBooking", status=503)
+        request = booking_request("Adasa", idempotency_key="order-1")
+
+        outcome, = self.submit([ request ])
+        self.assertIsInstance(outcome.error, BookingOutcomeUnknown)
+        self.assertEqual(self.store.state("order-1"), UNKNOWN)
+
+        outcome, = self.submit([ request ])
+        self.assertIsInstance(outcome.error, DuplicateBookingError)
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 1)
+
+        outcome, = self.submit([ request ], force=True)
+        self.assertIsNone(outcome.error)
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 2)
+
+    def test_dropped_booking_is_not_resent(self):
+        # The token request leaves a pooled connection, which the server
+        # drops after receiving the booking
+        self.mvlapi.token_manager.get()
+        self.server.add_fault("insertTAHoldBooking", drop=True)
+
+        outcome, = self.submit([ booking_request("Adasa", idempotency_key="order-1") ])
+        self.assertIsInstance(outcome.error, BookingOutcomeUnknown)
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 1)
+
+    def test_batches_share_a_store_by_default(self):
+        booking.set_shared_store(None)
+        self.addCleanup(booking.set_shared_store, None)
+        request = booking_request("Adasa", idempotency_key="order-1")
+        BookingBatch(self.mvlapi, [ request ]).submit()
+
+        outcome, = BookingBatch(self.mvlapi, [ request ]).submit()
+        self.assertEqual(outcome.result, BookingResult("20170329180131JD"))
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 1)
+        self.assertEqual(booking.get_shared_store().max_age, booking.SHARED_STORE_MAX_AGE)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class IdempotencyStoreTestCase(TestCase):
+    def test_persists_keys(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bookings.sqlite")
+            store = IdempotencyStore(path)
+            store.begin("order-1")
+            store.mark_unknown("order-1")
+            store.close()
+
+            store = IdempotencyStore(path)
+            with self.assertRaises(DuplicateBookingError):
+                store.begin("order-1")
+            store.close()
+
+    def test_forgets_keys_after_max_age(self):
+        clock = FakeClock()
+        store = IdempotencyStore(clock=clock, max_age=60)
+        store.begin("order-1")
+        store.mark_unknown("order-1")
+
+        clock.now += 30
+        with self.assertRaises(DuplicateBookingError):
+            store.begin("order-1")
+        clock.now += 31
+        store.begin("order-2")
+        self.assertIsNone(store.state("order-1"))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+import sys
+import tempfile
+from unittest import (main, TestCase)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.cache import (MemoryBackend, ResponseCache, SqliteBackend)
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasUrls,
+    BOOKING_QUERY_ARGS)
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(clock=self.clock)
+        self.params = { "p_Token": "token1", "p_UserID": "user", "p_VillaID": "Adasa" }
+
+    def test_ignores_token_in_key(self):
+        self.cache.set(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params, b"<Villa />")
+
+        other_token = dict(self.params, p_Token="token2")
+        self.assertEqual(self.cache.get(MarketingVillasUrls.VILLA_RATES_ENDPOINT, other_token), b"<Villa />")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_expires_entries_after_ttl(self):
+        cache = ResponseCache(ttls={ MarketingVillasUrls.VILLA_RATES_ENDPOINT[0]: 10 }, clock=self.clock)
+        cache.set(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params, b"<Villa />")
+
+        self.clock.now += 10
+        self.assertIsNone(cache.get(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params))
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_extends_unchanged_entries(self):
+        self.cache.set(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params, b"<Villa />")
+        self.clock.now += 4000
+        self.cache.set(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params, b"<Villa />")
+
+        self.assertEqual(self.cache.get(MarketingVillasUrls.VILLA_RATES_ENDPOINT, self.params), b"<Villa />")
+        self.assertEqual(self.cache.stats()["unchanged_refreshes"], 1)
+
+    def test_never_caches_bookings(self):
+        cache = ResponseCache(ttls={ MarketingVillasUrls.INSERT_TA_HOLD_BOOKING[0]: 60 })
+        params = dict.fromkeys(BOOKING_QUERY_ARGS, "")
+        cache.set(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, params, b"<Response />")
+
+        self.assertIsNone(cache.get(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, params))
+
+
+class MemoryBackendTestCase(TestCase):
+    def test_evicts_least_recently_used(self):
+        backend = MemoryBackend(max_bytes=10)
+        backend.set("a", b"aaaa", 0)
+        backend.set("b", b"bbbb", 0)
+        backend.get("a")
+        backend.set("c", b"cccc", 0)
+
+        self.assertIsNone(backend.get("b"))
+        self.assertIsNotNone(backend.get("a"))
+        self.assertEqual(backend.size, 8)
+
+
+class SqliteBackendTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_persists_entries(self):
+        backend = SqliteBackend(self.path)
+        backend.set("a", b"aaaa", 123.0)
+        backend.close()
+
+        self.assertEqual(SqliteBackend(self.path).get("a"), (123.0, b"aaaa"))
+
+    def test_evicts_least_recently_used(self):
+        backend = SqliteBackend(self.path, max_bytes=10)
+        backend.set("a", b"aaaa", 0)
+        backend.set("b", b"bbbb", 0)
+        backend.set("c", b"cccc", 0)
+
+        self.assertIsNone(backend.get("a"))
+        self.assertIsNotNone(backend.get("c"))
+
+    def test_reads_do_not_write(self):
+        backend = SqliteBackend(self.path)
+        backend.set("a", b"aaaa", 0)
+        changes = backend._db.total_changes
+
+        self.assertEqual(backend.get("a"), (0, b"aaaa"))
+        self.assertEqual(backend._db.total_changes, changes)
+        self.assertFalse(backend._db.in_transaction)
+
+    def test_evicts_least_recently_read(self):
+        clock = FakeClock()
+        backend = SqliteBackend(self.path, max_bytes=10, clock=clock)
+        for key in ("a", "b"):
+            backend.set(key, key.encode() * 4, 0)
+            clock.now += 1
+        backend.get("a")
+        clock.now += 1
+        backend.set("c", b"cccc", 0)
+
+        self.assertIsNotNone(backend.get("a"))
+        self.assertIsNone(backend.get("b"))
+
+    def test_writes_read_times_on_close(self):
+        clock = FakeClock()
+        backend = SqliteBackend(self.path, clock=clock)
+        backend.set("a", b"aaaa", 0)
+        clock.now += 5
+        backend.get("a")
+        backend.close()
+
+        reopened = SqliteBackend(self.path)
+        try:
+            self.assertEqual(reopened._db.execute("SELECT accessed_at FROM responses "
+                    "WHERE key = 'a'").fetchone()[0], clock.now)
+        finally:
+            reopened.close()
+
+
+class CachedApiTestCase(TestCase):
+    def setUp(self):
+        self.request_count = 0
+        self.mvlapi = MarketingVillasApi("", "", 1218, cache=ResponseCache())
+        self.mvlapi.get_md5_token = lambda: "token"
+        self.mvlapi._make_request = self.fake_make_request
+
+    def fake_make_request(self, url):
+        self.request_count += 1
+        if "insertTAHoldBooking" in url:
+            return b'<Response status="ok"><ExtraInfo>20170329180131JD</ExtraInfo></Response>'
+        return b'<Villas />'
+
+    def test_serves_repeated_reads_from_cache(self):
+        self.mvlapi.get_villa_list()
+        self.mvlapi.get_villa_list()
+
+        self.assertEqual(self.request_count, 1)
+
+    def test_does_not_cache_bookings(self):
+        params = dict.fromkeys(BOOKING_QUERY_ARGS[1:], "")
+        self.mvlapi._authenticated_request(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, params)
+        self.mvlapi._authenticated_request(MarketingVillasUrls.INSERT_TA_HOLD_BOOKING, params)
+
+        self.assertEqual(self.request_count, 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.aio import AsyncMarketingVillasApi
+from pymvlapi.coalesce import SingleFlight
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.testing import MockMarketingVillasServer
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def slow(self, result):
+        def function():
+            self.started.set()
+            self.release.wait()
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return function
+
+    def run_concurrently(self, key, function, count):
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            leader = executor.submit(self.flights.do, key, function)
+            self.started.wait()
+            followers = [ executor.submit(self.flights.do, key, function) for _ in range(count - 1) ]
+            while self.flights.shared < count - 1:
+                time.sleep(0.001)
+            self.release.set()
+            return [ leader ] + followers
+
+    def test_shares_result(self):
+        result = object()
+        futures = self.run_concurrently("key", self.slow(result), 5)
+
+        self.assertTrue(all(future.result() is result for future in futures))
+        self.assertEqual(self.flights.calls, 1)
+
+    def test_shares_exception(self):
+        futures = self.run_concurrently("key", self.slow(ValueError("failed")), 3)
+
+        for future in futures:
+            self.assertIsInstance(future.exception(), ValueError)
+
+    def test_sequential_calls_are_not_shared(self):
+        self.flights.do("key", lambda: 1)
+        self.assertEqual(self.flights.do("key", lambda: 2), 2)
+        self.assertEqual(self.flights.calls, 2)
+
+
+class CoalescingEndpointTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer(latency=0.05).start()
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def requests_to(self, endpoint_name):
+        return len([ path for path in self.server.requested_paths
+            if path.split("?")[0].endswith("/" + endpoint_name) ])
+
+    def call_concurrently(self, function, *args):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(lambda _: function(*args), range(8)))
+
+    def test_coalesces_reads_and_token_fetch(self):
+        results = self.call_concurrently(self.mvlapi.get_villa_rates, "Adasa")
+
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.requests_to("getVillaRates"), 1)
+        self.assertEqual(self.requests_to("Security_GetMD5Hash"), 1)
+
+    def test_coalesces_token_methods(self):
+        self.call_concurrently(self.mvlapi.get_md5_token)
+
+        self.assertEqual(self.requests_to("Security_GetTimeToken"), 1)
+        self.assertEqual(self.requests_to("Security_GetMD5Hash"), 1)
+
+    def test_does_not_coalesce_bookings(self):
+        self.mvlapi.token_manager.get()
+        self.call_concurrently(self.mvlapi.insert_ta_hold_booking, "Adasa",
+                datetime.datetime(2017, 11, 11), datetime.datetime(2017, 11, 15), "John",
+                "Doe", "john@example.com", "Isengard", "+601155555555", "+601155555555",
+                1, 0, 0, "")
+
+        self.assertEqual(self.requests_to("insertTAHoldBooking"), 8)
+
+    def test_can_be_disabled(self):
+        api = MarketingVillasApi("", "", 1218, base_url=self.server.url, coalesce=False)
+        api.token_manager.get()
+        try:
+            self.call_concurrently(api.get_villa_list)
+        finally:
+            api.close()
+
+        self.assertEqual(self.requests_to("getMVLVillaList"), 8)
+
+    def test_async_client_coalesces_reads(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=self.server.url)
+            try:
+                return await asyncio.gather(*[ api.get_villa_list() for _ in range(5) ])
+            finally:
+                await api.close()
+
+        results = asyncio.run(run())
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.requests_to("getMVLVillaList"), 1)
+
+
+if __name__ == "__main__":
+    main()
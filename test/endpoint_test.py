@@ -1,11 +1,16 @@
 import datetime
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor)
 from unittest import (main, TestCase)
+from urllib.parse import urlencode
 
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasApiError)
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasApiError,
+    MarketingVillasUrls, CompiledEndpoint)
+from pymvlapi.records import Villa
+from pymvlapi.testing import MockMarketingVillasServer
 
 
 class EndpointTestCase(TestCase):
@@ -29,6 +34,32 @@ class EndpointConstructionTestCase(EndpointTestCase):
         result = self.mvlapi._construct_endpoint( endpoint=("TestEndpointWithQuery", [],), get_params={ "key": "value" })
         self.assertEqual("http://ws.marketingvillas.com/partners.asmx/TestEndpointWithQuery?key=value", result)
 
+    def test_compiled_endpoint_encodes_like_urlencode(self):
+        params = { "p_UserID": "j.doe@example.com", "p_VillaID": "Shangri La", "p_TotalAdults": 2,
+            "p_SpecialRequest": "Cot & high chair/ñ?" }
+        compiled = CompiledEndpoint(("/insertTAHoldBooking", []), "http://localhost:8080/")
+
+        self.assertEqual(compiled.build(params),
+                "http://localhost:8080/partners.asmx/insertTAHoldBooking?" + urlencode(params))
+        self.assertEqual(compiled.build(params, token="a b"),
+                compiled.url + "?" + urlencode(dict(params, p_Token="a b")))
+
+    def test_compiled_endpoint_checks_required_parameters(self):
+        compiled = CompiledEndpoint(MarketingVillasUrls.VILLA_RATES_ENDPOINT)
+
+        with self.assertRaises(KeyError):
+            compiled.build({ "p_UserID": "" }, token="token")
+        compiled.build({ "p_UserID": "", "p_VillaID": "Adasa" }, token="token")
+        with self.assertRaises(KeyError):
+            compiled.build({ "p_UserID": "", "p_VillaID": "Adasa" })
+
+    def test_endpoints_follow_base_url(self):
+        self.mvlapi._endpoint_url(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, {})
+        self.mvlapi.base_url = "http://staging.example.com/"
+
+        self.assertEqual(self.mvlapi._endpoint_url(MarketingVillasUrls.TIME_TOKEN_ENDPOINT, {}),
+                "http://staging.example.com/partners.asmx/Security_GetTimeToken")
+
 
 class GetTimeTokenTestCase(EndpointTestCase):
     def setUp(self):
@@ -79,7 +110,7 @@ class GetVillaListTestCase(EndpointTestCase):
         self.mvlapi._get_villa_list = self.sneaky_mock_function
 
         self.assertEqual(self.mvlapi._get_villa_list(), self.sample_response_bytes, "Did not call mock function")
-        self.assertEqual(self.mvlapi.get_villa_list(), self.sample_response_list, "Failed to convert XML bytes to list")
+        self.assertEqual([ villa.as_dict() for villa in self.mvlapi.get_villa_list() ], self.sample_response_list, "Failed to convert XML bytes to list")
 
 
 class GetVillaRatesTestCase(EndpointTestCase):
@@ -113,7 +144,7 @@ class GetVillaRatesTestCase(EndpointTestCase):
         self.mvlapi._get_villa_rates = self.sneaky_mock_function
 
         self.assertEqual(self.mvlapi._get_villa_rates("Arnalaya"), self.sample_response_bytes, "Did not call mock function")
-        self.assertEqual(self.mvlapi.get_villa_rates("Arnalaya"), self.sample_response_dict, "Did not parse XML to dictionary")
+        self.assertEqual(self.mvlapi.get_villa_rates("Arnalaya").as_dict(), self.sample_response_dict, "Did not parse XML to dictionary")
 
 
 class GetVillaUnavailabilityTestCase(EndpointTestCase):
@@ -137,7 +168,7 @@ class GetVillaUnavailabilityTestCase(EndpointTestCase):
         self.mvlapi._get_villa_unavailable_dates = self.sneaky_mock_function
 
         self.assertEqual(self.mvlapi._get_villa_unavailable_dates("Arnalaya"), self.sample_response_bytes, "Did not call mock function")
-        self.assertEqual(self.mvlapi.get_villa_unavailable_dates("Arnalaya"), self.sample_response_dict, "Did not parse XML to dictionary")
+        self.assertEqual(self.mvlapi.get_villa_unavailable_dates("Arnalaya").as_dict(), self.sample_response_dict, "Did not parse XML to dictionary")
 
 
 class InsertTaHoldBookingTestCase(EndpointTestCase):
@@ -173,7 +204,7 @@ class InsertTaHoldBookingTestCase(EndpointTestCase):
         self.mvlapi._insert_ta_hold_booking = self.sneaky_mock_function
 
         self.assertEqual(self.mvlapi._insert_ta_hold_booking(*self.sample_api_arguments), self.sample_response_bytes, "Did not call mock function")
-        self.assertEqual(self.mvlapi.insert_ta_hold_booking(*self.sample_api_arguments), self.sample_response_dict, "Did not parse XML to dictionary")
+        self.assertEqual(self.mvlapi.insert_ta_hold_booking(*self.sample_api_arguments).as_dict(), self.sample_response_dict, "Did not parse XML to dictionary")
 
     def test_raises_error_on_failed_hold(self):
         self.mvlapi._insert_ta_hold_booking = self.error_mock_function
@@ -215,7 +246,7 @@ class InsertTaConfirmedBookingTestCase(EndpointTestCase):
         self.mvlapi._insert_ta_confirmed_booking = self.sneaky_mock_function
 
         self.assertEqual(self.mvlapi._insert_ta_confirmed_booking(*self.sample_api_arguments), self.sample_response_bytes, "Did not call mock function")
-        self.assertEqual(self.mvlapi.insert_ta_confirmed_booking(*self.sample_api_arguments), self.sample_response_dict, "Did not parse XML to dictionary")
+        self.assertEqual(self.mvlapi.insert_ta_confirmed_booking(*self.sample_api_arguments).as_dict(), self.sample_response_dict, "Did not parse XML to dictionary")
 
     def test_raises_error_on_failed_confirm(self):
         self.mvlapi._insert_ta_confirmed_booking = self.error_mock_function
@@ -224,6 +255,87 @@ class InsertTaConfirmedBookingTestCase(EndpointTestCase):
         self.assertRaises(MarketingVillasApiError, self.mvlapi.insert_ta_confirmed_booking, *self.sample_api_arguments)
 
 
+class BulkFetchTestCase(EndpointTestCase):
+    def setUp(self):
+        super(BulkFetchTestCase, self).setUp()
+        self.tokens_issued = 0
+        self.mvlapi.get_md5_token = self.fake_md5_token
+        self.mvlapi.get_villa_list = lambda: [
+            Villa("Adasa", "Adasa", "laksmana-estate-villa-adasa", "Villa Adasa"),
+            Villa("Arnalaya", "Arnalaya", "arnalaya", "Villa Arnalaya")
+        ]
+
+    def fake_md5_token(self):
+        self.tokens_issued += 1
+        return "token"
+
+    def fake_get_villa_rates(self, villa_id):
+        self.mvlapi.token_manager.get()
+        if villa_id == "Missing":
+            raise MarketingVillasApiError("Unknown villa")
+        return { "villa_id": villa_id }
+
+    def test_fetches_rates_for_given_villas(self):
+        self.mvlapi.get_villa_rates = self.fake_get_villa_rates
+
+        results = list(self.mvlapi.get_rates_for_villas(["Adasa", "Arnalaya", "Alamanda"], max_workers=2))
+        self.assertEqual(sorted(result.villa_id for result in results), ["Adasa", "Alamanda", "Arnalaya"])
+        self.assertTrue(all(result.result == { "villa_id": result.villa_id } for result in results))
+        self.assertEqual(self.tokens_issued, 1, "Workers did not share a single token")
+
+    def test_defaults_to_full_villa_list(self):
+        self.mvlapi.get_villa_unavailable_dates = self.fake_get_villa_rates
+
+        results = list(self.mvlapi.get_availability_for_villas())
+        self.assertEqual(sorted(result.villa_id for result in results), ["Adasa", "Arnalaya"])
+
+    def test_captures_per_villa_errors(self):
+        self.mvlapi.get_villa_rates = self.fake_get_villa_rates
+
+        results = { result.villa_id: result for result in self.mvlapi.get_rates_for_villas(["Adasa", "Missing"]) }
+        self.assertIsNone(results["Adasa"].error)
+        self.assertIsInstance(results["Missing"].error, MarketingVillasApiError)
+        self.assertIsNone(results["Missing"].result)
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super(RecordingExecutor, self).__init__(max_workers=1)
+        self.submitted = []
+
+    def submit(self, function, *args, **kwargs):
+        self.submitted.append(function.__name__)
+        return super(RecordingExecutor, self).submit(function, *args, **kwargs)
+
+
+class ParseExecutorTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def fetch_all(self, parse_executor):
+        mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url,
+                parse_executor=parse_executor, coalesce=False)
+        try:
+            return (mvlapi.get_villa_list(), mvlapi.get_villa_rates("Arnalaya"),
+                    mvlapi.get_villa_unavailable_dates("Arnalaya"))
+        finally:
+            mvlapi.close()
+
+    def test_parses_read_responses_on_executor(self):
+        with RecordingExecutor() as executor:
+            self.fetch_all(executor)
+
+        self.assertEqual(executor.submitted, ["_parse_villa_list", "_parse_villa_rates",
+            "_parse_villa_unavailable_dates"])
+
+    def test_process_pool_returns_same_records(self):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            self.assertEqual(self.fetch_all(executor), self.fetch_all(None))
+
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,138 @@
+import asyncio
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.aio import AsyncMarketingVillasApi
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.instrumentation import (Hooks, MetricsCollector)
+from pymvlapi.testing import (MockMarketingVillasServer, SAMPLE_RESPONSES)
+
+
+class RecordingHooks(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def on_request_start(self, endpoint, url):
+        self.events.append(("start", endpoint))
+
+    def on_request_end(self, endpoint, url, response_bytes, elapsed, error):
+        self.events.append(("end", endpoint, response_bytes, error is None))
+
+    def on_parse_end(self, endpoint, response_bytes, elapsed):
+        self.events.append(("parse", endpoint, response_bytes))
+
+
+class HooksTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+        self.hooks = RecordingHooks()
+        self.mvlapi.add_hook(self.hooks)
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def test_reports_requests_and_parsing(self):
+        self.mvlapi.get_villa_rates("Adasa")
+
+        rates_bytes = len(SAMPLE_RESPONSES["getVillaRates"])
+        self.assertEqual([ event[:2] for event in self.hooks.events ], [
+            ("start", "Security_GetTimeToken"), ("end", "Security_GetTimeToken"),
+            ("parse", "Security_GetTimeToken"),
+            ("start", "Security_GetMD5Hash"), ("end", "Security_GetMD5Hash"),
+            ("parse", "Security_GetMD5Hash"),
+            ("start", "getVillaRates"), ("end", "getVillaRates"), ("parse", "getVillaRates"),
+        ])
+        self.assertEqual(self.hooks.events[-2], ("end", "getVillaRates", rates_bytes, True))
+        self.assertEqual(self.hooks.events[-1], ("parse", "getVillaRates", rates_bytes))
+
+    def test_reports_failed_requests(self):
+        self.server.stop()
+
+        with self.assertRaises(Exception):
+            self.mvlapi.get_time_token()
+        self.assertEqual(self.hooks.events, [ ("start", "Security_GetTimeToken"),
+            ("end", "Security_GetTimeToken", 0, False) ])
+
+    def test_reports_streamed_requests(self):
+        self.mvlapi.token_manager.get()
+        del self.hooks.events[:]
+
+        list(self.mvlapi.iter_villa_list())
+        self.assertEqual(self.hooks.events, [ ("start", "getMVLVillaList"),
+            ("end", "getMVLVillaList", len(SAMPLE_RESPONSES["getMVLVillaList"]), True) ])
+
+    def test_removed_hook_is_not_called(self):
+        self.mvlapi.remove_hook(self.hooks)
+
+        self.mvlapi.get_time_token()
+        self.assertEqual(self.hooks.events, [])
+
+    def test_async_client_reports_requests(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=self.server.url)
+            api.add_hook(hooks)
+            try:
+                await api.get_villa_list()
+            finally:
+                await api.close()
+
+        hooks = RecordingHooks()
+        asyncio.run(run())
+        self.assertEqual(hooks.events[-3:], [ ("start", "getMVLVillaList"),
+            ("end", "getMVLVillaList", len(SAMPLE_RESPONSES["getMVLVillaList"]), True),
+            ("parse", "getMVLVillaList", len(SAMPLE_RESPONSES["getMVLVillaList"])) ])
+
+
+class MetricsCollectorTestCase(TestCase):
+    def setUp(self):
+        self.metrics = MetricsCollector(buckets=(0.01, 0.1))
+        self.metrics.on_request_end("getVillaRates", "", 100, 0.005, None)
+        self.metrics.on_request_end("getVillaRates", "", 0, 0.05, OSError())
+        self.metrics.on_request_end("getVillaRates", "", 200, 0.5, None)
+        self.metrics.on_parse_end("getVillaRates", 100, 0.002)
+
+    def test_as_dict(self):
+        rates = self.metrics.as_dict()["getVillaRates"]
+
+        self.assertEqual(rates["requests"], 3)
+        self.assertEqual(rates["errors"], 1)
+        self.assertEqual(rates["response_bytes"], 300)
+        self.assertEqual(rates["request_duration"]["buckets"],
+                [ [0.01, 1], [0.1, 2], [float("inf"), 3] ])
+        self.assertAlmostEqual(rates["request_duration"]["sum"], 0.555)
+        self.assertEqual(rates["parse_duration"]["count"], 1)
+
+    def test_to_prometheus(self):
+        text = self.metrics.to_prometheus()
+
+        self.assertIn('pymvlapi_requests_total{endpoint="getVillaRates"} 3\n', text)
+        self.assertIn('pymvlapi_request_errors_total{endpoint="getVillaRates"} 1\n', text)
+        self.assertIn('pymvlapi_request_duration_seconds_bucket{endpoint="getVillaRates",le="0.1"} 2\n', text)
+        self.assertIn('pymvlapi_request_duration_seconds_bucket{endpoint="getVillaRates",le="+Inf"} 3\n', text)
+        self.assertIn('pymvlapi_parse_duration_seconds_count{endpoint="getVillaRates"} 1\n', text)
+        self.assertIn("# TYPE pymvlapi_request_duration_seconds histogram\n", text)
+
+    def test_collects_from_client(self):
+        metrics = MetricsCollector()
+        with MockMarketingVillasServer() as server:
+            api = MarketingVillasApi("", "", 1218, base_url=server.url)
+            api.add_hook(metrics)
+            try:
+                api.get_villa_list()
+                api.get_villa_list()
+            finally:
+                api.close()
+
+        collected = metrics.as_dict()
+        self.assertEqual(collected["getMVLVillaList"]["requests"], 2)
+        self.assertEqual(collected["Security_GetMD5Hash"]["requests"], 1)
+        self.assertEqual(collected["getMVLVillaList"]["parse_duration"]["count"], 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import datetime
+from unittest import (main, TestCase)
+from xml.etree import ElementTree as ET
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi import parsing
+from pymvlapi.records import RatePeriod
+
+
+class DateParsingTestCase(TestCase):
+    def test_parses_dates(self):
+        self.assertEqual(parsing.parse_date("2017-02-24"), datetime.datetime(2017, 2, 24))
+        self.assertEqual(parsing.parse_midnight_datetime("2017-02-05T00:00:00"), datetime.datetime(2017, 2, 5))
+
+    def test_falls_back_to_strptime(self):
+        self.assertEqual(parsing.parse_date("2017-2-4"), datetime.datetime(2017, 2, 4))
+
+    def test_rejects_malformed_dates(self):
+        for datestr in ["2017-02-30", "2017/02/05", "2017-02-05T12:00:00"]:
+            with self.assertRaises(ValueError):
+                parsing.parse_midnight_datetime(datestr) if "T" in datestr else parsing.parse_date(datestr)
+
+
+class RateParsingTestCase(TestCase):
+    def setUp(self):
+        self.expected = RatePeriod(datetime.datetime(2017, 2, 5), datetime.datetime(2017, 3, 31),
+                1895.00, 2, 10.00, 5.00)
+
+    def test_parses_rate_in_usual_order(self):
+        rate = ET.fromstring("<Rate><From>2017-02-05T00:00:00</From><To>2017-03-31T00:00:00</To>"
+                "<Amount>1895.00</Amount><MinimumNightStay>2</MinimumNightStay>"
+                "<PercentTax>10.00</PercentTax><PercentRate>5.00</PercentRate></Rate>")
+
+        self.assertEqual(parsing.rate_from_element(rate), self.expected)
+
+    def test_parses_rate_in_other_order(self):
+        rate = ET.fromstring("<Rate><Amount>1895.00</Amount><To>2017-03-31T00:00:00</To>"
+                "<From>2017-02-05T00:00:00</From><PercentRate>5.00</PercentRate>"
+                "<PercentTax>10.00</PercentTax><MinimumNightStay>2</MinimumNightStay></Rate>")
+
+        self.assertEqual(parsing.rate_from_element(rate), self.expected)
+
+
+if __name__ == "__main__":
+    main()
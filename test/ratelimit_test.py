@@ -0,0 +1,146 @@
+import asyncio
+import datetime
+import threading
+import time
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi import ratelimit
+from pymvlapi.aio import AsyncMarketingVillasApi
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.ratelimit import (RateLimiter, BOOKING, DEFAULT, BACKGROUND)
+from pymvlapi.testing import MockMarketingVillasServer
+
+
+class RecordingLimiter(RateLimiter):
+    """
+    Records the priority of every request it admits.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(RecordingLimiter, self).__init__(*args, **kwargs)
+        self.levels = []
+
+    def acquire(self, level=DEFAULT):
+        waited = super(RecordingLimiter, self).acquire(level)
+        self.levels.append(level)
+        return waited
+
+    async def acquire_async(self, level=DEFAULT):
+        waited = await super(RecordingLimiter, self).acquire_async(level)
+        self.levels.append(level)
+        return waited
+
+
+class RateLimiterTestCase(TestCase):
+    def wait_for_queue(self, limiter, depth):
+        while limiter.queue_depth() < depth:
+            time.sleep(0.001)
+
+    def test_limits_rate(self):
+        limiter = RateLimiter(rate=100, burst=1)
+
+        started = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.045)
+
+    def test_allows_bursts(self):
+        limiter = RateLimiter(rate=1, burst=5)
+
+        started = time.monotonic()
+        for _ in range(5):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_admits_by_priority(self):
+        limiter = RecordingLimiter(rate=20, burst=1)
+        limiter.acquire()
+
+        threads = []
+        for depth, level in enumerate([BACKGROUND, DEFAULT, BOOKING]):
+            threads.append(threading.Thread(target=limiter.acquire, args=(level,)))
+            threads[-1].start()
+            self.wait_for_queue(limiter, depth + 1)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(limiter.levels, [DEFAULT, BOOKING, DEFAULT, BACKGROUND])
+
+    def test_async_waiters_share_queue(self):
+        limiter = RecordingLimiter(rate=20, burst=1)
+        limiter.acquire()
+
+        async def run():
+            background = asyncio.ensure_future(limiter.acquire_async(BACKGROUND))
+            await asyncio.sleep(0.005)
+            await asyncio.gather(background, limiter.acquire_async(BOOKING))
+
+        asyncio.run(run())
+        self.assertEqual(limiter.levels, [DEFAULT, BOOKING, BACKGROUND])
+
+    def test_stats(self):
+        limiter = RateLimiter(rate=100, burst=1)
+        limiter.acquire(BOOKING)
+        limiter.acquire(BOOKING)
+
+        stats = limiter.stats()
+        self.assertEqual(stats["queue_depth"], 0)
+        self.assertEqual(stats["waits"]["booking"]["admitted"], 2)
+        self.assertGreater(stats["waits"]["booking"]["max_wait"], 0)
+
+
+class RateLimitedEndpointTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.limiter = RecordingLimiter(rate=1000)
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url,
+                rate_limiter=self.limiter)
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def test_bookings_and_token_fetch_have_booking_priority(self):
+        self.mvlapi.insert_ta_hold_booking("Adasa", datetime.datetime(2017, 11, 11),
+                datetime.datetime(2017, 11, 15), "John", "Doe", "john@example.com",
+                "Isengard", "+601155555555", "+601155555555", 1, 0, 0, "")
+
+        self.assertEqual(self.limiter.levels, [BOOKING, BOOKING, BOOKING])
+
+    def test_bulk_methods_have_background_priority(self):
+        list(self.mvlapi.get_rates_for_villas(["Adasa", "Yalta"]))
+
+        self.assertEqual(self.limiter.levels, [BACKGROUND] * 4)
+
+    def test_shared_limiter(self):
+        ratelimit.set_shared_limiter(self.limiter)
+        try:
+            api = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+        finally:
+            ratelimit.set_shared_limiter(None)
+        try:
+            api.get_time_token()
+        finally:
+            api.close()
+
+        self.assertEqual(self.limiter.levels, [DEFAULT])
+
+    def test_async_client_is_rate_limited(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=self.server.url,
+                    rate_limiter=self.limiter)
+            try:
+                return [ result async for result in api.get_availability_for_villas(["Adasa"]) ]
+            finally:
+                await api.close()
+
+        asyncio.run(run())
+        self.assertEqual(self.limiter.levels, [BACKGROUND] * 3)
+
+
+if __name__ == "__main__":
+    main()
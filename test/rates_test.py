@@ -0,0 +1,93 @@
+import datetime
+from unittest import (main, skipIf, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi import rates
+from pymvlapi.rates import RateTable
+from pymvlapi.records import (RatePeriod, VillaRates)
+
+
+class RateTableTestCase(TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.villa_rates = VillaRates("Arnalaya", "Standard Rate", [
+            RatePeriod(datetime.datetime(2017, 4, 1), datetime.datetime(2017, 4, 12), 2095.00, 3, 10.00, 5.00),
+            RatePeriod(datetime.datetime(2017, 2, 5), datetime.datetime(2017, 3, 31), 1895.00, 2, 10.00, 5.00),
+        ])
+        self.table = RateTable.from_villa_rates(self.villa_rates, use_numpy=self.use_numpy)
+
+    def test_stores_sorted_columns(self):
+        self.assertEqual(list(self.table.date_from), [
+            datetime.date(2017, 2, 5).toordinal(), datetime.date(2017, 4, 1).toordinal()])
+        self.assertEqual(list(self.table.amount), [1895.00, 2095.00])
+
+    def test_quotes_stay_within_one_period(self):
+        quote = self.table.quote(datetime.date(2017, 3, 1), datetime.date(2017, 3, 4))
+
+        self.assertEqual(quote.nights, 3)
+        self.assertEqual(quote.subtotal, 3 * 1895.00)
+        self.assertEqual(quote.tax, 3 * 189.50)
+        self.assertEqual(quote.total, 3 * 2084.50)
+        self.assertTrue(quote.valid)
+
+    def test_quotes_stay_across_periods(self):
+        quote = self.table.quote(datetime.datetime(2017, 3, 30), datetime.datetime(2017, 4, 2))
+
+        self.assertEqual(quote.subtotal, 2 * 1895.00 + 2095.00)
+        self.assertEqual(quote.min_stay, 2)
+        self.assertTrue(quote.covered)
+
+    def test_rejects_stay_shorter_than_minimum(self):
+        quote = self.table.quote(datetime.date(2017, 4, 1), datetime.date(2017, 4, 3))
+
+        self.assertEqual(quote.min_stay, 3)
+        self.assertTrue(quote.covered)
+        self.assertFalse(quote.valid)
+
+    def test_rejects_stay_outside_rates(self):
+        for check_in, check_out in [
+                (datetime.date(2017, 4, 10), datetime.date(2017, 4, 15)),
+                (datetime.date(2017, 1, 1), datetime.date(2017, 2, 7)),
+                (datetime.date(2018, 1, 1), datetime.date(2018, 1, 7))]:
+            self.assertFalse(self.table.quote(check_in, check_out).covered)
+
+    def test_quote_many_matches_quote(self):
+        stays = [ (datetime.date(2017, 2, 1) + datetime.timedelta(days=offset),
+                datetime.date(2017, 2, 1) + datetime.timedelta(days=offset + length))
+                for offset in range(0, 80, 3) for length in (1, 4, 9) ]
+
+        self.assertEqual(self.table.quote_many(stays), [ self.table.quote(*stay) for stay in stays ])
+
+    def test_finds_period_index(self):
+        self.assertEqual(self.table.period_index(datetime.date(2017, 4, 12)), 1)
+        self.assertEqual(self.table.period_index(datetime.date(2017, 4, 13)), -1)
+
+    def test_finds_period_index_of_overlapping_periods(self):
+        table = RateTable.from_villa_rates(VillaRates("Arnalaya", "Standard Rate", [
+            RatePeriod(datetime.datetime(2017, 1, 1), datetime.datetime(2017, 12, 31), 100.00, 1, 0.00, 0.00),
+            RatePeriod(datetime.datetime(2017, 3, 1), datetime.datetime(2017, 3, 5), 200.00, 1, 0.00, 0.00),
+        ]), use_numpy=self.use_numpy)
+
+        self.assertEqual(table.period_index(datetime.date(2017, 3, 3)), 1)
+        self.assertEqual(table.period_index(datetime.date(2017, 6, 1)), 0)
+        self.assertEqual(table.quote(datetime.date(2017, 6, 1), datetime.date(2017, 6, 2)).subtotal,
+                table.amount[table.period_index(datetime.date(2017, 6, 1))])
+
+    def test_handles_empty_rates(self):
+        table = RateTable("Empty", [], use_numpy=self.use_numpy)
+
+        self.assertFalse(table.quote(datetime.date(2017, 4, 1), datetime.date(2017, 4, 3)).covered)
+        self.assertEqual(table.period_index(datetime.date(2017, 4, 1)), -1)
+
+
+@skipIf(rates.numpy is None, "NumPy is not installed")
+class NumpyRateTableTestCase(RateTableTestCase):
+    use_numpy = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import datetime
+import pickle
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.records import (RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates)
+
+
+class RecordTestCase(TestCase):
+    def setUp(self):
+        self.rate = RatePeriod(datetime.datetime(2017, 2, 5), datetime.datetime(2017, 3, 31),
+                1895.00, 2, 10.00, 5.00)
+
+    def test_has_no_instance_dict(self):
+        self.assertFalse(hasattr(self.rate, "__dict__"))
+
+    def test_as_dict_uses_legacy_keys(self):
+        self.assertEqual(VillaRates("Arnalaya", "Standard Rate", [self.rate]).as_dict(), {
+            "villa_id": "Arnalaya",
+            "rate_name": "Standard Rate",
+            "rates": [ {
+                "from": datetime.datetime(2017, 2, 5),
+                "to": datetime.datetime(2017, 3, 31),
+                "amount": 1895.00,
+                "min_stay": 2,
+                "percent_tax": 10.00,
+                "percent_rate": 5.00
+            } ]
+        })
+
+    def test_unavailable_dates_as_dict_omits_villa_id(self):
+        period = UnavailablePeriod(datetime.datetime(2017, 2, 24), datetime.datetime(2017, 3, 3))
+
+        self.assertEqual(VillaUnavailableDates("Arnalaya", [period]).as_dict(), {
+            "unavailable_dates": [ { "from": period.date_from, "to": period.date_to } ]
+        })
+
+    def test_compares_by_value(self):
+        same = RatePeriod(*[ getattr(self.rate, name) for name in RatePeriod.__slots__ ])
+
+        self.assertEqual(self.rate, same)
+        self.assertEqual(hash(self.rate), hash(same))
+        self.assertNotEqual(self.rate, UnavailablePeriod(self.rate.date_from, self.rate.date_to))
+
+    def test_pickles(self):
+        rates = VillaRates("Arnalaya", "Standard Rate", [self.rate])
+
+        self.assertEqual(pickle.loads(pickle.dumps(rates)), rates)
+
+
+if __name__ == "__main__":
+    main()
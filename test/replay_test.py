@@ -0,0 +1,113 @@
+import datetime
+import tempfile
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.replay import (RecordingTransport, ReplayTransport, NotRecordedError,
+    normalize_url)
+from pymvlapi.testing import MockMarketingVillasServer
+from pymvlapi.transport import PooledTransport
+
+
+class NormalizeUrlTestCase(TestCase):
+    def test_strips_host_and_token_and_sorts_query(self):
+        self.assertEqual(normalize_url("https://example.com/partners.asmx/getVillaRates"
+                "?p_VillaID=Adasa&p_Token=abc&p_UserID=me"),
+                "/partners.asmx/getVillaRates?p_UserID=me&p_VillaID=Adasa")
+        self.assertEqual(normalize_url("http://localhost:8080/partners.asmx/Security_GetMD5Hash"
+                "?p_ToHash=x"), "/partners.asmx/Security_GetMD5Hash")
+
+
+class RecordReplayTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "archive")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fetch(self, mvlapi):
+        try:
+            return (mvlapi.get_villa_list(), mvlapi.get_villa_rates("Adasa"),
+                    list(mvlapi.iter_villa_unavailable_dates("Adasa")))
+        finally:
+            mvlapi.close()
+
+    def test_replays_recorded_responses_without_network(self):
+        with MockMarketingVillasServer(rate_periods=20) as server:
+            recorder = RecordingTransport(PooledTransport(), self.path)
+            recorded = self.fetch(MarketingVillasApi("user", "secret", 1218,
+                base_url=server.url, transport=recorder))
+
+        replay = ReplayTransport(self.path)
+        self.assertEqual(len(replay), 5)
+        replayed = self.fetch(MarketingVillasApi("user", "secret", 1218,
+            base_url="http://127.0.0.1:9/", transport=replay))
+        self.assertEqual(replayed, recorded)
+
+    def test_raises_for_requests_not_recorded(self):
+        with MockMarketingVillasServer() as server:
+            recorder = RecordingTransport(PooledTransport(), self.path)
+            recorder.request(server.url + "partners.asmx/Security_GetTimeToken")
+            recorder.close()
+
+        replay = ReplayTransport(self.path)
+        try:
+            self.assertIn("http://127.0.0.1:9/partners.asmx/Security_GetTimeToken", replay)
+            with self.assertRaises(NotRecordedError):
+                replay.request("http://127.0.0.1:9/partners.asmx/getVillaRates?p_VillaID=Adasa")
+        finally:
+            replay.close()
+
+    def test_does_not_record_or_replay_bookings(self):
+        arguments = ("Adasa", datetime.datetime(2017, 11, 11), datetime.datetime(2017, 11, 15),
+            "John", "Doe", "john@example.com", "Isengard", "+601155555555", "+601155555555",
+            1, 0, 0, "")
+        with MockMarketingVillasServer() as server:
+            recorder = RecordingTransport(PooledTransport(), self.path)
+            mvlapi = MarketingVillasApi("user", "secret", 1218, base_url=server.url,
+                transport=recorder)
+            try:
+                self.assertIsNotNone(mvlapi.insert_ta_hold_booking(*arguments).mvl_booking_id)
+                mvlapi.insert_ta_confirmed_booking(*arguments)
+            finally:
+                mvlapi.close()
+
+        with open(os.path.join(self.path, "index.json")) as index_file:
+            index = index_file.read()
+        self.assertNotIn("Booking", index)
+        self.assertNotIn("john", index)
+
+        replay = ReplayTransport(self.path)
+        try:
+            # Even if an archive holds a booking, it is not replayed
+            replay._index["/partners.asmx/insertTAHoldBooking"] = (0, 0)
+            with self.assertRaises(NotRecordedError):
+                replay.request("http://127.0.0.1:9/partners.asmx/insertTAHoldBooking")
+            mvlapi = MarketingVillasApi("user", "secret", 1218,
+                base_url="http://127.0.0.1:9/", transport=replay)
+            with self.assertRaises(NotRecordedError):
+                mvlapi.insert_ta_confirmed_booking(*arguments)
+        finally:
+            replay.close()
+
+    def test_appends_to_existing_archive(self):
+        with MockMarketingVillasServer() as server:
+            for name in ("Security_GetTimeToken", "getMVLVillaList"):
+                recorder = RecordingTransport(PooledTransport(), self.path)
+                recorder.request(server.url + "partners.asmx/" + name)
+                recorder.close()
+
+        replay = ReplayTransport(self.path)
+        try:
+            self.assertEqual(len(replay), 2)
+        finally:
+            replay.close()
+
+
+if __name__ == "__main__":
+    main()
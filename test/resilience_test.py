@@ -0,0 +1,247 @@
+import asyncio
+import datetime
+import time
+from unittest import (main, TestCase)
+from urllib.error import HTTPError
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.aio import AsyncMarketingVillasApi
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.resilience import (CircuitBreaker, CircuitOpenError, DeadlineExceeded,
+    ResiliencePolicy, deadline, remaining_time)
+from pymvlapi.testing import MockMarketingVillasServer
+from pymvlapi.transport import PoolTimeout
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.breaker.before_request()
+        self.breaker.record_failure()
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_trial_request_after_reset_timeout(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10.0
+
+        self.breaker.before_request()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.breaker.record_failure()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_request()
+
+        self.clock.now = 20.0
+        self.breaker.before_request()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def open_for_trial(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now += 10.0
+        return ResiliencePolicy(retries=0, circuit_breaker=self.breaker)
+
+    def test_trial_failing_with_client_error_reopens(self):
+        policy = self.open_for_trial()
+
+        def not_found(timeout):
+            raise HTTPError("http://example.com/", 404, "Not Found", None, None)
+
+        with self.assertRaises(HTTPError):
+            policy.call(("/getVillaRates", []), not_found)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now += 10.0
+        self.assertEqual(policy.call(("/getVillaRates", []), lambda timeout: b"ok"), b"ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_cancelled_trial_reopens(self):
+        policy = self.open_for_trial()
+
+        async def hang(timeout):
+            await asyncio.sleep(60)
+
+        async def run():
+            trial = asyncio.ensure_future(policy.call_async(("/getVillaRates", []), hang))
+            await asyncio.sleep(0)
+            trial.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+
+        asyncio.run(run())
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_pool_timeouts_are_not_failures(self):
+        policy = ResiliencePolicy(retries=2, circuit_breaker=self.breaker, sleep=self.fail)
+        attempts = []
+
+        def pool_exhausted(timeout):
+            attempts.append(timeout)
+            raise PoolTimeout("No connection became free")
+
+        for _ in range(3):
+            with self.assertRaises(PoolTimeout):
+                policy.call(("/getVillaRates", []), pool_exhausted)
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_trial_timing_out_in_pool_stays_available(self):
+        policy = self.open_for_trial()
+
+        def pool_exhausted(timeout):
+            raise PoolTimeout("No connection became free")
+
+        with self.assertRaises(PoolTimeout):
+            policy.call(("/getVillaRates", []), pool_exhausted)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(policy.call(("/getVillaRates", []), lambda timeout: b"ok"), b"ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+
+class DeadlineTestCase(TestCase):
+    def test_nested_deadline_cannot_extend(self):
+        self.assertIsNone(remaining_time())
+        with deadline(1.0):
+            with deadline(60.0):
+                self.assertLessEqual(remaining_time(), 1.0)
+        self.assertIsNone(remaining_time())
+
+    def test_timeouts_shortened_to_deadline(self):
+        policy = ResiliencePolicy(default_timeout=(10.0, 30.0))
+        with deadline(1.0):
+            connect_timeout, read_timeout = policy.timeout_for(("/getVillaRates", []))
+        self.assertLessEqual(read_timeout, 1.0)
+
+        with deadline(0.0):
+            with self.assertRaises(DeadlineExceeded):
+                policy.timeout_for(("/getVillaRates", []))
+
+
+class ResiliencePolicyTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.delays = []
+        self.policy = ResiliencePolicy(default_timeout=(1.0, 1.0), sleep=self.delays.append)
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url,
+                policy=self.policy)
+        self.mvlapi.token_manager.get()
+        self.server.request_count = 0
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def test_retries_read_endpoints(self):
+        self.server.add_fault("getVillaRates", status=503, count=2)
+
+        self.assertEqual(self.mvlapi.get_villa_rates("Adasa").villa_id, "Adasa")
+        self.assertEqual(self.server.request_count, 3)
+        self.assertEqual(len(self.delays), 2)
+        self.assertTrue(all(0 <= delay <= 0.2 for delay in self.delays))
+
+    def test_gives_up_after_retries(self):
+        self.server.add_fault("getVillaRates", status=503, count=3)
+
+        with self.assertRaises(HTTPError):
+            self.mvlapi.get_villa_rates("Adasa")
+        self.assertEqual(self.server.request_count, 3)
+
+    def test_does_not_retry_client_errors(self):
+        self.server.add_fault("getVillaRates", status=400)
+
+        with self.assertRaises(HTTPError):
+            self.mvlapi.get_villa_rates("Adasa")
+        self.assertEqual(self.server.request_count, 1)
+
+    def test_does_not_retry_bookings(self):
+        self.server.add_fault("insertTAHoldBooking", status=503)
+
+        with self.assertRaises(HTTPError):
+            self.mvlapi.insert_ta_hold_booking("Adasa", datetime.datetime(2017, 11, 11),
+                    datetime.datetime(2017, 11, 15), "John", "Doe", "john@example.com",
+                    "Isengard", "+601155555555", "+601155555555", 1, 0, 0, "")
+        self.assertEqual(self.server.request_count, 1)
+
+    def test_retries_dropped_connections(self):
+        self.mvlapi.close()
+        self.server.add_fault("getVillaRates", drop=True)
+
+        self.assertEqual(self.mvlapi.get_villa_rates("Adasa").villa_id, "Adasa")
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_retries_after_timeout(self):
+        self.policy.timeouts["/getMVLVillaList"] = (1.0, 0.1)
+        self.server.add_fault("getMVLVillaList", status=None, delay=0.5)
+
+        self.assertEqual(len(self.mvlapi.get_villa_list()), 2)
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_deadline_bounds_call(self):
+        self.policy.deadline = 0.3
+        self.server.add_fault("getMVLVillaList", status=None, delay=0.5, count=5)
+
+        started = time.monotonic()
+        with self.assertRaises(Exception):
+            self.mvlapi.get_villa_list()
+        self.assertLess(time.monotonic() - started, 0.5)
+
+    def test_circuit_breaker_fails_fast(self):
+        self.policy.retries = 0
+        self.policy.circuit_breaker = CircuitBreaker(failure_threshold=2)
+        self.server.add_fault(status=503, count=2)
+
+        for _ in range(2):
+            with self.assertRaises(HTTPError):
+                self.mvlapi.get_villa_list()
+        with self.assertRaises(CircuitOpenError):
+            self.mvlapi.get_villa_list()
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_bulk_requests_are_retried(self):
+        self.server.add_fault("getVillaRates", status=503, count=2)
+
+        results = list(self.mvlapi.get_rates_for_villas(["Adasa", "Yalta", "Arnalaya"], max_workers=3))
+        self.assertEqual([ result.error for result in results ], [None, None, None])
+
+    def test_async_requests_are_retried(self):
+        async def run():
+            api = AsyncMarketingVillasApi("", "", 1218, base_url=self.server.url,
+                    policy=ResiliencePolicy(backoff_base=0.01))
+            try:
+                return await api.get_villa_list()
+            finally:
+                await api.close()
+
+        self.server.add_fault("getMVLVillaList", status=503)
+        self.assertEqual(len(asyncio.run(run())), 2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import datetime
+from unittest import (main, skipIf, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.records import (Villa, RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates)
+from pymvlapi import search
+from pymvlapi.search import Catalogue
+
+
+class FakeApi(MarketingVillasApi):
+    """
+    Serves villas with a single rate period each, and unavailable dates, from
+    dictionaries.
+    """
+
+    def __init__(self):
+        super(FakeApi, self).__init__("", "", 1218)
+        self.get_md5_token = lambda: "token"
+        self.rates = {}
+        self.unavailable = {}
+
+    def get_villa_list(self) -> list:
+        return [ Villa(villa_id, villa_id, villa_id.lower(), "Villa " + villa_id)
+            for villa_id in self.rates ]
+
+    def get_villa_rates(self, villa_id: str) -> VillaRates:
+        amount, min_stay = self.rates[villa_id]
+        return VillaRates(villa_id, "Standard Rate", [ RatePeriod(datetime.datetime(2017, 2, 5),
+            datetime.datetime(2017, 3, 31), amount, min_stay, 10.00, 5.00) ])
+
+    def get_villa_unavailable_dates(self, villa_id: str) -> VillaUnavailableDates:
+        return VillaUnavailableDates(villa_id, [ UnavailablePeriod(date_from, date_to)
+            for date_from, date_to in self.unavailable.get(villa_id, []) ])
+
+
+class CatalogueTestCase(TestCase):
+    use_numpy = False
+
+    def setUp(self):
+        self.api = FakeApi()
+        self.api.rates = { "Adasa": (1000.00, 2), "Arnalaya": (1895.00, 2),
+                "Yalta": (800.00, 5) }
+        self.api.unavailable = { "Adasa": [(datetime.datetime(2017, 3, 10),
+            datetime.datetime(2017, 3, 12))] }
+        self.catalogue = Catalogue(self.api, capacities={ "Adasa": 6, "Arnalaya": 10 },
+                use_numpy=self.use_numpy)
+        self.catalogue.refresh()
+
+    def villa_ids(self, results):
+        return [ result.villa_id for result in results ]
+
+    def test_sorts_by_total_price(self):
+        results = self.catalogue.search(datetime.date(2017, 2, 10), datetime.date(2017, 2, 16))
+
+        self.assertEqual(self.villa_ids(results), ["Yalta", "Adasa", "Arnalaya"])
+        self.assertEqual(results[1].quote.total, 6600.00)
+        self.assertEqual(results[1].villa.name, "Villa Adasa")
+
+    def test_applies_availability_and_minimum_stay(self):
+        self.assertEqual(self.villa_ids(self.catalogue.search(datetime.date(2017, 3, 11),
+            datetime.date(2017, 3, 14))), ["Arnalaya"])
+
+    def test_filters_by_guests_and_budget(self):
+        check_in, check_out = datetime.date(2017, 2, 10), datetime.date(2017, 2, 16)
+
+        self.assertEqual(self.villa_ids(self.catalogue.search(check_in, check_out, guests=8)),
+                ["Arnalaya"])
+        self.assertEqual(self.villa_ids(self.catalogue.search(check_in, check_out, budget=6600)),
+                ["Yalta", "Adasa"])
+        self.assertEqual(self.catalogue.search(check_in, check_out, guests=8, budget=6600), [])
+        self.assertEqual(self.villa_ids(self.catalogue.search(check_in, check_out, limit=2)),
+                ["Yalta", "Adasa"])
+
+    def test_refresh_applies_changes(self):
+        self.api.rates["Yalta"] = (2000.00, 2)
+        del self.api.rates["Arnalaya"]
+        self.catalogue.refresh()
+
+        results = self.catalogue.search(datetime.date(2017, 2, 10), datetime.date(2017, 2, 16))
+        self.assertEqual(self.villa_ids(results), ["Adasa", "Yalta"])
+        self.assertEqual(len(self.catalogue), 2)
+
+    def test_refreshes_single_villa(self):
+        self.api.unavailable["Adasa"] = []
+        self.catalogue.refresh_villa("Adasa")
+
+        self.assertIn("Adasa", self.villa_ids(self.catalogue.search(datetime.date(2017, 3, 11),
+            datetime.date(2017, 3, 14))))
+
+    def test_refresh_after_single_villa_reverts(self):
+        booked = [(datetime.datetime(2017, 2, 10), datetime.datetime(2017, 2, 20))]
+        self.api.unavailable["Arnalaya"] = booked
+        self.catalogue.refresh_villa("Arnalaya")
+        self.api.unavailable["Arnalaya"] = []
+        self.catalogue.refresh()
+
+        self.assertIn("Arnalaya", self.villa_ids(self.catalogue.search(datetime.date(2017, 2, 10),
+            datetime.date(2017, 2, 16))))
+
+    def test_rejects_empty_stays(self):
+        with self.assertRaises(ValueError):
+            self.catalogue.search(datetime.date(2017, 2, 10), datetime.date(2017, 2, 10))
+
+
+@skipIf(search.numpy is None, "NumPy is not installed")
+class NumpyCatalogueTestCase(CatalogueTestCase):
+    use_numpy = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import datetime
+import io
+import tracemalloc
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasApiError)
+from pymvlapi.testing import (MockMarketingVillasServer, SAMPLE_RESPONSES)
+from pymvlapi.transport import PooledTransport
+
+
+class ChunkedStream(io.BytesIO):
+    """
+    Returns at most a few bytes per read, like a slow socket.
+    """
+
+    def read(self, size=-1):
+        return super(ChunkedStream, self).read(7)
+
+
+class IterparseTestCase(TestCase):
+    def test_yields_elements_from_partial_reads(self):
+        stream = ChunkedStream(SAMPLE_RESPONSES["getMVLVillaList"])
+        villa_ids = [ villa.attrib["villaid"] for villa in MarketingVillasApi._iterparse(stream, "Villa") ]
+
+        self.assertEqual(villa_ids, ["39LightHouse", "Adasa"])
+
+    def test_memory_does_not_grow_with_document(self):
+        raw = (b"<Availability><UnavailableDates>"
+                + b"<UnavailableDate><From>2017-02-24</From><To>2017-03-03</To></UnavailableDate>" * 20000
+                + b"</UnavailableDates></Availability>")
+
+        tracemalloc.start()
+        try:
+            MarketingVillasApi._raw_bytes_to_tree(raw)
+            tree_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+            for element in MarketingVillasApi._iterparse(io.BytesIO(raw), "UnavailableDate"):
+                pass
+            stream_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        self.assertLess(stream_peak, tree_peak / 4)
+
+    def test_raises_error_for_error_response(self):
+        raw = b'<Response status="error"><ExtraInfo>[Invalid Villa]</ExtraInfo></Response>'
+
+        with self.assertRaises(MarketingVillasApiError):
+            list(MarketingVillasApi._iterparse(io.BytesIO(raw), "Villa"))
+
+
+class StreamingEndpointTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+
+    def tearDown(self):
+        self.mvlapi.close()
+        self.server.stop()
+
+    def test_streams_villa_list(self):
+        self.assertEqual(list(self.mvlapi.iter_villa_list()), self.mvlapi.get_villa_list())
+
+    def test_streams_villa_rates(self):
+        rates = list(self.mvlapi.iter_villa_rates("Arnalaya"))
+
+        self.assertEqual(rates, self.mvlapi.get_villa_rates("Arnalaya").rates)
+        self.assertEqual(rates[0].date_from, datetime.datetime(2017, 2, 5))
+
+    def test_streams_villa_unavailable_dates(self):
+        unavailable = list(self.mvlapi.iter_villa_unavailable_dates("Arnalaya"))
+
+        self.assertEqual(unavailable, self.mvlapi.get_villa_unavailable_dates("Arnalaya").unavailable_dates)
+
+    def test_returns_connection_to_pool(self):
+        list(self.mvlapi.iter_villa_rates("Arnalaya"))
+        list(self.mvlapi.iter_villa_rates("Arnalaya"))
+
+        self.assertEqual(self.server.connection_count, 1)
+
+    def test_requests_within_stream_do_not_wait_for_it(self):
+        self.mvlapi.close()
+        self.mvlapi = MarketingVillasApi("", "", 1218, base_url=self.server.url,
+                transport=PooledTransport(pool_size=1, connect_timeout=2.0))
+
+        rates = { villa.villa_id: self.mvlapi.get_villa_rates(villa.villa_id)
+                for villa in self.mvlapi.iter_villa_list() }
+        self.assertEqual(sorted(rates), ["39LightHouse", "Adasa"])
+
+
+if __name__ == "__main__":
+    main()
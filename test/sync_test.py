@@ -0,0 +1,94 @@
+import datetime
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import (MarketingVillasApi, MarketingVillasApiError)
+from pymvlapi.records import (Villa, RatePeriod, VillaRates, UnavailablePeriod,
+    VillaUnavailableDates)
+from pymvlapi.sync import (DeltaSync, SnapshotStore, ADDED, CHANGED, REMOVED,
+    VILLA, RATES, UNAVAILABLE_DATES)
+
+
+class FakeApi(MarketingVillasApi):
+    """
+    Serves villas, rates and unavailable dates from dictionaries.
+    """
+
+    def __init__(self):
+        super(FakeApi, self).__init__("", "", 1218)
+        self.get_md5_token = lambda: "token"
+        self.villas = {}
+        self.rates = {}
+        self.unavailable = {}
+
+    def get_villa_list(self) -> list:
+        return [ Villa(villa_id, villa_id, villa_id.lower(), name) for villa_id, name in self.villas.items() ]
+
+    def get_villa_rates(self, villa_id: str) -> VillaRates:
+        if villa_id not in self.rates:
+            raise MarketingVillasApiError("No rates")
+        return VillaRates(villa_id, "Standard Rate", [ RatePeriod(datetime.datetime(2017, 2, 5),
+            datetime.datetime(2017, 3, 31), self.rates[villa_id], 2, 10.00, 5.00) ])
+
+    def get_villa_unavailable_dates(self, villa_id: str) -> VillaUnavailableDates:
+        return VillaUnavailableDates(villa_id, [ UnavailablePeriod(date, date)
+            for date in self.unavailable.get(villa_id, []) ])
+
+
+class DeltaSyncTestCase(TestCase):
+    def setUp(self):
+        self.api = FakeApi()
+        self.api.villas = { "Adasa": "Villa Adasa", "Arnalaya": "Villa Arnalaya" }
+        self.api.rates = { "Adasa": 1000.00, "Arnalaya": 1895.00 }
+        self.store = SnapshotStore()
+        self.sync = DeltaSync(self.api, self.store, max_workers=2)
+
+    def changes(self, result):
+        return sorted((change.kind, change.villa_id, change.action) for change in result.changes)
+
+    def test_first_run_adds_everything(self):
+        result = self.sync.run()
+
+        self.assertEqual(len(result.changes), 6)
+        self.assertTrue(all(change.action == ADDED for change in result.changes))
+        self.assertEqual(self.store.load(RATES)["Adasa"]["rates"][0]["from"], "2017-02-05T00:00:00")
+
+    def test_unchanged_run_reports_nothing(self):
+        self.sync.run()
+
+        self.assertEqual(self.sync.run().changes, [])
+
+    def test_reports_only_differences(self):
+        self.sync.run()
+        self.api.rates["Adasa"] = 1100.00
+        self.api.unavailable["Arnalaya"] = [datetime.datetime(2017, 3, 1)]
+        del self.api.villas["Adasa"]
+        self.api.villas["Yalta"] = "Villa Yalta"
+        self.api.rates["Yalta"] = 1500.00
+
+        self.assertEqual(self.changes(self.sync.run()), [
+            (RATES, "Adasa", REMOVED),
+            (RATES, "Yalta", ADDED),
+            (UNAVAILABLE_DATES, "Adasa", REMOVED),
+            (UNAVAILABLE_DATES, "Arnalaya", CHANGED),
+            (UNAVAILABLE_DATES, "Yalta", ADDED),
+            (VILLA, "Adasa", REMOVED),
+            (VILLA, "Yalta", ADDED),
+        ])
+        self.assertEqual(sorted(self.store.hashes(VILLA)), ["Arnalaya", "Yalta"])
+
+    def test_keeps_snapshot_of_failed_villas(self):
+        self.sync.run()
+        del self.api.rates["Adasa"]
+
+        result = self.sync.run()
+        self.assertEqual(result.changes, [])
+        self.assertIn((RATES, "Adasa"), result.errors)
+        self.assertIn("Adasa", self.store.hashes(RATES))
+
+
+if __name__ == "__main__":
+    main()
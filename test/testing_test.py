@@ -0,0 +1,38 @@
+import time
+from unittest import (main, TestCase)
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.testing import MockMarketingVillasServer
+
+
+class MockServerTestCase(TestCase):
+    def test_generates_payloads_of_requested_size(self):
+        with MockMarketingVillasServer(villa_count=30, rate_periods=12, unavailable_periods=7) as server:
+            api = MarketingVillasApi("", "", 1218, base_url=server.url)
+            villas = api.get_villa_list()
+            rates = api.get_villa_rates(villas[3].villa_id)
+            unavailable = api.get_villa_unavailable_dates(villas[3].villa_id)
+            api.close()
+
+        self.assertEqual(len(villas), 30)
+        self.assertEqual(len(rates.rates), 12)
+        self.assertEqual(len(unavailable.unavailable_dates), 7)
+
+    def test_delays_responses(self):
+        with MockMarketingVillasServer(latency=0.05) as server:
+            api = MarketingVillasApi("", "", 1218, base_url=server.url)
+            api.get_time_token()
+            started = time.perf_counter()
+            api.get_time_token()
+            elapsed = time.perf_counter() - started
+            api.close()
+
+        self.assertGreaterEqual(elapsed, 0.05)
+
+
+if __name__ == "__main__":
+    main()
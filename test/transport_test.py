@@ -0,0 +1,91 @@
+from unittest import (main, TestCase)
+from urllib.error import HTTPError
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymvlapi.endpoint import MarketingVillasApi
+from pymvlapi.testing import (MockMarketingVillasServer, SAMPLE_RESPONSES)
+from pymvlapi.transport import (PooledTransport, PoolTimeout, UrllibTransport)
+
+
+class TransportTestCase(TestCase):
+    def setUp(self):
+        self.server = MockMarketingVillasServer().start()
+        self.rates_url = self.server.url + "partners.asmx/getVillaRates?p_VillaID=Arnalaya"
+
+    def tearDown(self):
+        self.server.stop()
+
+
+class PooledTransportTestCase(TransportTestCase):
+    def setUp(self):
+        super(PooledTransportTestCase, self).setUp()
+        self.transport = PooledTransport(pool_size=2)
+
+    def tearDown(self):
+        self.transport.close()
+        super(PooledTransportTestCase, self).tearDown()
+
+    def test_reuses_connection_between_requests(self):
+        for _ in range(5):
+            self.assertEqual(self.transport.request(self.rates_url), SAMPLE_RESPONSES["getVillaRates"])
+
+        self.assertEqual(self.server.request_count, 5)
+        self.assertEqual(self.server.connection_count, 1)
+
+    def test_decodes_gzip_responses(self):
+        self.transport.gzip = False
+        self.assertEqual(self.transport.request(self.rates_url), SAMPLE_RESPONSES["getVillaRates"])
+        self.transport.gzip = True
+        self.assertEqual(self.transport.request(self.rates_url), SAMPLE_RESPONSES["getVillaRates"])
+
+    def test_reconnects_after_pool_is_closed(self):
+        self.transport.request(self.rates_url)
+        self.transport.close()
+        self.transport.request(self.rates_url)
+
+        self.assertEqual(self.server.connection_count, 2)
+
+    def test_gives_up_waiting_for_full_pool(self):
+        transport = PooledTransport(pool_size=1, connect_timeout=0.05)
+        transport.request(self.rates_url)
+        pool, = transport._pools.values()
+        connection, _ = pool.acquire()
+        try:
+            with self.assertRaises(PoolTimeout):
+                transport.request(self.rates_url)
+        finally:
+            pool.release(connection, True)
+            transport.close()
+
+    def test_raises_http_error_on_failure_status(self):
+        with self.assertRaises(HTTPError) as context:
+            self.transport.request(self.server.url + "partners.asmx/notAnEndpoint")
+        self.assertEqual(context.exception.code, 404)
+
+
+class UrllibTransportTestCase(TransportTestCase):
+    def test_opens_connection_per_request(self):
+        transport = UrllibTransport(timeout=5)
+        transport.request(self.rates_url)
+        transport.request(self.rates_url)
+
+        self.assertEqual(self.server.connection_count, 2)
+
+
+class ApiTransportTestCase(TransportTestCase):
+    def test_api_calls_share_one_connection(self):
+        api = MarketingVillasApi("", "", 1218, base_url=self.server.url)
+        api.get_villa_list()
+        api.get_villa_rates("Arnalaya")
+        api.close()
+
+        # Time token, MD5 token, villa list and villa rates
+        self.assertEqual(self.server.request_count, 4)
+        self.assertEqual(self.server.connection_count, 1)
+
+
+if __name__ == "__main__":
+    main()